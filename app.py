@@ -1,5 +1,4 @@
 import sys
-import subprocess
 import os
 import uuid
 import time
@@ -42,31 +41,17 @@ check_venv()
 
 # --- Verificação de Ambiente e Instalação de Dependências --- 
 def check_and_install_dependencies():
-    """Verifica se está em um venv e instala dependências do requirements.txt."""
-    print("--- Verificando ambiente e dependências ---")
-    
-    # Verifica se o arquivo requirements.txt existe
-    requirements_path = 'requirements.txt'
-    if not os.path.exists(requirements_path):
-        print(f"ERRO: Arquivo {requirements_path} não encontrado.")
-        return False
+    """Instala as dependências do requirements.txt, se ele mudou desde a última instalação.
 
-    print(f"Garantindo que as dependências em {requirements_path} estão instaladas...")
-    try:
-        subprocess.check_call([sys.executable, '-m', 'pip', 'install', '-r', requirements_path])
-        print("Dependências verificadas/instaladas com sucesso.")
-        print("---------------------------------------------")
-        return True
-    except subprocess.CalledProcessError as e:
-        print(f"ERRO: Falha ao instalar dependências: {e}")
-        print("Verifique se o pip está funcionando e se o arquivo requirements.txt está correto.")
-        print("---------------------------------------------")
-        return False
-    except FileNotFoundError:
-        print("ERRO: Comando 'pip' não encontrado.")
-        print("Certifique-se de que Python e pip estão instalados e no PATH.")
-        print("---------------------------------------------")
-        return False
+    O hash do arquivo fica num carimbo dentro do venv (ver src/core/bootstrap.py); sem mudanças,
+    o pip não é chamado e o app sobe direto. FAST_BOOT=0 roda o pip a cada início.
+    """
+    from src.core.bootstrap import ensure_dependencies # Só biblioteca padrão
+
+    print("--- Verificando ambiente e dependências ---")
+    ok = ensure_dependencies('requirements.txt')
+    print("---------------------------------------------")
+    return ok
 
 # Executa a verificação ANTES de tentar importar pacotes instalados
 if not check_and_install_dependencies():
@@ -74,110 +59,231 @@ if not check_and_install_dependencies():
 
 # --- Imports e Lógica Principal do App --- 
 # Só importa os pacotes DEPOIS de garantir a instalação
-import gradio as gr
-from src.ollama_integration.client import chat_completion, get_available_models
+import asyncio
+import inspect
+import logging
+from concurrent.futures import Future
+from src.ollama_integration.client import chat_completion
+from src.ollama_integration.model_registry import ModelInfo, get_model_registry, model_label
+from src.ollama_integration.residency import get_residency_manager
+from src.ollama_integration.async_client import achat_completion
 from src.database.history import save_chat_message, update_feedback
-from typing import List, Tuple, Dict, Any, Generator
+from src.database.history_writer import get_history_writer
+from src.database.migrations import migrate
+from src.database.retention import start_retention_worker
+from typing import List, Tuple, Dict, Any, Generator, AsyncGenerator
 from src.core.processing import preprocess_user_input # Importa a função
+from src.core.context_window import summary_prompt
+from src.core.conversation import Conversation
+from src.core.stream_throttle import throttle_stream, athrottle_stream
+
+# Configuração do logging da aplicação (nível via LOG_LEVEL no .env; DEBUG deixa o streaming mais lento)
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper(), format='%(asctime)s - %(levelname)s - %(name)s - %(message)s')
+# Para evitar logs muito verbosos de bibliotecas externas
+logging.getLogger("urllib3").setLevel(logging.WARNING)
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+def _model_choices(models: List[ModelInfo], current: str | None = None) -> Tuple[List[Tuple[str, str]], str]:
+    """Opções do dropdown (rótulo com tamanho/quantização, nome) e o modelo selecionado.
+
+    Mantém a escolha atual da sessão se o modelo continuar disponível; senão usa OLLAMA_DEFAULT_MODEL.
+    """
+    default_model = os.getenv("OLLAMA_DEFAULT_MODEL", "llama3")
+    if not models:
+        # Ollama ainda não respondeu (ou está fora): mostra o modelo padrão do .env
+        selected = current or default_model
+        return [(selected, selected)], selected
+    choices = [(model_label(model), model.name) for model in models]
+    names = [model.name for model in models]
+    if current in names:
+        return choices, current
+    # Garante que o default_model esteja na lista, caso contrário usa o primeiro da lista
+    if default_model not in names:
+        print(f"AVISO: Modelo padrão '{default_model}' não encontrado. Usando '{names[0]}' como padrão na UI.")
+        return choices, names[0]
+    return choices, default_model
+
+# Lista de modelos em cache, atualizada em segundo plano: a primeira busca corre enquanto o gradio
+# é importado e a UI é montada, e nunca bloqueia a inicialização (ver model_registry)
+model_registry = get_model_registry()
+# Pré-carrega o modelo padrão (e os recentes, se OLLAMA_PRELOAD_RECENT > 0), com keep_alive, e acompanha o /api/ps
+residency = get_residency_manager().start(os.getenv("OLLAMA_DEFAULT_MODEL", "llama3"))
+# Intervalo (s) com que cada página confere se a lista de modelos mudou
+MODELS_UI_POLL_SECONDS = float(os.getenv("MODELS_UI_POLL_SECONDS", "10"))
+
+# O gradio é a importação mais pesada do app (segundos); a busca de modelos corre enquanto isso
+import gradio as gr
+
+# Cria/atualiza o esquema do histórico uma vez, na inicialização (importar os módulos não toca no banco)
+migrate()
+# Move o histórico antigo para arquivos mensais em segundo plano (só se HISTORY_RETENTION_DAYS > 0)
+start_retention_worker()
+
+ERROR_RESPONSE = "Desculpe, ocorreu um erro ao contatar o modelo."
+# Grava o histórico numa thread em segundo plano, em lotes (HISTORY_WRITE_BEHIND=0 volta a gravar no turno)
+HISTORY_WRITE_BEHIND = os.getenv("HISTORY_WRITE_BEHIND", "1") != "0"
+
+def _start_turn(
+    message: str,
+    session_state: Dict[str, Any],
+    selected_model: str | None = None
+) -> Tuple[str, List[Dict[str, str]]] | None:
+    """Pré-processa a mensagem, abre o turno na conversa da sessão e monta a lista de mensagens para a API.
+
+    Só as mensagens que cabem no orçamento de tokens do modelo são enviadas (ver ContextWindow).
+
+    Returns:
+        Tupla (mensagem processada, mensagens para a API), ou None se a mensagem ficar vazia.
+    """
+    # Pré-processa a mensagem do usuário AQUI!
+    processed_message = preprocess_user_input(message)
+    if not processed_message:
+        return None
+
+    # Garante/Obtém session_id e inicializa last_message_id se necessário
+    if "session_id" not in session_state:
+        session_state["session_id"] = str(uuid.uuid4())
+        session_state["last_db_message_id"] = None # Inicializa ID
+
+    # Conversa da sessão: as mensagens são acrescentadas uma a uma, sem reconstruir o histórico
+    conversation = session_state.get("conversation")
+    if conversation is None:
+        conversation = session_state["conversation"] = Conversation()
+    # Adiciona a mensagem PROCESSADA (como o usuário a verá após a limpeza) e monta o contexto da API
+    conversation.add_user(processed_message)
+    messages = conversation.api_messages(selected_model)
+    logging.debug(f"Contexto: {len(messages)} mensagens, ~{conversation.context.window_tokens()} de "
+                  f"~{conversation.context.total_tokens} tokens da sessão")
+    conversation.start_assistant()
+
+    # Zera o ID da última mensagem antes de gerar nova resposta
+    session_state["last_db_message_id"] = None
+    return processed_message, messages
+
+def _finish_turn(processed_message: str, session_state: Dict[str, Any], start_time: float) -> str:
+    """Fecha o turno, registra o tempo de resposta e salva a interação no banco. Retorna a string de tempo."""
+    duration = time.time() - start_time
+    time_str = f"Tempo de resposta: {duration:.2f}s"
+    print(time_str)
+
+    full_response = session_state["conversation"].finish_assistant()
+
+    # Salva no banco de dados e guarda o ID (ou o Future do escritor em segundo plano)
+    saved_id = None
+    if full_response and full_response != ERROR_RESPONSE:
+        if HISTORY_WRITE_BEHIND:
+            saved_id = get_history_writer().submit(user_message=processed_message, assistant_message=full_response, session_id=session_state["session_id"])
+        else:
+            saved_id = save_chat_message(user_message=processed_message, assistant_message=full_response, session_id=session_state["session_id"])
 
-# Busca a lista de modelos ANTES de definir a interface
-available_models = get_available_models()
-# Obtém o modelo padrão do .env para pré-selecionar no dropdown
-default_model = os.getenv("OLLAMA_DEFAULT_MODEL", "llama3")
-# Garante que o default_model esteja na lista, caso contrário usa o primeiro da lista
-if default_model not in available_models and available_models:
-    default_model_selected = available_models[0]
-    print(f"AVISO: Modelo padrão '{default_model}' não encontrado. Usando '{default_model_selected}' como padrão na UI.")
-elif not available_models:
-     # Caso extremo: nenhum modelo encontrado, define um fallback
-     default_model_selected = "[Nenhum modelo encontrado]"
-     available_models = [default_model_selected]
-else:
-    default_model_selected = default_model
+    # Armazena o ID da mensagem salva no estado da sessão
+    session_state["last_db_message_id"] = saved_id
+    return time_str
+
+def _update_summary(session_state: Dict[str, Any], selected_model: str) -> None:
+    """Resume as mensagens que saíram da janela de contexto (estratégia "summary")."""
+    conversation = session_state.get("conversation")
+    if conversation is None or not conversation.context.needs_summary():
+        return
+    conversation.context.update_summary(lambda current, evicted: chat_completion(
+        messages=summary_prompt(current, evicted), model=selected_model, stream=False))
 
 # Função principal que processa a entrada e gera a resposta
 def respond(
     message: str,
-    chat_history: List[Tuple[str | None, str | None]],
     selected_model: str,
     session_state: Dict[str, Any]
-) -> Generator[Tuple[List[Tuple[str | None, str | None]], Dict[str, Any], str], None, None]:
-    """Processa a mensagem do usuário (com pré-processamento), chama o LLM, atualiza o histórico e mostra o tempo.
+) -> Generator[Tuple[Any, Dict[str, Any], str], None, None]:
+    """Processa a mensagem do usuário (com pré-processamento), chama o LLM, atualiza a conversa e mostra o tempo.
+
+    Durante o streaming o Chatbot é atualizado no ritmo de quadros do stream_throttle (vários
+    tokens por atualização), não a cada token.
 
     Args:
         message: Mensagem atual do usuário.
-        chat_history: Histórico atual do componente Chatbot.
         selected_model: Modelo Ollama selecionado.
         session_state: Dicionário de estado da sessão.
 
     Yields:
-        Tupla com (histórico atualizado, estado atualizado, string de tempo).
+        Tupla com (conversa para o Chatbot, estado atualizado, string de tempo).
     """
     start_time = time.time()
     time_str = ""
 
-    # Pré-processa a mensagem do usuário AQUI!
-    processed_message = preprocess_user_input(message)
-    if not processed_message:
+    turn = _start_turn(message, session_state, selected_model)
+    if turn is None:
         # Se a mensagem ficar vazia após limpeza, não faz nada
         # Apenas retorna o estado atual sem chamar LLM ou salvar
-        yield chat_history, session_state, "(Mensagem vazia após limpeza)"
+        yield gr.update(), session_state, "(Mensagem vazia após limpeza)"
         return
-
-    # Garante/Obtém session_id e inicializa last_message_id se necessário
-    if "session_id" not in session_state:
-        session_state["session_id"] = str(uuid.uuid4())
-        session_state["last_db_message_id"] = None # Inicializa ID
-    session_id = session_state["session_id"]
-
-    # Formata mensagens para a API
-    messages = []
-    for user_msg, assistant_msg in chat_history:
-        if user_msg:
-             messages.append({"role": "user", "content": user_msg})
-        if assistant_msg:
-             messages.append({"role": "assistant", "content": assistant_msg})
-    # Adiciona a mensagem PROCESSADA à lista para a API
-    messages.append({"role": "user", "content": processed_message})
-
-    # Zera o ID da última mensagem antes de gerar nova resposta
-    session_state["last_db_message_id"] = None
-
-    # Adiciona a mensagem PROCESSADA ao histórico da UI
-    # (Mostra ao usuário a mensagem como ele verá após a limpeza)
-    chat_history.append((processed_message, None))
-    yield chat_history, session_state, time_str
+    processed_message, messages = turn
+    conversation = session_state["conversation"]
+    yield conversation.messages, session_state, time_str
 
     # Chama o LLM com a mensagem processada (implícito, pois está em `messages`)
     response_generator = chat_completion(messages=messages, model=selected_model, stream=True)
-    full_response = ""
 
     try:
         if response_generator:
-            for chunk in response_generator:
-                full_response += chunk
-                # Atualiza a última mensagem usando a processed_message como chave
-                chat_history[-1] = (processed_message, full_response)
-                yield chat_history, session_state, time_str
+            # Chunks agrupados em quadros (STREAM_FRAME_INTERVAL_MS): um yield por quadro, não por token
+            for frame in throttle_stream(response_generator):
+                conversation.append_chunk(frame)
+                yield conversation.messages, session_state, time_str
         else:
-            full_response = "Desculpe, ocorreu um erro ao contatar o modelo."
-            chat_history[-1] = (processed_message, full_response)
-            yield chat_history, session_state, time_str
+            conversation.set_assistant(ERROR_RESPONSE)
+            yield conversation.messages, session_state, time_str
     finally:
-        end_time = time.time()
-        duration = end_time - start_time
-        time_str = f"Tempo de resposta: {duration:.2f}s"
-        print(time_str)
+        time_str = _finish_turn(processed_message, session_state, start_time)
 
-        # Salva no banco de dados e guarda o ID
-        saved_id = None
-        if full_response and full_response != "Desculpe, ocorreu um erro ao contatar o modelo.":
-             saved_id = save_chat_message(user_message=processed_message, assistant_message=full_response, session_id=session_id)
-        
-        # Armazena o ID da mensagem salva no estado da sessão
-        session_state["last_db_message_id"] = saved_id
+    yield conversation.messages, session_state, time_str
+    # Depois da resposta exibida: atualiza o resumo da conversa, se a estratégia pedir
+    _update_summary(session_state, selected_model)
 
-    yield chat_history, session_state, time_str
+async def respond_async(
+    message: str,
+    selected_model: str,
+    session_state: Dict[str, Any]
+) -> AsyncGenerator[Tuple[Any, Dict[str, Any], str], None]:
+    """Versão assíncrona de respond: o streaming roda no event loop, sem ocupar uma thread por sessão.
+
+    Recebe e produz os mesmos valores de respond.
+    """
+    start_time = time.time()
+    time_str = ""
+
+    turn = _start_turn(message, session_state, selected_model)
+    if turn is None:
+        yield gr.update(), session_state, "(Mensagem vazia após limpeza)"
+        return
+    processed_message, messages = turn
+    conversation = session_state["conversation"]
+    yield conversation.messages, session_state, time_str
+
+    response_stream = await achat_completion(messages=messages, model=selected_model, stream=True)
+
+    try:
+        if response_stream:
+            async for frame in athrottle_stream(response_stream):
+                conversation.append_chunk(frame)
+                yield conversation.messages, session_state, time_str
+        else:
+            conversation.set_assistant(ERROR_RESPONSE)
+            yield conversation.messages, session_state, time_str
+    finally:
+        if HISTORY_WRITE_BEHIND:
+            # Só enfileira a gravação: não bloqueia o event loop
+            time_str = _finish_turn(processed_message, session_state, start_time)
+        else:
+            # O SQLite é síncrono: salva numa thread auxiliar para não travar o event loop
+            time_str = await asyncio.to_thread(_finish_turn, processed_message, session_state, start_time)
+
+    yield conversation.messages, session_state, time_str
+    if conversation.context.needs_summary():
+        await asyncio.to_thread(_update_summary, session_state, selected_model)
+
+# Caminho usado pela interface. O síncrono é o padrão: o assíncrono usa ~2x a CPU por token
+# (scripts/benchmark_async_client.py); USE_ASYNC_RESPOND=1 troca para ele (menos threads por sessão)
+respond_handler = respond_async if os.getenv("USE_ASYNC_RESPOND", "0") == "1" else respond
 
 # --- Nova Função para Lidar com Feedback --- 
 def handle_feedback(feedback_type: str, session_state: Dict[str, Any]) -> None:
@@ -186,8 +292,13 @@ def handle_feedback(feedback_type: str, session_state: Dict[str, Any]) -> None:
     feedback_value = 1 if feedback_type == "👍" else -1 if feedback_type == "👎" else 0
 
     if last_message_id is not None and feedback_value != 0:
-        print(f"Registrando feedback {feedback_type} para a mensagem ID: {last_message_id}")
-        update_feedback(message_id=last_message_id, feedback_value=feedback_value)
+        if isinstance(last_message_id, Future):
+            # Mensagem ainda pode estar na fila: o escritor resolve o ID na ordem de gravação
+            print(f"Registrando feedback {feedback_type} para a última mensagem (gravação em segundo plano)")
+            get_history_writer().submit_feedback(last_message_id, feedback_value)
+        else:
+            print(f"Registrando feedback {feedback_type} para a mensagem ID: {last_message_id}")
+            update_feedback(message_id=last_message_id, feedback_value=feedback_value)
         # Poderia adicionar um gr.Info ou gr.Warning aqui para confirmar ao usuário
         # Ex: gr.Info(f"Feedback {feedback_type} registrado!") - mas requer retorno
     elif feedback_value == 0:
@@ -195,6 +306,10 @@ def handle_feedback(feedback_type: str, session_state: Dict[str, Any]) -> None:
     else:
         print("Nenhuma mensagem anterior encontrada nesta sessão para registrar feedback.")
 
+# Chatbot no formato "messages" ({"role", "content"}): no Gradio 4.x/5.x é opcional (type="messages");
+# no 6.x é o único formato e o parâmetro não existe
+CHATBOT_MESSAGES_FORMAT = {"type": "messages"} if "type" in inspect.signature(gr.Chatbot.__init__).parameters else {}
+
 # --- Definição da Interface com gr.Blocks --- 
 with gr.Blocks(theme=gr.themes.Default(primary_hue="blue", secondary_hue="neutral")) as demo:
     # Estado da sessão (para session_id)
@@ -203,18 +318,22 @@ with gr.Blocks(theme=gr.themes.Default(primary_hue="blue", secondary_hue="neutra
     gr.Markdown("# Meu Chatbot com Ollama")
 
     # Seletor de Modelo (acima do chat)
+    # Versão da lista de modelos mostrada nesta página (ModelRegistry.version)
+    models_version = gr.State(-1)
+    # Usa o que já estiver em cache; se a primeira busca ainda não terminou, só o modelo padrão do .env
+    initial_choices, initial_model = _model_choices(model_registry.models())
     model_selector = gr.Dropdown(
-        choices=available_models,
-        value=default_model_selected,
+        choices=initial_choices,
+        value=initial_model,
         label="Escolha o Modelo Ollama",
         interactive=True
     )
 
-    # Área do Chat
+    # Área do Chat (a conversa inteira; só o contexto enviado ao modelo é limitado)
     chatbot = gr.Chatbot(
         label="Chat",
-        bubble_full_width=False,
-        height=500 # Ajuste a altura conforme necessário
+        height=500, # Ajuste a altura conforme necessário
+        **CHATBOT_MESSAGES_FORMAT
     )
 
     # Adiciona componente para exibir o tempo
@@ -247,8 +366,8 @@ with gr.Blocks(theme=gr.themes.Default(primary_hue="blue", secondary_hue="neutra
 
     # Quando o usuário pressiona Enter no Textbox (msg_input)
     msg_input.submit(
-        respond, # Função a ser chamada
-        [msg_input, chatbot, model_selector, session_state], # Inputs da função
+        respond_handler, # Função a ser chamada
+        [msg_input, model_selector, session_state], # Inputs da função (a conversa está no session_state)
         # Adiciona time_output aos outputs
         [chatbot, session_state, time_output], # Outputs da função (atualiza o chatbot e o state)
         queue=True # Permite processamento em fila
@@ -257,8 +376,8 @@ with gr.Blocks(theme=gr.themes.Default(primary_hue="blue", secondary_hue="neutra
 
     # Quando o usuário clica no botão Enviar
     send_button.click(
-        respond,
-        [msg_input, chatbot, model_selector, session_state],
+        respond_handler,
+        [msg_input, model_selector, session_state],
         [chatbot, session_state, time_output],
         queue=True
     # Limpa APENAS msg_input após a resposta
@@ -276,6 +395,27 @@ with gr.Blocks(theme=gr.themes.Default(primary_hue="blue", secondary_hue="neutra
         outputs=None
     )
 
+    # Atualiza o seletor quando a lista de modelos do registro muda (nada é enviado se não mudou)
+    def refresh_model_choices(current_model: str, shown_version: int):
+        version = model_registry.version
+        if version == shown_version:
+            return gr.update(), shown_version
+        choices, selected = _model_choices(model_registry.models(), current_model)
+        return gr.update(choices=choices, value=selected), version
+
+    # Trocar para um modelo que não está carregado no Ollama: avisa e já começa a carregá-lo
+    def handle_model_change(selected_model: str) -> None:
+        warning = residency.switch_warning(selected_model)
+        if warning:
+            gr.Warning(warning)
+
+    model_selector.input(handle_model_change, [model_selector], None)
+
+    demo.load(refresh_model_choices, [model_selector, models_version], [model_selector, models_version])
+    if hasattr(gr, "Timer"): # gr.Timer existe a partir do Gradio 4.40
+        gr.Timer(MODELS_UI_POLL_SECONDS).tick(
+            refresh_model_choices, [model_selector, models_version], [model_selector, models_version])
+
 # Lança a aplicação web
 if __name__ == "__main__":
     demo.launch(share=False) 
\ No newline at end of file
@@ -1,8 +1,18 @@
+import argparse
 import json
 import os
 import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from tqdm import tqdm
+from src.ollama_integration.cache import DETERMINISTIC_OPTIONS
 from src.ollama_integration.client import chat_completion # Usamos nosso cliente existente
+from src.ollama_integration.session import OllamaSessionPool, get_session_pool, set_session_pool
+from src.schema.column_batching import DEFAULT_BATCH_SIZE, describe_columns_batched
+from src.schema.column_clusters import build_cluster_prompt, calls_avoided, cluster_schema_columns
+from src.schema.json_stream import LazySchema
+from src.schema.schema_diff import SCHEMA_DIFF_FILE, changed_keys
 
 # --- Configuração ---
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - [%(name)s] - %(message)s')
@@ -10,17 +20,21 @@ logger = logging.getLogger(__name__)
 
 SCHEMA_FILE = "firebird_schema.json"
 OUTPUT_DRAFT_FILE = "schema_metadata_draft.json"
+# Journal append-only com as descrições já geradas (permite retomar após uma queda)
+JOURNAL_FILE = "schema_metadata_draft.journal.jsonl"
+# Alinha a concorrência com quantas requisições o Ollama atende em paralelo
+DEFAULT_WORKERS = int(os.getenv("OLLAMA_NUM_PARALLEL", "4"))
+FAILED_DESCRIPTION = "[Descrição não gerada pela IA]"
 
 # --- Funções Auxiliares ---
 
 def load_schema(file_path):
-    """Carrega o esquema técnico do banco de dados do arquivo JSON."""
+    """Abre o esquema técnico para leitura por relação, sem decodificar o arquivo inteiro."""
     if not os.path.exists(file_path):
         logger.error(f"Erro: Arquivo de esquema '{file_path}' não encontrado.")
         return None
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        return LazySchema(file_path)
     except json.JSONDecodeError:
         logger.error(f"Erro: Arquivo de esquema '{file_path}' não é um JSON válido.")
         return None
@@ -28,13 +42,24 @@ def load_schema(file_path):
         logger.exception(f"Erro inesperado ao carregar o esquema '{file_path}':")
         return None
 
+# Total de prompts enviados ao Ollama (inclui reenvios), para medir a vazão real
+prompts_sent = 0
+_prompts_sent_lock = threading.Lock()
+
+def _count_prompt():
+    global prompts_sent
+    with _prompts_sent_lock:
+        prompts_sent += 1
+
 def generate_ai_description(prompt):
     """Chama a API Ollama para gerar uma descrição e limpa a resposta."""
+    _count_prompt()
     logger.debug(f"Enviando prompt para IA: {prompt}")
     # Usamos a função chat_completion que já lida com o modelo padrão do .env
     # Construímos a lista de mensagens como esperado pela função
     messages = [{"role": "user", "content": prompt}]
-    response = chat_completion(messages=messages, stream=False)
+    # Determinístico, para que a resposta guardada no cache seja a que o modelo daria de novo
+    response = chat_completion(messages=messages, stream=False, options=DETERMINISTIC_OPTIONS, use_cache=True)
 
     if response:
         # Limpeza básica: remover aspas extras, espaços em branco
@@ -43,68 +68,262 @@ def generate_ai_description(prompt):
         return cleaned_response
     else:
         logger.warning("Falha ao obter descrição da IA.")
-        return "[Descrição não gerada pela IA]"
+        return None
+
+def generate_ai_json(prompt, json_schema, use_cache=True):
+    """Chama a API Ollama pedindo saída JSON estruturada (usado nos prompts em lote)."""
+    _count_prompt()
+    messages = [{"role": "user", "content": prompt}]
+    # Novas tentativas (use_cache=False) amostram: repetir a chamada determinística daria o mesmo JSON inválido
+    options = DETERMINISTIC_OPTIONS if use_cache else None
+    return chat_completion(messages=messages, stream=False, options=options, use_cache=use_cache,
+                           response_format=json_schema)
+
+def build_object_prompt(object_type, object_name, col_names_list):
+    """Monta o prompt de descrição de uma tabela/view."""
+    return (
+        f"Sugira uma descrição concisa em português brasileiro para um(a) {object_type} de banco de dados "
+        f"chamado(a) '{object_name}'. "
+        f"As colunas são: {', '.join(col_names_list[:10])}... "
+        f"Foque no propósito provável do negócio. Responda apenas com a descrição sugerida."
+    )
+
+def build_column_prompt(object_name, col_name, col_type):
+    """Monta o prompt de descrição de uma coluna."""
+    return (
+        f"Sugira uma descrição concisa em português brasileiro para a coluna de banco de dados chamada '{col_name}' "
+        f"do tipo '{col_type}' que pertence ao objeto '{object_name}'. "
+        f"Foque no significado provável do dado armazenado. Responda apenas com a descrição sugerida."
+    )
+
+# --- Journal (checkpoint incremental) ---
+
+def load_journal(journal_path):
+    """Lê o journal e retorna {(key_type, objeto, coluna|None): descrição} do que já foi gerado."""
+    done = {}
+    if not os.path.exists(journal_path):
+        return done
+    with open(journal_path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # Última linha pode ter ficado pela metade se o processo caiu durante a escrita
+                logger.warning(f"Linha {line_number} do journal inválida, ignorando.")
+                continue
+            done[(record['type'], record['object'], record.get('column'))] = record['description']
+    logger.info(f"Journal {journal_path}: {len(done)} descrições já geradas serão reaproveitadas.")
+    return done
+
+def append_journal(journal_file, key, description):
+    """Acrescenta uma descrição gerada ao journal (append-only, uma linha JSON por item)."""
+    key_type, object_name, col_name = key
+    record = {"type": key_type, "object": object_name, "column": col_name, "description": description}
+    journal_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+    journal_file.flush()
+
+def load_draft_results(draft_path):
+    """Lê um rascunho já salvo e retorna {(key_type, objeto, coluna|None): descrição}, sem as falhas."""
+    existing = None
+    if os.path.exists(draft_path):
+        try:
+            with open(draft_path, 'r', encoding='utf-8') as f:
+                existing = json.load(f)
+        except json.JSONDecodeError:
+            logger.warning(f"Rascunho '{draft_path}' não é um JSON válido; será ignorado.")
+    results = {}
+    for key_type, objects in (existing or {}).items():
+        for object_name, object_draft in objects.items():
+            results[(key_type, object_name, None)] = object_draft.get('description')
+            for col_name, col_draft in object_draft.get('COLUMNS', {}).items():
+                results[(key_type, object_name, col_name)] = col_draft.get('description')
+    return {key: desc for key, desc in results.items() if desc and desc != FAILED_DESCRIPTION}
+
+# --- Planejamento e montagem ---
+
+def plan_tasks(schema_data, done, batch_size=1, clusters=None):
+    """Lista o trabalho pendente, pulando o que já está no journal.
+
+    Cada tarefa é (chaves, função) e a função retorna {chave: descrição}. Com batch_size > 1
+    as colunas de um objeto são agrupadas em prompts de até batch_size colunas. Colunas que
+    pertencem a um dos clusters recebem uma única descrição, gerada uma vez para o grupo todo.
+    """
+    tasks = []
+    clustered = set()
+    for cluster in clusters or []:
+        clustered.update(cluster.members)
+        keys = [key for key in cluster.members if key not in done]
+        known = next((done[key] for key in cluster.members if key in done), None)
+        if keys and known:
+            # Membro novo de um grupo já descrito: reaproveita a descrição do grupo sem chamar o LLM
+            tasks.append((keys, lambda keys=keys, known=known: dict.fromkeys(keys, known)))
+        elif keys:
+            prompt = build_cluster_prompt(cluster)
+            tasks.append((keys, lambda keys=keys, prompt=prompt: dict.fromkeys(keys, generate_ai_description(prompt))))
+
+    for object_name, object_info in schema_data.items():
+        object_type = object_info.get("object_type", "TABLE") # Assume TABLE se não especificado
+        key_type = object_type + "S" # TABLES ou VIEWS
+        columns = object_info.get('columns', [])
+
+        # 1. Descrição da Tabela/View
+        key = (key_type, object_name, None)
+        if key not in done:
+            col_names_list = [col.get('name', '') for col in columns]
+            prompt = build_object_prompt(object_type, object_name, col_names_list)
+            tasks.append(([key], lambda key=key, prompt=prompt: {key: generate_ai_description(prompt)}))
+
+        # 2. Descrição das Colunas (pula colunas sem nome ou tipo e as já geradas)
+        pending = [col for col in columns
+                   if col.get('name') and col.get('type')
+                   and (key_type, object_name, col['name']) not in done
+                   and (key_type, object_name, col['name']) not in clustered]
+        if batch_size <= 1:
+            for col in pending:
+                key = (key_type, object_name, col['name'])
+                prompt = build_column_prompt(object_name, col['name'], col['type'])
+                tasks.append(([key], lambda key=key, prompt=prompt: {key: generate_ai_description(prompt)}))
+        else:
+            for start in range(0, len(pending), batch_size):
+                batch = pending[start:start + batch_size]
+                keys = [(key_type, object_name, col['name']) for col in batch]
+                tasks.append((keys, lambda batch=batch, key_type=key_type, object_type=object_type, object_name=object_name:
+                              describe_batch(key_type, object_type, object_name, batch)))
+    return tasks
+
+def describe_batch(key_type, object_type, object_name, columns):
+    """Descreve um lote de colunas em um prompt; colunas que falharem são refeitas (lote menor e, por fim, individual)."""
+    descriptions, _ = describe_columns_batched(
+        object_name, object_type, columns,
+        generate_json=generate_ai_json,
+        generate_text=generate_ai_description,
+        build_single_prompt=lambda col: build_column_prompt(object_name, col['name'], col['type']),
+        batch_size=len(columns),
+    )
+    return {(key_type, object_name, col['name']): descriptions.get(col['name'], FAILED_DESCRIPTION) for col in columns}
+
+def assemble_draft(schema_data, results):
+    """Monta o rascunho final na ordem do esquema a partir das descrições geradas."""
+    draft_metadata = {"TABLES": {}, "VIEWS": {}}
+    for object_name, object_info in schema_data.items():
+        key_type = object_info.get("object_type", "TABLE") + "S"
+        object_draft = {"COLUMNS": {}}
+        object_draft['description'] = results.get((key_type, object_name, None), FAILED_DESCRIPTION)
+        for col in object_info.get('columns', []):
+            col_name = col.get('name')
+            if not col_name or not col.get('type'):
+                continue
+            # Não geramos 'value_mapping_notes' automaticamente
+            object_draft['COLUMNS'][col_name] = {'description': results.get((key_type, object_name, col_name), FAILED_DESCRIPTION)}
+        draft_metadata[key_type][object_name] = object_draft
+    return draft_metadata
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Gera um rascunho de metadados (descrições) com IA a partir do esquema extraído.")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help="Chamadas simultâneas ao Ollama (padrão: OLLAMA_NUM_PARALLEL do .env ou 4).")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help="Colunas por prompt (padrão: METADATA_BATCH_SIZE do .env ou 15; 1 = um prompt por coluna).")
+    parser.add_argument("--no-dedup", action="store_true",
+                        help="Não agrupa colunas equivalentes (mesmo nome normalizado/domínio/tipo) entre tabelas.")
+    parser.add_argument("--restart", action="store_true",
+                        help="Ignora o journal existente e gera tudo novamente.")
+    parser.add_argument("--only-changed", action="store_true",
+                        help=f"Parte do rascunho existente e gera só o que {SCHEMA_DIFF_FILE} indica como novo ou alterado.")
+    return parser.parse_args()
 
 def main():
+    args = parse_args()
     logger.info(f"Iniciando geração de rascunho de metadados a partir de {SCHEMA_FILE}")
     schema_data = load_schema(SCHEMA_FILE)
     if not schema_data:
         return
 
-    draft_metadata = {"TABLES": {}, "VIEWS": {}}
+    logger.info(f"Encontrados {len(schema_data)} objetos (tabelas/views) no esquema.")
+    if args.restart and os.path.exists(JOURNAL_FILE):
+        os.remove(JOURNAL_FILE)
+    results = load_journal(JOURNAL_FILE)
+    if args.only_changed:
+        if not os.path.exists(SCHEMA_DIFF_FILE):
+            logger.error(f"Erro: '{SCHEMA_DIFF_FILE}' não encontrado. Rode extract_firebird_schema.py antes de usar --only-changed.")
+            return
+        with open(SCHEMA_DIFF_FILE, 'r', encoding='utf-8') as f:
+            diff = json.load(f)
+        # Descrições do rascunho atual valem para o que não mudou; o journal tem prioridade por ser mais recente
+        results = {**load_draft_results(OUTPUT_DRAFT_FILE), **results}
+        stale = changed_keys(diff, schema_data)
+        for key in stale:
+            results.pop(key, None)
+        logger.info(f"Somente alterações: {len(diff.get('added', []))} objetos novos, {len(diff.get('altered', {}))} alterados, "
+                    f"{len(diff.get('removed', []))} removidos; {len(stale)} descrições a gerar de novo.")
+    clusters = []
+    if not args.no_dedup:
+        # Pré-passo: uma descrição por grupo de colunas equivalentes, replicada para todos os membros
+        clusters = cluster_schema_columns(schema_data)
+        clustered_columns = sum(len(c) for c in clusters)
+        logger.info(f"Deduplicação: {clustered_columns} colunas em {len(clusters)} grupos; "
+                    f"{calls_avoided(clusters)} chamadas ao LLM evitadas.")
+    tasks = plan_tasks(schema_data, results, args.batch_size, clusters)
+    total_items = sum(len(keys) for keys, _ in tasks)
+    logger.info(f"{total_items} descrições pendentes em {len(tasks)} tarefas ({len(results)} já concluídas), "
+                f"{args.workers} em paralelo, {args.batch_size} colunas por prompt.")
 
-    # Usar tqdm para barra de progresso sobre os objetos (tabelas/views)
-    total_objects = len(schema_data)
-    logger.info(f"Encontrados {total_objects} objetos (tabelas/views) no esquema.")
-    object_iterator = tqdm(schema_data.items(), total=total_objects, desc="Gerando descrições para tabelas/views")
+    # O pool HTTP precisa de ao menos uma conexão por worker para não reabrir conexões
+    if args.workers > get_session_pool().pool_size:
+        set_session_pool(OllamaSessionPool(pool_size=args.workers))
 
-    for object_name, object_info in object_iterator:
-        object_type = object_info.get("object_type", "TABLE") # Assume TABLE se não especificado
-        key_type = object_type + "S" # TABLES ou VIEWS
-        draft_metadata[key_type][object_name] = {"COLUMNS": {}}
-        object_iterator.set_postfix_str(f"Processando {object_type}: {object_name}")
-
-        # 1. Gerar descrição para a Tabela/View
-        col_names_list = [col.get('name', '') for col in object_info.get('columns', [])]
-        prompt_object = (
-            f"Sugira uma descrição concisa em português brasileiro para um(a) {object_type} de banco de dados "
-            f"chamado(a) '{object_name}'. "
-            f"As colunas são: {', '.join(col_names_list[:10])}... "
-            f"Foque no propósito provável do negócio. Responda apenas com a descrição sugerida."
-        )
-        object_description = generate_ai_description(prompt_object)
-        draft_metadata[key_type][object_name]['description'] = object_description
-
-        # 2. Gerar descrição para cada Coluna
-        columns = object_info.get('columns', [])
-        if columns:
-            column_iterator = tqdm(columns, total=len(columns), desc=f"  -> Colunas de {object_name}", leave=False)
-            for col in column_iterator:
-                col_name = col.get('name')
-                col_type = col.get('type')
-                if not col_name or not col_type:
-                    continue # Pula colunas sem nome ou tipo
-                column_iterator.set_postfix_str(f"Processando coluna: {col_name}")
-
-                prompt_column = (
-                    f"Sugira uma descrição concisa em português brasileiro para a coluna de banco de dados chamada '{col_name}' "
-                    f"do tipo '{col_type}' que pertence ao objeto '{object_name}'. "
-                    f"Foque no significado provável do dado armazenado. Responda apenas com a descrição sugerida."
-                )
-                col_description = generate_ai_description(prompt_column)
-                draft_metadata[key_type][object_name]['COLUMNS'][col_name] = {'description': col_description}
-                # Não geramos 'value_mapping_notes' automaticamente
+    failed = 0
+    with open(JOURNAL_FILE, 'a', encoding='utf-8') as journal_file, \
+         ThreadPoolExecutor(max_workers=args.workers) as executor:
+        futures = {executor.submit(task): keys for keys, task in tasks}
+        progress = tqdm(total=total_items, unit="desc", desc="Gerando descrições")
+        start_time = time.time()
+        try:
+            for future in as_completed(futures):
+                try:
+                    descriptions = future.result()
+                except Exception as e:
+                    # Uma tarefa com erro não interrompe as demais: o que já terminou continua indo para o journal
+                    logger.error(f"Erro ao gerar descrições de {futures[future][0][1]}: {e}")
+                    progress.update(len(futures[future]))
+                    failed += len(futures[future])
+                    continue
+                for key, description in descriptions.items():
+                    progress.update(1)
+                    if not description or description == FAILED_DESCRIPTION:
+                        # Falhas não vão para o journal: serão tentadas de novo na próxima execução
+                        failed += 1
+                        continue
+                    results[key] = description
+                    append_journal(journal_file, key, description)
+                elapsed = time.time() - start_time
+                progress.set_postfix_str(f"{prompts_sent / elapsed:.2f} prompts/s" if elapsed else "", refresh=False)
+        except KeyboardInterrupt:
+            logger.warning("Interrompido. O progresso está salvo no journal; rode novamente para continuar.")
+            for pending in futures:
+                pending.cancel()
+            raise
+        finally:
+            progress.close()
+    if failed:
+        logger.warning(f"{failed} descrições falharam e ficaram com '{FAILED_DESCRIPTION}'. Rode novamente para tentar de novo.")
 
     # 3. Salvar o rascunho
+    draft_metadata = assemble_draft(schema_data, results)
     logger.info(f"Geração de rascunho concluída. Salvando em {OUTPUT_DRAFT_FILE}...")
     try:
         with open(OUTPUT_DRAFT_FILE, 'w', encoding='utf-8') as f:
             json.dump(draft_metadata, f, indent=4, ensure_ascii=False)
         logger.info(f"Rascunho de metadados salvo com sucesso em {OUTPUT_DRAFT_FILE}.")
+        if not failed and os.path.exists(JOURNAL_FILE):
+            # Execução completa: o journal só serve para retomar, e numa próxima execução (ex: após
+            # mudanças no esquema) reaproveitaria descrições antigas sem avisar
+            os.remove(JOURNAL_FILE)
+            logger.info(f"Journal {JOURNAL_FILE} removido (execução concluída sem falhas).")
     except IOError as e:
         logger.error(f"Erro de IO ao salvar o rascunho: {e}")
     except Exception as e:
         logger.exception("Erro inesperado ao salvar o rascunho:")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
@@ -1,36 +1,90 @@
+"""
+Lista o histórico do chat (chat_history) página a página, sem carregar a tabela inteira.
+
+Abre o banco só para leitura. Filtros por sessão, intervalo de datas e feedback; --format jsonl
+exporta uma interação por linha (para redirecionar a um arquivo).
+
+Uso:
+    python check_db.py
+    python check_db.py --session <id> --since 2025-01-01 --until 2025-02-01 --feedback -1
+    python check_db.py --format jsonl > historico.jsonl
+"""
+
+import argparse
+import json
 import sqlite3
-from src.database.history import DB_FILE # Reutiliza o nome do arquivo definido
+import sys
 
-def read_history():
-    """Lê e exibe todas as entradas da tabela chat_history."""
-    try:
-        conn = sqlite3.connect(DB_FILE)
-        conn.row_factory = sqlite3.Row # Para acessar colunas por nome
-        cursor = conn.cursor()
+from src.database.history import DB_FILE # Reutiliza o nome do arquivo definido
+from src.database.history_query import iter_history
+from src.database.retention import default_archive_dir, iter_history_all
 
-        cursor.execute("SELECT id, session_id, timestamp, user_message, assistant_message, feedback FROM chat_history ORDER BY timestamp DESC")
-        rows = cursor.fetchall()
 
-        if not rows:
-            print(f"A tabela 'chat_history' no banco '{DB_FILE}' está vazia.")
-            return
+def print_row(row):
+    print("-" * 20)
+    print(f"ID: {row['id']}")
+    print(f"Session ID: {row['session_id']}")
+    print(f"Timestamp: {row['timestamp']}")
+    print(f"Usuário: {row['user_message']}")
+    print(f"Assistente: {row['assistant_message']}")
+    print(f"Feedback: {row['feedback']}")
 
-        print(f"--- Conteúdo de '{DB_FILE}'.'chat_history' ({len(rows)} entradas) ---")
-        for row in rows:
-            print("-" * 20)
-            print(f"ID: {row['id']}")
-            print(f"Session ID: {row['session_id']}")
-            print(f"Timestamp: {row['timestamp']}")
-            print(f"Usuário: {row['user_message']}")
-            print(f"Assistente: {row['assistant_message']}")
-            print(f"Feedback: {row['feedback']}")
-        print("-" * 20)
 
+def read_history(db_file=DB_FILE, session_id=None, since=None, until=None, feedback=None,
+                 limit=None, page_size=500, output_format="text", ascending=False, include_archive=False):
+    """Exibe as entradas da tabela chat_history (mais recentes primeiro), uma página por vez."""
+    try:
+        conn = sqlite3.connect(f"file:{db_file}?mode=ro", uri=True)
     except sqlite3.Error as e:
-        print(f"Erro ao ler o banco de dados {DB_FILE}: {e}")
+        print(f"Erro ao ler o banco de dados {db_file}: {e}", file=sys.stderr)
+        return
+    conn.row_factory = sqlite3.Row # Para acessar colunas por nome
+
+    try:
+        if output_format == "text":
+            print(f"--- Conteúdo de '{db_file}'.'chat_history' ---")
+        count = 0
+        if include_archive:
+            rows = iter_history_all(session_id, since, until, feedback, page_size, ascending, conn,
+                                    archive_dir=default_archive_dir(db_file))
+        else:
+            rows = iter_history(session_id, since, until, feedback, page_size, ascending, conn)
+        for row in rows:
+            if output_format == "jsonl":
+                sys.stdout.write(json.dumps(row, ensure_ascii=False) + "\n")
+            else:
+                print_row(row)
+            count += 1
+            if limit is not None and count >= limit:
+                break
+        if output_format == "text":
+            if count:
+                print("-" * 20)
+                print(f"{count} entradas.")
+            else:
+                print(f"Nenhuma entrada em 'chat_history' no banco '{db_file}' com esses filtros.")
+    except BrokenPipeError:
+        pass # Saída cortada (ex: | head); não é erro
     finally:
-        if conn:
-            conn.close()
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default=DB_FILE, help=f"Arquivo do banco (padrão: {DB_FILE})")
+    parser.add_argument("--session", help="Só as interações desta sessão")
+    parser.add_argument("--since", help="Timestamp inicial, inclusivo (AAAA-MM-DD[ HH:MM:SS])")
+    parser.add_argument("--until", help="Timestamp final, exclusivo (AAAA-MM-DD[ HH:MM:SS])")
+    parser.add_argument("--feedback", type=int, choices=[1, -1], help="Só com este feedback")
+    parser.add_argument("--limit", type=int, help="Máximo de entradas")
+    parser.add_argument("--page-size", type=int, default=500, help="Linhas buscadas por consulta")
+    parser.add_argument("--asc", action="store_true", help="Mais antigas primeiro")
+    parser.add_argument("--format", choices=["text", "jsonl"], default="text")
+    parser.add_argument("--archive", action="store_true", help="Inclui os arquivos mensais da retenção")
+    args = parser.parse_args()
+    read_history(args.db, args.session, args.since, args.until, args.feedback,
+                 args.limit, args.page_size, args.format, args.asc, args.archive)
+
 
 if __name__ == "__main__":
-    read_history() 
\ No newline at end of file
+    main()
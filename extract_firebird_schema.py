@@ -1,8 +1,18 @@
+import argparse
 import fdb
+import hashlib
 import json
 import getpass
 import logging
+import math
+import os
+import queue
+import threading
+import time
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from src.schema.json_stream import LazySchema, SchemaJsonWriter
+from src.schema.schema_diff import SCHEMA_DIFF_FILE, SchemaDiffBuilder, diff_schemas
 
 # Configuração do Logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -13,92 +23,106 @@ DB_PATH = r"C:\Projetos\DADOS.FDB"
 DB_USER = "SYSDBA"
 DB_CHARSET = "WIN1252"
 OUTPUT_JSON_FILE = "firebird_schema.json"
+# 'bulk' monta o esquema em memória a partir de poucas consultas; 'per_relation' é o modo antigo (N+1);
+# 'parallel' distribui as consultas por relação entre várias conexões
+DEFAULT_MODE = "bulk"
+# Conexões simultâneas no modo 'parallel'
+DEFAULT_WORKERS = int(os.getenv("FIREBIRD_EXTRACT_WORKERS", "4"))
+# Transação somente leitura em snapshot (concurrency): cada conexão vê o catálogo estável durante toda a extração
+READ_ONLY_SNAPSHOT_TPB = bytes((fdb.isc_tpb_version3, fdb.isc_tpb_read, fdb.isc_tpb_concurrency, fdb.isc_tpb_nowait))
+# Fingerprint de cada relação na última extração (usado pelo modo --incremental)
+FINGERPRINTS_FILE = "firebird_schema.fingerprints.json"
+# Acima de quantas relações alteradas o modo incremental usa as consultas em lote em vez das por relação
+INCREMENTAL_BULK_THRESHOLD = 20
 
-def get_column_details(cur, relation_id):
-    """Busca detalhes das colunas para uma dada tabela (relation_id)."""
-    sql = """
-        SELECT
+FIELD_TYPE_MAP = {
+    7: 'SMALLINT', 8: 'INTEGER', 10: 'FLOAT', 12: 'DATE',
+    13: 'TIME', 14: 'CHAR', 16: 'BIGINT', 27: 'DOUBLE PRECISION',
+    35: 'TIMESTAMP', 37: 'VARCHAR', 261: 'BLOB'
+    # Adicionar outros tipos conforme necessário
+}
+
+# Colunas do catálogo usadas para descrever um campo (mesmas no modo por relação e em lote)
+COLUMN_FIELDS_SQL = """
             rf.RDB$FIELD_NAME AS FIELD_NAME,
+            rf.RDB$FIELD_SOURCE AS FIELD_SOURCE,
             f.RDB$FIELD_TYPE AS FIELD_TYPE,
             f.RDB$FIELD_SUB_TYPE AS FIELD_SUB_TYPE,
             f.RDB$FIELD_LENGTH AS FIELD_LENGTH,
             f.RDB$FIELD_PRECISION AS FIELD_PRECISION,
             f.RDB$FIELD_SCALE AS FIELD_SCALE,
             COALESCE(rf.RDB$NULL_FLAG, f.RDB$NULL_FLAG, 0) AS NULLABLE -- 0=NOT NULL, 1=NULL
+"""
+
+def format_column(row):
+    """Converte uma linha de RDB$RELATION_FIELDS/RDB$FIELDS no dicionário da coluna."""
+    field_type_code = row['FIELD_TYPE']
+    field_type_name = FIELD_TYPE_MAP.get(field_type_code, f'UNKNOWN({field_type_code})')
+
+    # Adicionar detalhes específicos do tipo
+    type_details = f"({row['FIELD_LENGTH']})" if field_type_name in ['CHAR', 'VARCHAR'] else ""
+    if field_type_code == 261: # BLOB
+         subtype = row['FIELD_SUB_TYPE']
+         if subtype == 1: type_details = "(SUB_TYPE TEXT)"
+         else: type_details = f"(SUB_TYPE {subtype})"
+    elif field_type_name in ['SMALLINT', 'INTEGER', 'BIGINT'] and row['FIELD_PRECISION']: # Numericos
+         precision = row['FIELD_PRECISION']
+         scale = abs(row['FIELD_SCALE'] or 0)
+         type_details = f"({precision},{scale})"
+    elif field_type_name in ['FLOAT', 'DOUBLE PRECISION']:
+         pass # Geralmente não mostram precisão/escala assim
+
+    return {
+        "name": row['FIELD_NAME'].strip(),
+        "type": field_type_name + type_details,
+        "nullable": bool(row['NULLABLE']),
+        # Domínio Firebird (RDB$FIELD_SOURCE); 'RDB$nnn' indica domínio gerado automaticamente
+        "domain": row['FIELD_SOURCE'].strip() if row['FIELD_SOURCE'] else None
+    }
+
+def get_column_details(cur, relation_id):
+    """Busca detalhes das colunas para uma dada tabela (relation_id)."""
+    sql = f"""
+        SELECT{COLUMN_FIELDS_SQL}
         FROM RDB$RELATION_FIELDS rf
         JOIN RDB$FIELDS f ON rf.RDB$FIELD_SOURCE = f.RDB$FIELD_NAME
         WHERE rf.RDB$RELATION_NAME = ?
         ORDER BY rf.RDB$FIELD_POSITION;
     """
     cur.execute(sql, (relation_id,))
-    columns = []
-    field_type_map = {
-        7: 'SMALLINT', 8: 'INTEGER', 10: 'FLOAT', 12: 'DATE',
-        13: 'TIME', 14: 'CHAR', 16: 'BIGINT', 27: 'DOUBLE PRECISION',
-        35: 'TIMESTAMP', 37: 'VARCHAR', 261: 'BLOB'
-        # Adicionar outros tipos conforme necessário
-    }
-
-    for row in cur.fetchallmap():
-        field_type_code = row['FIELD_TYPE']
-        field_type_name = field_type_map.get(field_type_code, f'UNKNOWN({field_type_code})')
-
-        # Adicionar detalhes específicos do tipo
-        type_details = f"({row['FIELD_LENGTH']})" if field_type_name in ['CHAR', 'VARCHAR'] else ""
-        if field_type_code == 261: # BLOB
-             subtype = row['FIELD_SUB_TYPE']
-             if subtype == 1: type_details = "(SUB_TYPE TEXT)"
-             else: type_details = f"(SUB_TYPE {subtype})"
-        elif field_type_name in ['SMALLINT', 'INTEGER', 'BIGINT'] and row['FIELD_PRECISION']: # Numericos
-             precision = row['FIELD_PRECISION']
-             scale = abs(row['FIELD_SCALE'] or 0)
-             type_details = f"({precision},{scale})"
-        elif field_type_name in ['FLOAT', 'DOUBLE PRECISION']:
-             pass # Geralmente não mostram precisão/escala assim
-
-        col_data = {
-            "name": row['FIELD_NAME'].strip(),
-            "type": field_type_name + type_details,
-            "nullable": bool(row['NULLABLE'])
-        }
-        columns.append(col_data)
-    return columns
+    return [format_column(row) for row in cur.fetchallmap()]
 
-def get_constraint_details(cur, relation_id):
-    """Busca detalhes das constraints para uma dada tabela."""
-    sql_constraints = """
-        SELECT
+CONSTRAINT_FIELDS_SQL = """
             rc.RDB$CONSTRAINT_NAME AS CONSTRAINT_NAME,
             rc.RDB$CONSTRAINT_TYPE AS CONSTRAINT_TYPE,
             rc.RDB$INDEX_NAME AS INDEX_NAME,
             fk.RDB$UPDATE_RULE AS FK_UPDATE_RULE,
             fk.RDB$DELETE_RULE AS FK_DELETE_RULE,
             pk.RDB$RELATION_NAME AS FK_TARGET_TABLE
+"""
+
+CONSTRAINT_JOINS_SQL = """
         FROM RDB$RELATION_CONSTRAINTS rc
         LEFT JOIN RDB$REF_CONSTRAINTS fk ON rc.RDB$CONSTRAINT_NAME = fk.RDB$CONSTRAINT_NAME
         LEFT JOIN RDB$RELATION_CONSTRAINTS pk ON fk.RDB$CONST_NAME_UQ = pk.RDB$CONSTRAINT_NAME
-        WHERE rc.RDB$RELATION_NAME = ?
-        ORDER BY rc.RDB$CONSTRAINT_NAME;
-    """
-    sql_constraint_columns = """
-        SELECT ix.RDB$FIELD_NAME AS FIELD_NAME
-        FROM RDB$INDEX_SEGMENTS ix
-        WHERE ix.RDB$INDEX_NAME = ?
-        ORDER BY ix.RDB$FIELD_POSITION;
+"""
+
+def build_constraints(constraint_rows, segments_by_index):
+    """Monta o dicionário de constraints de uma tabela.
+
+    Args:
+        constraint_rows: Linhas de RDB$RELATION_CONSTRAINTS (com dados de FK), ordenadas por nome.
+        segments_by_index: {nome do índice: [colunas em ordem]} vindo de RDB$INDEX_SEGMENTS.
     """
-    cur.execute(sql_constraints, (relation_id,))
     constraints = defaultdict(list)
 
-    for row in cur.fetchallmap():
+    for row in constraint_rows:
         constraint_name = row['CONSTRAINT_NAME'].strip()
         constraint_type = row['CONSTRAINT_TYPE'].strip()
         index_name = row['INDEX_NAME'].strip() if row['INDEX_NAME'] else None
 
-        # Busca colunas associadas ao índice da constraint
-        columns = []
-        if index_name:
-            cur.execute(sql_constraint_columns, (index_name,))
-            columns = [seg['FIELD_NAME'].strip() for seg in cur.fetchallmap()]
+        # Colunas associadas ao índice da constraint
+        columns = list(segments_by_index.get(index_name, [])) if index_name else []
 
         constraint_data = {
             "name": constraint_name,
@@ -127,46 +151,434 @@ def get_constraint_details(cur, relation_id):
     # Converte defaultdict para dict normal para o JSON
     return dict(constraints)
 
-def extract_schema(db_path, user, password, charset):
-    """Conecta ao banco Firebird e extrai o esquema das tabelas e views de usuário."""
-    schema = {}
-    conn = None
-    try:
-        logger.info(f"Conectando ao banco de dados: {db_path}")
-        conn = fdb.connect(
-            dsn=db_path,
-            user=user,
-            password=password,
-            charset=charset
-        )
-        cur = conn.cursor()
-        logger.info("Conexão bem-sucedida. Extraindo tabelas e views...")
-
-        # Seleciona tabelas e views de usuário (SYSTEM_FLAG = 0 ou NULL)
-        # Inclui RDB$VIEW_BLR para identificar views
-        sql_relations = """
-            SELECT RDB$RELATION_NAME, RDB$VIEW_BLR
-            FROM RDB$RELATIONS
-            WHERE RDB$SYSTEM_FLAG = 0 OR RDB$SYSTEM_FLAG IS NULL
-            ORDER BY RDB$RELATION_NAME;
-        """
-        cur.execute(sql_relations)
-
-        for table_row in cur.fetchallmap():
-            table_name = table_row['RDB$RELATION_NAME'].strip()
-            is_view = table_row['RDB$VIEW_BLR'] is not None
-            object_type = "VIEW" if is_view else "TABLE"
+def get_constraint_details(cur, relation_id):
+    """Busca detalhes das constraints para uma dada tabela."""
+    sql_constraints = f"""
+        SELECT{CONSTRAINT_FIELDS_SQL}{CONSTRAINT_JOINS_SQL}
+        WHERE rc.RDB$RELATION_NAME = ?
+        ORDER BY rc.RDB$CONSTRAINT_NAME;
+    """
+    sql_constraint_columns = """
+        SELECT ix.RDB$FIELD_NAME AS FIELD_NAME
+        FROM RDB$INDEX_SEGMENTS ix
+        WHERE ix.RDB$INDEX_NAME = ?
+        ORDER BY ix.RDB$FIELD_POSITION;
+    """
+    cur.execute(sql_constraints, (relation_id,))
+    constraint_rows = cur.fetchallmap()
+
+    # Busca colunas associadas ao índice de cada constraint (uma consulta por constraint)
+    segments_by_index = {}
+    for row in constraint_rows:
+        index_name = row['INDEX_NAME'].strip() if row['INDEX_NAME'] else None
+        if index_name and index_name not in segments_by_index:
+            cur.execute(sql_constraint_columns, (index_name,))
+            segments_by_index[index_name] = [seg['FIELD_NAME'].strip() for seg in cur.fetchallmap()]
+
+    return build_constraints(constraint_rows, segments_by_index)
+
+# --- Extração em lote (poucas consultas para o catálogo inteiro) ---
+
+USER_RELATIONS_FILTER_SQL = "(r.RDB$SYSTEM_FLAG = 0 OR r.RDB$SYSTEM_FLAG IS NULL)"
+
+def fetch_all_columns(cur):
+    """Busca as colunas de todas as relações de usuário em uma consulta. Retorna {relação: [colunas]}."""
+    sql = f"""
+        SELECT rf.RDB$RELATION_NAME AS RELATION_NAME,{COLUMN_FIELDS_SQL}
+        FROM RDB$RELATION_FIELDS rf
+        JOIN RDB$FIELDS f ON rf.RDB$FIELD_SOURCE = f.RDB$FIELD_NAME
+        JOIN RDB$RELATIONS r ON r.RDB$RELATION_NAME = rf.RDB$RELATION_NAME
+        WHERE {USER_RELATIONS_FILTER_SQL}
+        ORDER BY rf.RDB$RELATION_NAME, rf.RDB$FIELD_POSITION;
+    """
+    cur.execute(sql)
+    columns = defaultdict(list)
+    for row in cur.fetchallmap():
+        columns[row['RELATION_NAME'].strip()].append(format_column(row))
+    return columns
+
+def fetch_all_constraint_rows(cur):
+    """Busca as constraints de todas as relações de usuário em uma consulta. Retorna {relação: [linhas]}."""
+    sql = f"""
+        SELECT rc.RDB$RELATION_NAME AS RELATION_NAME,{CONSTRAINT_FIELDS_SQL}{CONSTRAINT_JOINS_SQL}
+        JOIN RDB$RELATIONS r ON r.RDB$RELATION_NAME = rc.RDB$RELATION_NAME
+        WHERE {USER_RELATIONS_FILTER_SQL}
+        ORDER BY rc.RDB$RELATION_NAME, rc.RDB$CONSTRAINT_NAME;
+    """
+    cur.execute(sql)
+    rows = defaultdict(list)
+    for row in cur.fetchallmap():
+        rows[row['RELATION_NAME'].strip()].append(row)
+    return rows
+
+def fetch_all_index_segments(cur):
+    """Busca os segmentos dos índices usados por constraints em uma consulta. Retorna {índice: [colunas]}."""
+    sql = """
+        SELECT ix.RDB$INDEX_NAME AS INDEX_NAME, ix.RDB$FIELD_NAME AS FIELD_NAME
+        FROM RDB$INDEX_SEGMENTS ix
+        JOIN RDB$RELATION_CONSTRAINTS rc ON rc.RDB$INDEX_NAME = ix.RDB$INDEX_NAME
+        ORDER BY ix.RDB$INDEX_NAME, ix.RDB$FIELD_POSITION;
+    """
+    cur.execute(sql)
+    segments = defaultdict(list)
+    for row in cur.fetchallmap():
+        segments[row['INDEX_NAME'].strip()].append(row['FIELD_NAME'].strip())
+    return segments
 
+def fetch_relations(cur):
+    """Lista as tabelas e views de usuário como [(nome, tipo)] em ordem de nome."""
+    # Seleciona tabelas e views de usuário (SYSTEM_FLAG = 0 ou NULL)
+    # Inclui RDB$VIEW_BLR para identificar views
+    sql_relations = """
+        SELECT RDB$RELATION_NAME, RDB$VIEW_BLR
+        FROM RDB$RELATIONS
+        WHERE RDB$SYSTEM_FLAG = 0 OR RDB$SYSTEM_FLAG IS NULL
+        ORDER BY RDB$RELATION_NAME;
+    """
+    cur.execute(sql_relations)
+    return [
+        (row['RDB$RELATION_NAME'].strip(), "VIEW" if row['RDB$VIEW_BLR'] is not None else "TABLE")
+        for row in cur.fetchallmap()
+    ]
+
+def iter_schema_from_cursor(cur, mode=DEFAULT_MODE):
+    """Produz (nome, dados) de cada relação, em ordem de nome, usando um cursor já aberto.
+
+    Args:
+        cur: Cursor fdb (ou compatível, com execute/fetchallmap).
+        mode: 'bulk' (poucas consultas para o catálogo inteiro) ou
+              'per_relation' (consultas por tabela e por constraint, modo antigo).
+    """
+    if mode not in ("bulk", "per_relation"):
+        raise ValueError(f"Modo de extração desconhecido: {mode}")
+    relations = fetch_relations(cur)
+
+    if mode == "bulk":
+        all_columns = fetch_all_columns(cur)
+        all_constraint_rows = fetch_all_constraint_rows(cur)
+        segments_by_index = fetch_all_index_segments(cur)
+        for table_name, object_type in relations:
+            yield table_name, {
+                "object_type": object_type,
+                "columns": all_columns.pop(table_name, []),
+                "constraints": build_constraints(all_constraint_rows.pop(table_name, []), segments_by_index)
+            }
+    else:
+        for table_name, object_type in relations:
             logger.info(f"Processando {object_type}: {table_name}...")
-            schema[table_name] = {
+            yield table_name, {
                 "object_type": object_type,
                 "columns": get_column_details(cur, table_name),
                 # Constraints podem ser menos relevantes ou vazias para views
                 "constraints": get_constraint_details(cur, table_name)
             }
 
-        logger.info(f"Extração concluída. Total de tabelas/views encontradas: {len(schema)}")
-        return schema
+def extract_schema_from_cursor(cur, mode=DEFAULT_MODE):
+    """Extrai o esquema inteiro para um dict usando um cursor já aberto (ver iter_schema_from_cursor)."""
+    return dict(iter_schema_from_cursor(cur, mode))
+
+# --- Extração incremental (fingerprint por relação) ---
+
+def fetch_relation_fingerprints(cur):
+    """Calcula um fingerprint por relação a partir do catálogo, sem montar o esquema.
+
+    O fingerprint combina RDB$FORMAT (incrementado a cada ALTER TABLE), o tipo do objeto,
+    a definição de cada campo (domínio, tipo, tamanho, nulidade, posição) e os nomes/tipos
+    das constraints. São três consultas para o catálogo inteiro.
+
+    Returns:
+        Tupla ({relação: fingerprint}, {relação: 'TABLE'|'VIEW'}), na ordem de RDB$RELATION_NAME.
+    """
+    sql_relations = f"""
+        SELECT r.RDB$RELATION_NAME AS RELATION_NAME, r.RDB$FORMAT AS FORMAT,
+            CASE WHEN r.RDB$VIEW_BLR IS NULL THEN 'TABLE' ELSE 'VIEW' END AS OBJECT_TYPE
+        FROM RDB$RELATIONS r
+        WHERE {USER_RELATIONS_FILTER_SQL}
+        ORDER BY r.RDB$RELATION_NAME;
+    """
+    sql_fields = f"""
+        SELECT rf.RDB$RELATION_NAME AS RELATION_NAME, rf.RDB$FIELD_POSITION AS FIELD_POSITION,{COLUMN_FIELDS_SQL}
+        FROM RDB$RELATION_FIELDS rf
+        JOIN RDB$FIELDS f ON rf.RDB$FIELD_SOURCE = f.RDB$FIELD_NAME
+        JOIN RDB$RELATIONS r ON r.RDB$RELATION_NAME = rf.RDB$RELATION_NAME
+        WHERE {USER_RELATIONS_FILTER_SQL}
+        ORDER BY rf.RDB$RELATION_NAME, rf.RDB$FIELD_POSITION;
+    """
+    sql_constraints = f"""
+        SELECT rc.RDB$RELATION_NAME AS RELATION_NAME, rc.RDB$CONSTRAINT_NAME AS CONSTRAINT_NAME,
+            rc.RDB$CONSTRAINT_TYPE AS CONSTRAINT_TYPE
+        FROM RDB$RELATION_CONSTRAINTS rc
+        JOIN RDB$RELATIONS r ON r.RDB$RELATION_NAME = rc.RDB$RELATION_NAME
+        WHERE {USER_RELATIONS_FILTER_SQL}
+        ORDER BY rc.RDB$RELATION_NAME, rc.RDB$CONSTRAINT_NAME;
+    """
+    def clean(value):
+        return value.strip() if isinstance(value, str) else value
+
+    parts = {}
+    object_types = {}
+    cur.execute(sql_relations)
+    for row in cur.fetchallmap():
+        name = row['RELATION_NAME'].strip()
+        object_types[name] = row['OBJECT_TYPE'].strip()
+        parts[name] = {"format": row['FORMAT'], "type": object_types[name], "fields": [], "constraints": []}
+
+    cur.execute(sql_fields)
+    for row in cur.fetchallmap():
+        entry = parts.get(row['RELATION_NAME'].strip())
+        if entry is not None:
+            entry["fields"].append([clean(row[key]) for key in sorted(row) if key != 'RELATION_NAME'])
+
+    cur.execute(sql_constraints)
+    for row in cur.fetchallmap():
+        entry = parts.get(row['RELATION_NAME'].strip())
+        if entry is not None:
+            entry["constraints"].append([row['CONSTRAINT_NAME'].strip(), row['CONSTRAINT_TYPE'].strip()])
+
+    fingerprints = {
+        name: hashlib.sha256(json.dumps(entry, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+        for name, entry in parts.items()
+    }
+    return fingerprints, object_types
+
+def extract_relations(cur, relations):
+    """Extrai apenas as relações informadas ([(nome, tipo)]); em lote se forem muitas."""
+    if len(relations) > INCREMENTAL_BULK_THRESHOLD:
+        all_columns = fetch_all_columns(cur)
+        all_constraint_rows = fetch_all_constraint_rows(cur)
+        segments_by_index = fetch_all_index_segments(cur)
+        return {
+            name: {
+                "object_type": object_type,
+                "columns": all_columns.get(name, []),
+                "constraints": build_constraints(all_constraint_rows.get(name, []), segments_by_index)
+            }
+            for name, object_type in relations
+        }
+    return {
+        name: {
+            "object_type": object_type,
+            "columns": get_column_details(cur, name),
+            "constraints": get_constraint_details(cur, name)
+        }
+        for name, object_type in relations
+    }
+
+def changed_relations(fingerprints, object_types, previous_schema, previous_fingerprints):
+    """Relações novas ou com fingerprint diferente do anterior, como [(nome, tipo)]."""
+    changed = [
+        (name, object_types[name]) for name, fingerprint in fingerprints.items()
+        if name not in previous_schema or previous_fingerprints.get(name) != fingerprint
+    ]
+    logger.info(f"Incremental: {len(changed)} de {len(fingerprints)} relações novas ou alteradas.")
+    return changed
+
+def extract_schema_incremental(cur, previous_schema, previous_fingerprints, extract_changed=None):
+    """Reextrai só as relações novas ou com fingerprint diferente; as demais vêm do esquema anterior.
+
+    extract_changed([(nome, tipo)]) -> {nome: dados} permite trocar a forma de extrair as alteradas
+    (padrão: extract_relations no mesmo cursor).
+
+    Returns:
+        Tupla (esquema completo, fingerprints atuais, diff em relação ao esquema anterior).
+    """
+    fingerprints, object_types = fetch_relation_fingerprints(cur)
+    changed = changed_relations(fingerprints, object_types, previous_schema, previous_fingerprints)
+    extracted = extract_changed(changed) if extract_changed else extract_relations(cur, changed)
+    changed = [name for name, _ in changed]
+
+    schema = {name: extracted[name] if name in extracted else previous_schema[name] for name in fingerprints}
+    diff = diff_schemas(previous_schema, schema, candidates=changed)
+    return schema, fingerprints, diff
+
+# --- Extração paralela (uma conexão por worker) ---
+
+def percentile(sorted_values, pct):
+    """Percentil pelo método nearest-rank sobre uma lista já ordenada."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(len(sorted_values) * pct / 100))
+    return sorted_values[rank - 1]
+
+def log_latency_report(latencies):
+    """Registra p50/p90/p99/máximo da latência por relação e as relações mais lentas."""
+    if not latencies:
+        return
+    values = sorted(latencies.values())
+    logger.info(
+        f"Latência por relação ({len(values)}): p50={percentile(values, 50) * 1000:.1f}ms "
+        f"p90={percentile(values, 90) * 1000:.1f}ms p99={percentile(values, 99) * 1000:.1f}ms "
+        f"máx={values[-1] * 1000:.1f}ms"
+    )
+    slowest = sorted(latencies.items(), key=lambda item: item[1], reverse=True)[:5]
+    logger.info("Relações mais lentas: " + ", ".join(f"{name} ({secs * 1000:.1f}ms)" for name, secs in slowest))
+
+def iter_relations_parallel(connect, relations, workers=DEFAULT_WORKERS, latencies=None):
+    """Extrai as relações com consultas por relação distribuídas entre até `workers` conexões.
+
+    Cada worker abre a própria conexão com connect() (somente leitura, em snapshot) e consome a
+    lista de relações de uma fila compartilhada, de modo que relações lentas não travam as demais.
+    Produz (nome, dados) na ordem de `relations`, independente de qual worker terminou primeiro;
+    só as relações concluídas fora de ordem ficam em memória.
+
+    Args:
+        latencies: Dict opcional preenchido com {nome: segundos gastos na relação}.
+    """
+    work = queue.Queue()
+    for relation in relations:
+        work.put(relation)
+    results = {}
+    latencies = {} if latencies is None else latencies
+    ready = threading.Condition()
+    stop = threading.Event()
+    errors = []
+
+    def worker():
+        conn = None
+        try:
+            conn = connect()
+            cur = conn.cursor()
+            while not stop.is_set():
+                try:
+                    name, object_type = work.get_nowait()
+                except queue.Empty:
+                    return
+                start = time.perf_counter()
+                data = {
+                    "object_type": object_type,
+                    "columns": get_column_details(cur, name),
+                    "constraints": get_constraint_details(cur, name)
+                }
+                with ready:
+                    latencies[name] = time.perf_counter() - start
+                    results[name] = data
+                    ready.notify_all()
+        except Exception as e:
+            # Inclui falhas ao conectar: interrompe os outros workers e acorda o consumidor,
+            # que relança o erro em vez de esperar para sempre por uma relação que não virá
+            with ready:
+                errors.append(e)
+                stop.set()
+                ready.notify_all()
+        finally:
+            if conn is not None:
+                conn.close()
+
+    workers = max(1, min(workers, len(relations)))
+    logger.info(f"Extraindo {len(relations)} relações com {workers} conexões em paralelo...")
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="fb-extract")
+    futures = [executor.submit(worker) for _ in range(workers)]
+    try:
+        for name, _ in relations:
+            with ready:
+                while name not in results and not stop.is_set():
+                    ready.wait()
+                data = results.pop(name, None)
+            if data is None:
+                break
+            yield name, data
+        for future in futures:
+            future.result()
+        if errors:
+            raise errors[0]
+    finally:
+        # Se o consumidor parar antes do fim, os workers encerram na próxima relação
+        stop.set()
+        executor.shutdown(wait=True)
+    log_latency_report(latencies)
+
+def extract_relations_parallel(connect, relations, workers=DEFAULT_WORKERS):
+    """Versão de iter_relations_parallel que retorna ({nome: dados}, {nome: segundos})."""
+    latencies = {}
+    extracted = dict(iter_relations_parallel(connect, relations, workers, latencies))
+    return extracted, latencies
+
+def connect_read_only(db_path, user, password, charset):
+    """Abre uma conexão cuja transação padrão é somente leitura em snapshot."""
+    return fdb.connect(
+        dsn=db_path,
+        user=user,
+        password=password,
+        charset=charset,
+        isolation_level=READ_ONLY_SNAPSHOT_TPB
+    )
+
+def load_json_if_exists(file_path):
+    """Carrega um JSON auxiliar (fingerprints); retorna {} se não existir ou for inválido."""
+    if not os.path.exists(file_path):
+        return {}
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (IOError, json.JSONDecodeError) as e:
+        logger.warning(f"Não foi possível ler {file_path} ({e}); será ignorado.")
+        return {}
+
+def load_previous_schema(file_path):
+    """Abre o esquema da execução anterior para leitura por relação; retorna {} se não houver."""
+    if not os.path.exists(file_path):
+        return {}
+    try:
+        return LazySchema(file_path)
+    except (IOError, ValueError) as e:
+        logger.warning(f"Não foi possível ler {file_path} ({e}); será ignorado.")
+        return {}
+
+def extract_schema(db_path, user, password, charset, mode=DEFAULT_MODE, previous_schema=None,
+                   previous_fingerprints=None, workers=DEFAULT_WORKERS, output_file=OUTPUT_JSON_FILE):
+    """Conecta ao banco Firebird e grava o esquema das tabelas e views de usuário em output_file.
+
+    As relações são gravadas uma por vez, à medida que são extraídas, sem montar o esquema
+    inteiro em memória. Com previous_fingerprints, faz a extração incremental: relações sem
+    alteração são copiadas do arquivo anterior (previous_schema, um LazySchema) sem decodificar.
+    No modo 'parallel', as relações são extraídas por `workers` conexões.
+
+    Returns:
+        Tupla (quantidade de relações, fingerprints, diff em relação a previous_schema) ou None em caso de erro.
+    """
+    previous_schema = previous_schema or {}
+    conn = None
+    try:
+        logger.info(f"Conectando ao banco de dados: {db_path}")
+        conn = connect_read_only(db_path, user, password, charset)
+        cur = conn.cursor()
+        logger.info(f"Conexão bem-sucedida. Extraindo tabelas e views (modo {mode})...")
+
+        def connect():
+            return connect_read_only(db_path, user, password, charset)
+
+        count = 0
+        with SchemaJsonWriter(output_file) as writer:
+            if previous_fingerprints:
+                fingerprints, object_types = fetch_relation_fingerprints(cur)
+                changed = changed_relations(fingerprints, object_types, previous_schema, previous_fingerprints)
+                if mode == "parallel":
+                    extracted, _ = extract_relations_parallel(connect, changed, workers)
+                else:
+                    extracted = extract_relations(cur, changed)
+                diff = SchemaDiffBuilder(previous_schema, candidates=extracted)
+                for name in fingerprints:
+                    if name in extracted:
+                        writer.write(name, extracted[name])
+                    else:
+                        writer.write_raw(name, previous_schema.raw(name), object_types[name])
+                    diff.add(name, extracted.get(name))
+                    count += 1
+            else:
+                diff = SchemaDiffBuilder(previous_schema)
+                if mode == "parallel":
+                    relations = iter_relations_parallel(connect, fetch_relations(cur), workers)
+                else:
+                    relations = iter_schema_from_cursor(cur, mode)
+                for name, data in relations:
+                    writer.write(name, data)
+                    diff.add(name, data)
+                    count += 1
+                # Fingerprints permitem que a próxima execução seja incremental
+                fingerprints, _ = fetch_relation_fingerprints(cur)
+
+        logger.info(f"Extração concluída. Total de tabelas/views encontradas: {count}")
+        return count, fingerprints, diff.result()
 
     except fdb.Error as e:
         logger.error(f"Erro do Firebird: {e}")
@@ -179,19 +591,45 @@ def extract_schema(db_path, user, password, charset):
             conn.close()
             logger.info("Conexão de extração fechada.")
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Extrai o esquema (tabelas, views, colunas e constraints) de um banco Firebird.")
+    parser.add_argument("--mode", choices=["bulk", "per_relation", "parallel"], default=DEFAULT_MODE,
+                        help="'bulk': poucas consultas para o catálogo todo (padrão); 'per_relation': consultas por tabela; "
+                             "'parallel': consultas por tabela distribuídas entre várias conexões.")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help="Conexões simultâneas no modo 'parallel' (padrão: variável FIREBIRD_EXTRACT_WORKERS ou 4).")
+    parser.add_argument("--incremental", action="store_true",
+                        help=f"Reextrai só as relações alteradas desde a última execução (usa {FINGERPRINTS_FILE}).")
+    return parser.parse_args()
+
 def main():
+    args = parse_args()
     try:
         # Solicita a senha de forma segura
         db_password = getpass.getpass(f"Digite a senha para o usuário '{DB_USER}': ")
 
-        schema_data = extract_schema(DB_PATH, DB_USER, db_password, DB_CHARSET)
+        previous_schema = load_previous_schema(OUTPUT_JSON_FILE)
+        previous_fingerprints = None
+        if args.incremental:
+            previous_fingerprints = load_json_if_exists(FINGERPRINTS_FILE)
+            if not previous_schema or not previous_fingerprints:
+                logger.warning(f"Sem {OUTPUT_JSON_FILE}/{FINGERPRINTS_FILE} anteriores; fazendo extração completa.")
+                previous_fingerprints = None
+
+        logger.info(f"Gravando esquema em {OUTPUT_JSON_FILE} à medida que é extraído...")
+        result = extract_schema(DB_PATH, DB_USER, db_password, DB_CHARSET, args.mode,
+                                previous_schema, previous_fingerprints, args.workers)
 
-        if schema_data:
-            logger.info(f"Salvando esquema em {OUTPUT_JSON_FILE}...")
+        if result:
+            _, fingerprints, diff = result
+            logger.info(f"Diferenças: {len(diff['added'])} novos, {len(diff['removed'])} removidos, "
+                        f"{len(diff['altered'])} alterados, {diff['unchanged']} inalterados.")
             try:
-                with open(OUTPUT_JSON_FILE, 'w', encoding='utf-8') as f:
-                    json.dump(schema_data, f, indent=4, ensure_ascii=False)
-                logger.info("Esquema salvo com sucesso.")
+                with open(FINGERPRINTS_FILE, 'w', encoding='utf-8') as f:
+                    json.dump(fingerprints, f, indent=4, ensure_ascii=False)
+                with open(SCHEMA_DIFF_FILE, 'w', encoding='utf-8') as f:
+                    json.dump(diff, f, indent=4, ensure_ascii=False)
+                logger.info(f"Esquema salvo com sucesso (diff em {SCHEMA_DIFF_FILE}).")
             except IOError as e:
                 logger.error(f"Erro ao salvar o arquivo JSON: {e}")
             except Exception as e:
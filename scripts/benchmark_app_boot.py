@@ -0,0 +1,110 @@
+"""
+Benchmark: tempo de inicialização do app.py até a interface estar montada (sem o launch).
+Cada execução é um interpretador novo, num diretório temporário, contra o servidor Ollama falso.
+A verificação do .venv (check_venv) é pulada; todo o resto do app.py roda: dependências,
+importações, migrate(), worker de retenção e montagem do gr.Blocks.
+
+Cenários:
+    legado   FAST_BOOT=0: pip install -r requirements.txt a cada início
+    frio     FAST_BOOT=1 sem carimbo (primeiro início após mudar o requirements.txt): roda o pip
+    quente   FAST_BOOT=1 com carimbo igual ao hash do requirements.txt: pip ignorado
+
+Com o requirements.txt do projeto o pip precisa de rede para o que não estiver instalado; use
+--requirements com um arquivo só com pacotes já instalados para medir sem rede.
+
+Uso:
+    python scripts/benchmark_app_boot.py --runs 5 --requirements requirements.txt
+"""
+
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_ollama_server import FakeOllamaConfig, start_in_background
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(REPO_DIR, "app.py")
+
+# Executa o app.py a partir da verificação de dependências (depois do check_venv)
+BOOT_CODE = """
+import os, sys, uuid, time, platform
+start = time.perf_counter()
+source = open({app!r}, encoding="utf-8").read()
+source = source[source.index("# --- Verificação de Ambiente e Instalação"):]
+scope = {{"__name__": "app_boot", "__file__": {app!r}, "os": os, "sys": sys, "uuid": uuid,
+          "time": time, "platform": platform}}
+exec(compile(source, {app!r}, "exec"), scope)
+ui_ready = time.perf_counter() - start
+registry = scope["model_registry"]
+registry.wait_ready(30)
+print("BOOT", ui_ready, time.perf_counter() - start, len(registry.models()))
+"""
+
+SCENARIOS = [
+    ("legado (pip sempre)", {"FAST_BOOT": "0"}, False),
+    ("frio (sem carimbo)", {"FAST_BOOT": "1"}, False),
+    ("quente (carimbo ok)", {"FAST_BOOT": "1"}, True),
+]
+
+
+def run_once(cwd, env):
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-c", BOOT_CODE.format(app=APP_PATH)], cwd=cwd, env=env,
+                          capture_output=True, text=True)
+    wall = time.perf_counter() - start
+    for line in proc.stdout.splitlines():
+        if line.startswith("BOOT "):
+            _, ui_ready, models_ready, _ = line.split()
+            return wall, float(ui_ready), float(models_ready), None
+    return wall, None, None, (proc.stderr.strip().splitlines() or ["?"])[-1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--requirements", default=os.path.join(REPO_DIR, "requirements.txt"))
+    args = parser.parse_args()
+
+    base_url, server = start_in_background(FakeOllamaConfig(models=("llama3", "phi3:mini")))
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            shutil.copy(args.requirements, os.path.join(tmp, "requirements.txt"))
+            stamp = os.path.join(tmp, "requirements.sha256")
+            env = dict(os.environ, PYTHONPATH=REPO_DIR, OLLAMA_API_URL=f"{base_url}/api/chat",
+                       REQUIREMENTS_STAMP=stamp, HISTORY_RETENTION_DAYS="0")
+            sys.path.insert(0, REPO_DIR)
+            from src.core.bootstrap import write_stamp
+
+            print(f"{'cenário':<22} {'processo (s)':>13} {'UI montada (s)':>15} {'modelos (s)':>12}")
+            for label, overrides, stamped in SCENARIOS:
+                walls, uis, models = [], [], []
+                failed = None
+                for _ in range(args.runs):
+                    if os.path.exists(stamp):
+                        os.remove(stamp)
+                    if stamped:
+                        write_stamp(os.path.join(tmp, "requirements.txt"), stamp)
+                    wall, ui_ready, models_ready, failed = run_once(tmp, dict(env, **overrides))
+                    if failed:
+                        break
+                    walls.append(wall)
+                    uis.append(ui_ready)
+                    models.append(models_ready)
+                if failed:
+                    print(f"{label:<22} falhou: {failed}")
+                    continue
+                print(f"{label:<22} {statistics.median(walls):>13.2f} {statistics.median(uis):>15.2f} "
+                      f"{statistics.median(models):>12.2f}")
+    finally:
+        server.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Benchmark: N sessões de streaming concorrentes, caminho síncrono (thread por sessão) vs assíncrono.
+Sobe um servidor Ollama falso em subprocesso e mede, no processo cliente, threads, tempo de
+parede e CPU para consumir as sessões com chat_completion e achat_completion. Cada caminho faz
+uma sessão de aquecimento antes da medição (criação do pool/SSL e importações tardias não entram).
+
+O ganho do caminho assíncrono é não precisar de uma thread por sessão (memória e limite de
+threads do servidor), não CPU: por token, a pilha httpx/httpcore assíncrona gasta mais CPU que
+requests/urllib3 (neste ambiente, ~2x no padrão de 50 sessões x 100 tokens).
+
+Uso:
+    python scripts/benchmark_async_client.py --sessions 50 --tokens 100
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_ollama_server import FakeOllamaConfig, start_in_background
+
+MESSAGES = [{"role": "user", "content": "Explique o que é uma LLM em uma frase."}]
+
+
+def run_sync(sessions: int) -> dict:
+    from src.ollama_integration.client import chat_completion
+
+    peak_threads = threading.active_count()
+
+    def one_session(_):
+        nonlocal peak_threads
+        peak_threads = max(peak_threads, threading.active_count())
+        return sum(1 for _ in chat_completion(MESSAGES, stream=True) or [])
+
+    one_session(None) # aquecimento
+    with ThreadPoolExecutor(max_workers=sessions) as executor:
+        wall, cpu = time.perf_counter(), time.process_time()
+        chunks = sum(executor.map(one_session, range(sessions)))
+    return {"wall": time.perf_counter() - wall, "cpu": time.process_time() - cpu,
+            "chunks": chunks, "threads": peak_threads}
+
+
+def run_async(sessions: int) -> dict:
+    from src.ollama_integration.async_client import achat_completion, aclose_async_client
+
+    async def one_session():
+        stream = await achat_completion(MESSAGES, stream=True)
+        count = 0
+        if stream:
+            async for _ in stream:
+                count += 1
+        return count
+
+    async def main():
+        try:
+            await one_session() # aquecimento
+            wall, cpu = time.perf_counter(), time.process_time()
+            chunks = sum(await asyncio.gather(*(one_session() for _ in range(sessions))))
+            return {"wall": time.perf_counter() - wall, "cpu": time.process_time() - cpu,
+                    "chunks": chunks, "threads": threading.active_count()}
+        finally:
+            await aclose_async_client()
+
+    return asyncio.run(main())
+
+
+def report(name: str, sessions: int, result: dict) -> None:
+    per_core = sessions / result["cpu"] if result["cpu"] else float("inf")
+    print(f"{name:<8} wall={result['wall']:.2f}s cpu={result['cpu']:.2f}s chunks={result['chunks']} "
+          f"threads={result['threads']} sessões/CPU-s={per_core:.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--tokens", type=int, default=100)
+    parser.add_argument("--token-delay", type=float, default=0.005)
+    args = parser.parse_args()
+
+    base_url, server = start_in_background(FakeOllamaConfig(tokens=args.tokens, token_delay=args.token_delay))
+    os.environ["OLLAMA_API_URL"] = f"{base_url}/api/chat"
+    os.environ["OLLAMA_POOL_SIZE"] = str(args.sessions)
+    try:
+        print(f"{args.sessions} sessões concorrentes, {args.tokens} tokens cada (servidor falso em {base_url})")
+        report("sync", args.sessions, run_sync(args.sessions))
+        report("async", args.sessions, run_async(args.sessions))
+    finally:
+        server.terminate()
+
+
+if __name__ == "__main__":
+    main()
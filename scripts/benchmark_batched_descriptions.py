@@ -0,0 +1,91 @@
+"""
+Benchmark: descrição de colunas em lote vs um prompt por coluna.
+Usa o servidor Ollama falso (custo fixo por requisição + custo por token gerado) e compara
+tempo total e tokens estimados (caracteres/4, prompt + resposta) para uma tabela de N colunas.
+
+Uso:
+    python scripts/benchmark_batched_descriptions.py --columns 60 --batch-sizes 1,10,20,60
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_ollama_server import FakeOllamaConfig, start_in_background
+
+OBJECT_NAME = "PEDIDO_VENDA"
+
+
+def synthetic_columns(count: int):
+    types = ["INTEGER", "VARCHAR(60)", "DATE", "NUMERIC(15,2)", "CHAR(1)"]
+    return [{"name": f"PDV_CAMPO_{i:03d}", "type": types[i % len(types)], "nullable": True} for i in range(count)]
+
+
+def single_prompt(col):
+    return (
+        f"Sugira uma descrição concisa em português brasileiro para a coluna de banco de dados chamada '{col['name']}' "
+        f"do tipo '{col['type']}' que pertence ao objeto '{OBJECT_NAME}'. "
+        f"Foque no significado provável do dado armazenado. Responda apenas com a descrição sugerida."
+    )
+
+
+def run(columns, batch_size: int) -> dict:
+    from src.ollama_integration.client import chat_completion
+    from src.schema.column_batching import describe_columns_batched
+
+    stats = {"requests": 0, "tokens": 0}
+
+    def count(prompt, response):
+        stats["requests"] += 1
+        stats["tokens"] += (len(prompt) + len(response or "")) // 4
+
+    def generate_text(prompt):
+        response = chat_completion([{"role": "user", "content": prompt}], stream=False)
+        count(prompt, response)
+        return response
+
+    def generate_json(prompt, schema, use_cache=True):
+        response = chat_completion([{"role": "user", "content": prompt}], stream=False, response_format=schema)
+        count(prompt, response)
+        return response
+
+    start = time.perf_counter()
+    if batch_size <= 1:
+        described = sum(1 for col in columns if generate_text(single_prompt(col)))
+    else:
+        results, _ = describe_columns_batched(OBJECT_NAME, "TABLE", columns, generate_json, generate_text,
+                                              single_prompt, batch_size=batch_size)
+        described = len(results)
+    stats["wall"] = time.perf_counter() - start
+    stats["described"] = described
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--columns", type=int, default=60)
+    parser.add_argument("--batch-sizes", default="1,10,20,60")
+    parser.add_argument("--request-overhead", type=float, default=0.2, help="Segundos fixos por requisição (prompt eval/agendamento)")
+    parser.add_argument("--token-delay", type=float, default=0.002, help="Segundos por token gerado")
+    args = parser.parse_args()
+
+    base_url, server = start_in_background(FakeOllamaConfig(tokens=12, token_delay=args.token_delay,
+                                                            first_token_delay=args.request_overhead))
+    os.environ["OLLAMA_API_URL"] = f"{base_url}/api/chat"
+    columns = synthetic_columns(args.columns)
+    try:
+        print(f"{args.columns} colunas, {args.request_overhead}s por requisição, {args.token_delay}s por token")
+        for batch_size in (int(b) for b in args.batch_sizes.split(",")):
+            r = run(columns, batch_size)
+            label = "por coluna" if batch_size <= 1 else f"lote={batch_size}"
+            print(f"{label:<11} tempo={r['wall']:.2f}s requisições={r['requests']} tokens≈{r['tokens']} descritas={r['described']}")
+    finally:
+        server.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Benchmark: tempo até o primeiro token (TTFT) ao longo de uma conversa longa.
+Sobe o servidor Ollama falso com atraso de prompt eval proporcional ao tamanho do prompt
+(--prompt-delay-per-char) e simula --turns turnos, comparando o histórico completo reenviado
+a cada turno (comportamento anterior do respond) com a janela de contexto (ContextWindow).
+
+Uso:
+    python scripts/benchmark_context_window.py --turns 200 --budget 2048
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_ollama_server import FakeOllamaConfig, start_in_background
+
+
+def run_conversation(chat_completion, turns: int, build_messages, on_response):
+    """Retorna a lista de TTFT (s) por turno."""
+    ttfts = []
+    for turn in range(turns):
+        user_message = f"Pergunta {turn}: " + "me explique mais sobre o relatório de vendas por filial. " * 3
+        messages = build_messages(user_message)
+        start = time.perf_counter()
+        stream = chat_completion(messages=messages, stream=True)
+        response = ""
+        for chunk in stream or []:
+            if not response:
+                ttfts.append(time.perf_counter() - start)
+            response += chunk
+        on_response(user_message, response)
+    return ttfts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--budget", type=int, default=2048, help="Orçamento de tokens da janela")
+    parser.add_argument("--strategy", default="pinned", choices=["sliding", "pinned", "summary"])
+    parser.add_argument("--prompt-delay-per-char", type=float, default=0.000002)
+    parser.add_argument("--tokens", type=int, default=60)
+    args = parser.parse_args()
+
+    base_url, server = start_in_background(FakeOllamaConfig(
+        tokens=args.tokens, token_delay=0.0, first_token_delay=0.01, prompt_delay_per_char=args.prompt_delay_per_char))
+    os.environ["OLLAMA_API_URL"] = f"{base_url}/api/chat"
+    try:
+        from src.ollama_integration.client import chat_completion
+        from src.core.context_window import ContextWindow, summary_prompt
+
+        # Comportamento anterior: reenvia a conversa inteira
+        history = []
+
+        def full_build(user_message):
+            history.append({"role": "user", "content": user_message})
+            return list(history)
+
+        full = run_conversation(chat_completion, args.turns, full_build,
+                                lambda _, response: history.append({"role": "assistant", "content": response}))
+
+        context = ContextWindow(strategy=args.strategy, system_prompt="Você é um assistente de BI.")
+
+        def window_build(user_message):
+            context.append("user", user_message)
+            return context.build(budget=args.budget)
+
+        def window_response(_, response):
+            context.append("assistant", response)
+            context.update_summary(lambda current, evicted: chat_completion(
+                messages=summary_prompt(current, evicted), stream=False))
+
+        windowed = run_conversation(chat_completion, args.turns, window_build, window_response)
+    finally:
+        server.terminate()
+
+    print(f"{args.turns} turnos, orçamento {args.budget} tokens, estratégia {args.strategy}")
+    print(f"{'turnos':>9} {'TTFT histórico completo (ms)':>30} {'TTFT janela (ms)':>18}")
+    step = max(1, args.turns // 5)
+    for start in range(0, args.turns, step):
+        end = min(args.turns, start + step)
+        print(f"{start + 1:>4}-{end:<4} {statistics.median(full[start:end]) * 1000:>30.1f} "
+              f"{statistics.median(windowed[start:end]) * 1000:>18.1f}")
+    print(f"Tokens da conversa: ~{context.total_tokens}, enviados no último turno: ~{context.window_tokens()}")
+
+
+if __name__ == "__main__":
+    main()
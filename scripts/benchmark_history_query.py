@@ -0,0 +1,99 @@
+"""
+Benchmark: consultas de src.database.history_query antes e depois dos índices/FTS5.
+Popula chat_history com N linhas sintéticas na versão 2 do esquema (sem índices), mede as
+consultas, aplica as migrações 3 e 4 (índices + FTS5) e mede de novo. Os tempos são a mediana
+de --repeat execuções de cada consulta.
+
+Uso:
+    python scripts/benchmark_history_query.py --rows 1000000
+"""
+
+import argparse
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.database import history, history_query
+from src.database.migrations import LATEST_VERSION, migrate
+
+WORDS = ("cliente pedido nota fiscal estoque produto venda compra saldo titulo banco "
+         "pagamento cadastro relatorio filial vendedor comissao frete imposto").split()
+
+
+def populate(conn, rows: int, sessions: int):
+    rnd = random.Random(42)
+    batch = []
+    for i in range(rows):
+        session = f"sessao-{rnd.randrange(sessions)}"
+        words = " ".join(rnd.choice(WORDS) for _ in range(8))
+        # Uma palavra rara a cada 100 mil linhas, para a busca ter poucos resultados
+        rare = f" raro{i // 100000}" if i % 100000 == 0 else ""
+        feedback = rnd.choice((1, -1)) if rnd.random() < 0.05 else None
+        day = 1 + i * 28 // rows
+        batch.append((session, f"2025-01-{day:02d} 12:00:00", f"pergunta {words}{rare}", f"resposta {words}", feedback))
+        if len(batch) == 50000:
+            conn.executemany("INSERT INTO chat_history(session_id, timestamp, user_message, assistant_message, feedback) "
+                             "VALUES (?, ?, ?, ?, ?)", batch)
+            batch.clear()
+    if batch:
+        conn.executemany("INSERT INTO chat_history(session_id, timestamp, user_message, assistant_message, feedback) "
+                         "VALUES (?, ?, ?, ?, ?)", batch)
+    conn.commit()
+
+
+def measure(fn, repeat: int) -> float:
+    fn()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+def run_queries(conn, repeat: int):
+    queries = {
+        "replay de sessão (50)": lambda: history_query.get_session_messages("sessao-123", limit=50, conn=conn),
+        "feedback -1 num dia (100)": lambda: history_query.get_messages_by_feedback(
+            -1, since="2025-01-10", until="2025-01-11", conn=conn),
+        "recentes (50)": lambda: history_query.get_recent_messages(50, conn=conn),
+        "busca 'raro3'": lambda: history_query.search_messages("raro3", conn=conn),
+    }
+    return {label: measure(fn, repeat) for label, fn in queries.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--sessions", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        history.DB_FILE = os.path.join(tmp, "chat_history.db")
+        conn = history.get_db_connection()
+        migrate(conn, target=2)
+        start = time.perf_counter()
+        populate(conn, args.rows, args.sessions)
+        print(f"{args.rows} linhas inseridas em {time.perf_counter() - start:.1f}s")
+
+        before = run_queries(conn, args.repeat)
+        start = time.perf_counter()
+        migrate(conn, target=LATEST_VERSION)
+        print(f"Migrações 3-{LATEST_VERSION} (índices + FTS5) em {time.perf_counter() - start:.1f}s")
+        after = run_queries(conn, args.repeat)
+
+        for label in before:
+            print(f"{label:<28} sem índices: {before[label]:9.3f} ms   com índices/FTS5: {after[label]:7.3f} ms")
+        history.close_all_connections()
+
+
+if __name__ == "__main__":
+    main()
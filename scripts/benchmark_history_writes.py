@@ -0,0 +1,143 @@
+"""
+Benchmark: gravação concorrente do histórico de chat (chat_history.db).
+Simula N sessões Gradio simultâneas, cada uma salvando turnos (save_chat_message) e parte
+deles recebendo feedback (update_feedback). Compara a versão anterior (conexão aberta e
+fechada a cada chamada, journal padrão) com a conexão por thread em WAL de src.database.history
+e com o escritor em segundo plano (HistoryWriter), que grava em lotes. No write-behind a latência
+é a do turno (enfileirar); o tempo total inclui esperar a fila esvaziar.
+
+Uso:
+    python scripts/benchmark_history_writes.py --sessions 50 --turns 40
+"""
+
+import argparse
+import logging
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def legacy_save(db_file, user_message, assistant_message, session_id):
+    """Cópia do comportamento antigo: conecta, grava, faz commit e fecha a cada turno."""
+    conn = sqlite3.connect(db_file)
+    conn.row_factory = sqlite3.Row
+    logging.info(f"Conexão com o banco de dados {db_file} estabelecida.")
+    try:
+        cursor = conn.cursor()
+        cursor.execute("INSERT INTO chat_history(user_message, assistant_message, session_id) VALUES(?,?,?)",
+                       (user_message, assistant_message, session_id))
+        conn.commit()
+        return cursor.lastrowid
+    except sqlite3.Error as e:
+        logging.error(f"Erro ao salvar mensagem no histórico: {e}")
+        return None
+    finally:
+        conn.close()
+
+
+def legacy_feedback(db_file, message_id, value):
+    conn = sqlite3.connect(db_file)
+    try:
+        conn.execute("UPDATE chat_history SET feedback = ? WHERE id = ?", (value, message_id))
+        conn.commit()
+    except sqlite3.Error as e:
+        logging.error(f"Erro ao atualizar feedback para mensagem ID {message_id}: {e}")
+    finally:
+        conn.close()
+
+
+def run_sessions(sessions, turns, save, feedback, drain=None):
+    latencies = []
+    lock = threading.Lock()
+    failures = [0]
+    barrier = threading.Barrier(sessions)
+
+    def session(n):
+        rnd = random.Random(n)
+        barrier.wait()
+        for turn in range(turns):
+            start = time.perf_counter()
+            message_id = save(f"pergunta {turn} da sessão {n}", "resposta " * 40, f"sessao-{n}")
+            if message_id is None:
+                with lock:
+                    failures[0] += 1
+            elif rnd.random() < 0.3:
+                feedback(message_id, rnd.choice((1, -1)))
+            with lock:
+                latencies.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=session, args=(n,)) for n in range(sessions)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if drain is not None:
+        drain()
+    wall = time.perf_counter() - start
+    latencies.sort()
+    return wall, latencies, failures[0]
+
+
+def report(label, sessions, turns, result):
+    wall, latencies, failures = result
+    p50 = latencies[len(latencies) // 2] * 1000
+    p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000
+    print(f"{label:<22} {sessions * turns / wall:8.0f} turnos/s  p50={p50:.2f}ms p99={p99:.2f}ms falhas={failures}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--turns", type=int, default=40)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Mantém qualquer chat_history.db criado por engano fora do repositório
+        os.chdir(tmp)
+        from src.database import history
+
+        legacy_db = os.path.join(tmp, "legacy.db")
+        history.DB_FILE = legacy_db
+        history.init_db()
+        history.close_all_connections()
+        with sqlite3.connect(legacy_db) as conn:
+            conn.execute("PRAGMA journal_mode=DELETE")
+        legacy = run_sessions(args.sessions, args.turns,
+                              lambda u, a, s: legacy_save(legacy_db, u, a, s),
+                              lambda i, v: legacy_feedback(legacy_db, i, v))
+
+        history.DB_FILE = os.path.join(tmp, "pooled.db")
+        history.init_db()
+        pooled = run_sessions(args.sessions, args.turns, history.save_chat_message, history.update_feedback)
+        history.close_all_connections()
+
+        from src.database.history_writer import HistoryWriter
+        history.DB_FILE = os.path.join(tmp, "write_behind.db")
+        history.init_db()
+        writer = HistoryWriter()
+        write_behind = run_sessions(args.sessions, args.turns, writer.submit, writer.submit_feedback, drain=writer.flush)
+        metrics = writer.metrics()
+        writer.close()
+        with sqlite3.connect(history.DB_FILE) as conn:
+            rows = conn.execute("SELECT COUNT(*), COUNT(feedback) FROM chat_history").fetchone()
+        history.close_all_connections()
+
+        print(f"{args.sessions} sessões x {args.turns} turnos (30% com feedback)")
+        report("conexão por chamada", args.sessions, args.turns, legacy)
+        report("conexão por thread+WAL", args.sessions, args.turns, pooled)
+        report("write-behind em lotes", args.sessions, args.turns, write_behind)
+        print(f"  lotes={metrics['batches']} maior={metrics['max_batch']} "
+              f"commit p50={metrics['flush_ms_p50']:.2f}ms p99={metrics['flush_ms_p99']:.2f}ms "
+              f"fila→commit p99={metrics['wait_ms_p99']:.2f}ms linhas={rows[0]} feedbacks={rows[1]}")
+
+
+if __name__ == "__main__":
+    main()
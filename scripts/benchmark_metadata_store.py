@@ -0,0 +1,70 @@
+"""
+Benchmark: custo de salvar uma edição nos metadados.
+Compara regravar schema_metadata.json inteiro (json.dump indent=4, como o anotador fazia) com
+gravar só o campo alterado no MetadataStore (SQLite, uma transação por salvamento).
+
+Uso:
+    python scripts/benchmark_metadata_store.py --objects 3000 --columns 30 --saves 50
+"""
+
+import argparse
+import copy
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.schema.metadata_store import MetadataStore, diff_metadata
+
+
+def synthetic_metadata(objects: int, columns: int):
+    metadata = {"TABLES": {}, "VIEWS": {}, "_GLOBAL_CONTEXT": "Contexto da empresa."}
+    for i in range(objects):
+        section = "VIEWS" if i % 10 == 9 else "TABLES"
+        metadata[section][f"T{i:05d}_OBJ"] = {
+            "description": f"Objeto {i}",
+            "COLUMNS": {f"T{i:05d}_CAMPO_{c:02d}": {"description": f"Campo {c} do objeto {i}", "value_mapping_notes": ""}
+                        for c in range(columns)},
+        }
+    return metadata
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--objects", type=int, default=3000)
+    parser.add_argument("--columns", type=int, default=30)
+    parser.add_argument("--saves", type=int, default=50)
+    args = parser.parse_args()
+
+    metadata = synthetic_metadata(args.objects, args.columns)
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = os.path.join(tmp, "schema_metadata.json")
+        start = time.perf_counter()
+        for n in range(args.saves):
+            metadata["TABLES"]["T00000_OBJ"]["COLUMNS"]["T00000_CAMPO_00"]["description"] = f"Edição {n}"
+            with open(json_path, "w", encoding="utf-8") as f:
+                json.dump(metadata, f, indent=4, ensure_ascii=False)
+        json_ms = (time.perf_counter() - start) / args.saves * 1000
+
+        store = MetadataStore(os.path.join(tmp, "schema_metadata.db"))
+        store.import_json(metadata)
+        baseline = {"TABLES": {"T00000_OBJ": store.get_object("TABLES", "T00000_OBJ")}}
+        start = time.perf_counter()
+        for n in range(args.saves):
+            current = copy.deepcopy(baseline)
+            current["TABLES"]["T00000_OBJ"]["COLUMNS"]["T00000_CAMPO_00"]["description"] = f"Edição store {n}"
+            store.apply_changes(diff_metadata(baseline, current))
+            baseline = current
+        store_ms = (time.perf_counter() - start) / args.saves * 1000
+        store.close()
+
+        print(f"{args.objects} objetos x {args.columns} colunas ({os.path.getsize(json_path) / 1024 / 1024:.1f} MiB em JSON)")
+        print(f"JSON completo: {json_ms:.2f} ms por salvamento")
+        print(f"MetadataStore: {store_ms:.2f} ms por salvamento")
+
+
+if __name__ == "__main__":
+    main()
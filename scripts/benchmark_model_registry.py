@@ -0,0 +1,75 @@
+"""
+Benchmark: quanto a lista de modelos custa a quem a pede, com o Ollama rápido, lento e fora do ar.
+Compara a busca direta ao /api/tags (o que get_available_models fazia a cada chamada, inclusive
+na importação do app.py) com o ModelRegistry (cache com TTL e atualização em segundo plano).
+
+Uso:
+    python scripts/benchmark_model_registry.py --calls 200 --tags-delay 2
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_ollama_server import FakeOllamaConfig, start_in_background
+
+
+def timed_calls(fn, calls: int):
+    """Retorna (latências em ms, último resultado)."""
+    latencies, result = [], None
+    for _ in range(calls):
+        start = time.perf_counter()
+        result = fn()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies, result
+
+
+def report(label: str, latencies, result):
+    names = [model.name for model in result] if result else result
+    print(f"{label:<34} primeira {latencies[0]:>8.1f} ms  mediana {statistics.median(latencies):>8.3f} ms  "
+          f"resultado: {names}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--tags-delay", type=float, default=2.0, help="Atraso do /api/tags no cenário lento (s)")
+    args = parser.parse_args()
+
+    fast_url, fast_server = start_in_background(FakeOllamaConfig(models=("llama3", "phi3:mini")))
+    slow_url, slow_server = start_in_background(FakeOllamaConfig(models=("llama3", "phi3:mini"), tags_delay=args.tags_delay))
+    try:
+        import src.ollama_integration.model_registry as model_registry
+
+        for label, base_url, calls in (("rápido", fast_url, args.calls), ("lento", slow_url, 3)):
+            model_registry.OLLAMA_TAGS_URL = f"{base_url}/api/tags"
+            report(f"{label}: busca a cada chamada", *timed_calls(model_registry.fetch_models, calls))
+            registry = model_registry.ModelRegistry(ttl=60).start()
+            report(f"{label}: registro (cache)", *timed_calls(registry.models, calls))
+            registry.wait_ready(args.tags_delay + 5)
+            report(f"{label}: registro, após 1ª busca", *timed_calls(registry.models, calls))
+            registry.stop(1)
+
+        # Ollama fora do ar depois da primeira busca: a lista anterior continua sendo servida
+        model_registry.OLLAMA_TAGS_URL = f"{fast_url}/api/tags"
+        registry = model_registry.ModelRegistry(ttl=0.2, retry=0.2).start()
+        registry.wait_ready(5)
+        fast_server.terminate()
+        fast_server.join()
+        time.sleep(0.5)
+        report("fora do ar: busca a cada chamada", *timed_calls(model_registry.fetch_models, 3))
+        report("fora do ar: registro", *timed_calls(registry.models, args.calls))
+        print(f"Estado do registro: {registry.status()}")
+        registry.stop(1)
+    finally:
+        fast_server.terminate()
+        slow_server.terminate()
+
+
+if __name__ == "__main__":
+    main()
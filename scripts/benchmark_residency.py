@@ -0,0 +1,92 @@
+"""
+Benchmark: tempo até o primeiro token (TTFT) de requisições espaçadas, com e sem o gerenciador de residência.
+O servidor Ollama falso descarrega um modelo após --server-keep-alive segundos sem uso quando a
+requisição não manda keep_alive (o Ollama real usa 5 minutos) e leva --load-delay para carregá-lo.
+As requisições são separadas por --idle segundos, mais que o keep_alive do servidor.
+
+Cenários (cada um usa um modelo diferente, para começar descarregado):
+    sem keep_alive     comportamento anterior: cada requisição após o ocioso recarrega o modelo
+    residência         keep_alive (OLLAMA_KEEP_ALIVE) em cada requisição + pré-carga na inicialização
+    quente             referência: requisições seguidas, modelo já carregado
+
+Uso:
+    python scripts/benchmark_residency.py --requests 8 --idle 1.5 --load-delay 1.0
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_ollama_server import FakeOllamaConfig, start_in_background
+
+
+def ttft(chat_completion, model: str) -> float:
+    start = time.perf_counter()
+    first = None
+    for _ in chat_completion(messages=[{"role": "user", "content": "Qual o faturamento por filial?"}],
+                             model=model, stream=True) or []:
+        if first is None:
+            first = time.perf_counter() - start
+    return first if first is not None else float("nan")
+
+
+def run(chat_completion, model: str, requests: int, idle: float):
+    samples = []
+    for i in range(requests):
+        if i and idle:
+            time.sleep(idle)
+        samples.append(ttft(chat_completion, model))
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=8)
+    parser.add_argument("--idle", type=float, default=1.5, help="Segundos entre requisições")
+    parser.add_argument("--load-delay", type=float, default=1.0, help="Tempo de carregamento de um modelo (s)")
+    parser.add_argument("--server-keep-alive", type=float, default=1.0, help="keep_alive padrão do servidor (s)")
+    args = parser.parse_args()
+
+    base_url, server = start_in_background(FakeOllamaConfig(
+        tokens=20, token_delay=0.0, first_token_delay=0.02, load_delay=args.load_delay,
+        default_keep_alive=args.server_keep_alive, models=("llama3", "phi3", "mistral")))
+    os.environ["OLLAMA_API_URL"] = f"{base_url}/api/chat"
+    os.environ["OLLAMA_RECENT_MODELS_FILE"] = os.path.join(tempfile.mkdtemp(), "recent_models.json")
+    try:
+        import src.ollama_integration.residency as residency
+        from src.ollama_integration.client import chat_completion
+
+        results = []
+        residency.DEFAULT_KEEP_ALIVE = None
+        results.append(("sem keep_alive", run(chat_completion, "llama3", args.requests, args.idle)))
+
+        residency.DEFAULT_KEEP_ALIVE = "10m"
+        manager = residency.get_residency_manager()
+        manager.preload("phi3") # o que start() faz com o modelo padrão na inicialização do app
+        results.append(("residência", run(chat_completion, "phi3", args.requests, args.idle)))
+        results.append(("quente", run(chat_completion, "phi3", args.requests, 0)))
+
+        manager.refresh()
+        print(f"Modelos carregados (/api/ps): {manager.hot_models()}")
+        print(f"Aviso ao trocar para 'mistral': {manager.switch_warning('mistral')}")
+        time.sleep(args.load_delay + 0.5) # a troca já dispara o carregamento em segundo plano
+        manager.refresh()
+        print(f"Depois da troca (/api/ps): {manager.hot_models()}")
+    finally:
+        server.terminate()
+
+    print(f"{'cenário':<16} {'TTFT p50 (ms)':>14} {'p99 (ms)':>10} {'máx (ms)':>10}")
+    for label, samples in results:
+        ordered = sorted(samples)
+        p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+        print(f"{label:<16} {statistics.median(ordered) * 1000:>14.1f} {p99 * 1000:>10.1f} {ordered[-1] * 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Benchmark: tamanho do chat_history.db e latência de inserção ao longo de meses de uso.
+Simula --days dias de tráfego (com relógio simulado), gravando as mesmas interações em dois
+bancos: um sem retenção e outro com a rodada de retenção diária (src.database.retention),
+mantendo --hot-days dias no banco principal. A latência é a de inserções unitárias com commit,
+como o chat faz, medida no banco com retenção.
+
+Uso:
+    python scripts/benchmark_retention.py --days 180 --rows-per-day 1000 --hot-days 30
+"""
+
+import argparse
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.database import history, retention
+from src.database.migrations import migrate
+
+SQL_INSERT = "INSERT INTO chat_history(session_id, timestamp, user_message, assistant_message) VALUES (?, ?, ?, ?)"
+
+
+def db_size(path):
+    return sum(os.path.getsize(path + s) for s in ("", "-wal") if os.path.exists(path + s))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=180)
+    parser.add_argument("--rows-per-day", type=int, default=1000)
+    parser.add_argument("--hot-days", type=int, default=30)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    rnd = random.Random(7)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        plain_path = os.path.join(tmp, "sem_retencao.db")
+        plain = history._open_connection(plain_path)
+        migrate(plain)
+        history.DB_FILE = os.path.join(tmp, "chat_history.db")
+        conn = history.get_db_connection()
+        migrate(conn)
+        policy = retention.RetentionPolicy(args.hot_days, os.path.join(tmp, "arquivo"))
+
+        start_day = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        print(f"{'dia':>4} {'linhas quentes':>15} {'banco (MiB)':>12} {'arquivos (MiB)':>15} "
+              f"{'sem retenção (MiB)':>19} {'insert p99 (ms)':>16} {'retenção (s)':>13}")
+        for day in range(args.days):
+            now = start_day + timedelta(days=day)
+            latencies = []
+            for n in range(args.rows_per_day):
+                ts = (now + timedelta(seconds=n * 86400 // args.rows_per_day)).strftime("%Y-%m-%d %H:%M:%S")
+                params = (f"sessao-{rnd.randrange(500)}", ts, "pergunta " * rnd.randint(5, 30), "resposta " * rnd.randint(20, 80))
+                started = time.perf_counter()
+                conn.execute(SQL_INSERT, params)
+                conn.commit()
+                latencies.append(time.perf_counter() - started)
+                plain.execute(SQL_INSERT, params)
+            plain.commit()
+
+            started = time.perf_counter()
+            retention.archive_old_rows(policy, conn, now=now + timedelta(days=1))
+            retention.incremental_vacuum(conn)
+            retention_s = time.perf_counter() - started
+
+            if day % 30 == 29 or day == args.days - 1:
+                latencies.sort()
+                hot_rows = conn.execute("SELECT COUNT(*) FROM chat_history").fetchone()[0]
+                archived = sum(db_size(p) for p in retention.list_archives(policy.archive_dir))
+                print(f"{day + 1:>4} {hot_rows:>15} {db_size(history.DB_FILE) / 2**20:>12.1f} {archived / 2**20:>15.1f} "
+                      f"{db_size(plain_path) / 2**20:>19.1f} {latencies[int(len(latencies) * 0.99)] * 1000:>16.3f} "
+                      f"{retention_s:>13.2f}")
+
+        replay = retention.get_session_messages_all("sessao-1", conn=conn, archive_dir=policy.archive_dir)
+        print(f"Replay de sessao-1 (banco + arquivos): {len(replay)} interações, "
+              f"{len({r['timestamp'][:7] for r in replay})} meses")
+        plain.close()
+        history.close_all_connections()
+
+
+if __name__ == "__main__":
+    main()
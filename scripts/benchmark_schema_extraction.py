@@ -0,0 +1,187 @@
+"""
+Benchmark: extração do esquema em lote vs por relação (N+1 consultas).
+Usa um cursor falso que responde às consultas do catálogo a partir de um catálogo sintético,
+conta as idas ao servidor (execute) e simula a latência de rede de cada uma.
+Também confere que os dois modos geram exatamente o mesmo JSON e mede a extração incremental
+depois de alterar --altered relações (uma coluna nova em cada). O modo paralelo usa uma conexão
+falsa por worker, com --workers conexões.
+
+Uso:
+    python scripts/benchmark_schema_extraction.py --relations 500 --columns 25 --rtt-ms 2 --altered 5 --workers 1,4,8
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from extract_firebird_schema import (extract_relations_parallel, extract_schema_from_cursor, extract_schema_incremental,
+                                     fetch_relation_fingerprints, fetch_relations, percentile)
+
+
+def _char31(name):
+    """Nomes do catálogo Firebird vêm como CHAR(31), com espaços à direita."""
+    return name.ljust(31)
+
+
+def synthetic_catalog(relations: int, columns: int, seed: int = 42):
+    """Gera relações, colunas, constraints e segmentos de índice no formato das tabelas RDB$."""
+    rnd = random.Random(seed)
+    types = [(8, 0, 4, 0, 0), (37, 0, 60, 0, 0), (12, 0, 4, 0, 0), (16, 1, 8, 15, -2), (14, 0, 1, 0, 0), (261, 1, 8, 0, 0)]
+    catalog = {"relations": [], "fields": {}, "constraints": {}, "segments": {}, "formats": {}}
+    names = [f"T{i:04d}_OBJ" for i in range(relations)]
+    for i, name in enumerate(names):
+        is_view = i % 10 == 9
+        catalog["relations"].append({"RDB$RELATION_NAME": _char31(name), "RDB$VIEW_BLR": b"blr" if is_view else None})
+        catalog["formats"][name] = 1
+        fields = []
+        for c in range(columns):
+            ftype, subtype, length, precision, scale = types[(i + c) % len(types)]
+            fields.append({
+                "FIELD_NAME": _char31(f"T{i:04d}_CAMPO_{c:02d}"),
+                "FIELD_SOURCE": _char31("DM_CODIGO" if c == 0 else f"RDB${i * columns + c}"),
+                "FIELD_TYPE": ftype, "FIELD_SUB_TYPE": subtype, "FIELD_LENGTH": length,
+                "FIELD_PRECISION": precision, "FIELD_SCALE": scale, "NULLABLE": c % 3,
+            })
+        catalog["fields"][name] = fields
+        if is_view:
+            continue
+        constraints = [("PK_" + name, "PRIMARY KEY", "PK_IDX_" + name, [fields[0]["FIELD_NAME"]], None)]
+        if i:
+            target = names[rnd.randrange(i)]
+            constraints.append(("FK_" + name, "FOREIGN KEY", "FK_IDX_" + name, [fields[1]["FIELD_NAME"]], target))
+        constraints.append(("NN_" + name, "NOT NULL", None, [], None))
+        rows = []
+        for cname, ctype, index, segs, target in sorted(constraints):
+            rows.append({
+                "CONSTRAINT_NAME": _char31(cname), "CONSTRAINT_TYPE": ctype.ljust(11), "INDEX_NAME": _char31(index) if index else None,
+                "FK_UPDATE_RULE": _char31("CASCADE") if target else None, "FK_DELETE_RULE": None,
+                "FK_TARGET_TABLE": _char31(target) if target else None,
+            })
+            if index:
+                catalog["segments"][index] = segs
+        catalog["constraints"][name] = rows
+    return catalog
+
+
+class FakeCursor:
+    """Cursor compatível com fdb (execute/fetchallmap) que responde às consultas do extrator."""
+
+    def __init__(self, catalog, rtt: float):
+        self.catalog = catalog
+        self.rtt = rtt
+        self.executes = 0
+        self._rows = []
+
+    def execute(self, sql, params=()):
+        self.executes += 1
+        if self.rtt:
+            time.sleep(self.rtt)
+        catalog = self.catalog
+        if "AS FORMAT" in sql:
+            self._rows = [{"RELATION_NAME": r["RDB$RELATION_NAME"], "FORMAT": catalog["formats"][r["RDB$RELATION_NAME"].strip()],
+                           "OBJECT_TYPE": "TABLE" if r["RDB$VIEW_BLR"] is None else "VIEW "} for r in catalog["relations"]]
+        elif "RDB$VIEW_BLR" in sql:
+            self._rows = list(catalog["relations"])
+        elif "AS FIELD_POSITION" in sql:
+            self._rows = [dict(f, RELATION_NAME=_char31(rel), FIELD_POSITION=pos)
+                          for rel in sorted(catalog["fields"]) for pos, f in enumerate(catalog["fields"][rel])]
+        elif "rf.RDB$RELATION_NAME AS RELATION_NAME" in sql:
+            self._rows = [dict(f, RELATION_NAME=_char31(rel)) for rel in sorted(catalog["fields"]) for f in catalog["fields"][rel]]
+        elif "FROM RDB$RELATION_FIELDS" in sql:
+            self._rows = list(catalog["fields"].get(params[0], []))
+        elif "rc.RDB$RELATION_NAME AS RELATION_NAME" in sql and "FK_TARGET_TABLE" not in sql:
+            self._rows = [{"RELATION_NAME": _char31(rel), "CONSTRAINT_NAME": r["CONSTRAINT_NAME"], "CONSTRAINT_TYPE": r["CONSTRAINT_TYPE"]}
+                          for rel in sorted(catalog["constraints"]) for r in catalog["constraints"][rel]]
+        elif "rc.RDB$RELATION_NAME AS RELATION_NAME" in sql:
+            self._rows = [dict(r, RELATION_NAME=_char31(rel)) for rel in sorted(catalog["constraints"]) for r in catalog["constraints"][rel]]
+        elif "FROM RDB$RELATION_CONSTRAINTS" in sql:
+            self._rows = list(catalog["constraints"].get(params[0], []))
+        elif "ix.RDB$INDEX_NAME AS INDEX_NAME" in sql:
+            self._rows = [{"INDEX_NAME": _char31(index), "FIELD_NAME": seg}
+                          for index in sorted(catalog["segments"]) for seg in catalog["segments"][index]]
+        elif "FROM RDB$INDEX_SEGMENTS" in sql:
+            self._rows = [{"FIELD_NAME": seg} for seg in catalog["segments"].get(params[0], [])]
+        else:
+            raise ValueError(f"Consulta inesperada: {sql}")
+
+    def fetchallmap(self):
+        rows, self._rows = self._rows, []
+        return rows
+
+
+class FakeConnection:
+    def __init__(self, catalog, rtt: float):
+        self._cursor = FakeCursor(catalog, rtt)
+
+    def cursor(self):
+        return self._cursor
+
+    def close(self):
+        pass
+
+
+def run(catalog, mode: str, rtt: float):
+    cur = FakeCursor(catalog, rtt)
+    start = time.perf_counter()
+    schema = extract_schema_from_cursor(cur, mode)
+    return schema, cur.executes, time.perf_counter() - start
+
+
+def alter_relations(catalog, count: int):
+    """Simula um ALTER TABLE ADD em count relações: coluna nova e RDB$FORMAT incrementado."""
+    for name in sorted(catalog["fields"])[:count]:
+        fields = catalog["fields"][name]
+        fields.append(dict(fields[-1], FIELD_NAME=_char31(f"{name[:5]}NOVO_CAMPO")))
+        catalog["formats"][name] += 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--relations", type=int, default=500)
+    parser.add_argument("--columns", type=int, default=25)
+    parser.add_argument("--rtt-ms", type=float, default=2.0, help="Latência simulada por consulta (ms)")
+    parser.add_argument("--altered", type=int, default=5, help="Relações alteradas antes da execução incremental")
+    parser.add_argument("--workers", default="1,4,8", help="Conexões simultâneas a medir no modo paralelo")
+    args = parser.parse_args()
+
+    import logging
+    logging.getLogger("extract_firebird_schema").setLevel(logging.WARNING)
+
+    catalog = synthetic_catalog(args.relations, args.columns)
+    print(f"{args.relations} relações, {args.columns} colunas cada, {args.rtt_ms} ms por consulta")
+    outputs = {}
+    for mode in ("per_relation", "bulk"):
+        schema, executes, wall = run(catalog, mode, args.rtt_ms / 1000)
+        outputs[mode] = json.dumps(schema, indent=4, ensure_ascii=False)
+        print(f"{mode:<13} consultas={executes:<6} tempo={wall:.3f}s")
+    print("JSON idêntico:", outputs["per_relation"] == outputs["bulk"])
+
+    relations = fetch_relations(FakeCursor(catalog, 0))
+    for workers in (int(w) for w in args.workers.split(",")):
+        start = time.perf_counter()
+        schema, latencies = extract_relations_parallel(lambda: FakeConnection(catalog, args.rtt_ms / 1000), relations, workers)
+        wall = time.perf_counter() - start
+        values = sorted(latencies.values())
+        print(f"{'parallel x' + str(workers):<13} tempo={wall:.3f}s p50={percentile(values, 50) * 1000:.1f}ms "
+              f"p99={percentile(values, 99) * 1000:.1f}ms igual={json.dumps(schema, indent=4, ensure_ascii=False) == outputs['bulk']}")
+
+    previous = json.loads(outputs["bulk"])
+    fingerprints, _ = fetch_relation_fingerprints(FakeCursor(catalog, 0))
+    alter_relations(catalog, args.altered)
+    cur = FakeCursor(catalog, args.rtt_ms / 1000)
+    start = time.perf_counter()
+    schema, _, diff = extract_schema_incremental(cur, previous, fingerprints)
+    wall = time.perf_counter() - start
+    full, _, _ = run(catalog, "bulk", 0)
+    print(f"{'incremental':<13} consultas={cur.executes:<6} tempo={wall:.3f}s "
+          f"alterados={len(diff['altered'])} novos={len(diff['added'])} removidos={len(diff['removed'])}")
+    print("Incremental igual à extração completa:", json.dumps(schema) == json.dumps(full))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Benchmark: memória e tempo para abrir firebird_schema.json e selecionar uma tabela.
+Compara json.load do arquivo inteiro com o LazySchema (índice de offsets) e a gravação com
+json.dump de um dict completo com o SchemaJsonWriter alimentado relação a relação.
+Os tempos são medidos com tracemalloc ativo, que deixa código Python puro bem mais lento.
+
+Uso:
+    python scripts/benchmark_schema_json.py --relations 5000 --columns 40
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.schema.json_stream import SchemaJsonWriter, LazySchema, index_path_for
+
+
+def synthetic_relation(i: int, columns: int):
+    return {
+        "object_type": "VIEW" if i % 10 == 9 else "TABLE",
+        "columns": [
+            {"name": f"T{i:05d}_CAMPO_{c:02d}", "type": "VARCHAR(60)", "nullable": True, "domain": f"RDB${i * columns + c}"}
+            for c in range(columns)
+        ],
+        "constraints": {"primary_key": [{"name": f"PK_T{i:05d}", "columns": [f"T{i:05d}_CAMPO_00"]}]},
+    }
+
+
+def iter_relations(relations: int, columns: int):
+    for i in range(relations):
+        yield f"T{i:05d}_OBJ", synthetic_relation(i, columns)
+
+
+def measure(label: str, fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    fn()
+    wall = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<34} tempo={wall:.3f}s pico={peak / 1024 / 1024:.1f} MiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--relations", type=int, default=5000)
+    parser.add_argument("--columns", type=int, default=40)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "firebird_schema.json")
+        target = f"T{args.relations // 2:05d}_OBJ"
+
+        def dump_full():
+            schema = dict(iter_relations(args.relations, args.columns))
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(schema, f, indent=4, ensure_ascii=False)
+
+        def write_streaming():
+            with SchemaJsonWriter(path) as writer:
+                for name, data in iter_relations(args.relations, args.columns):
+                    writer.write(name, data)
+
+        measure("gravação: dict + json.dump", dump_full)
+        reference = open(path, "rb").read()
+        measure("gravação: SchemaJsonWriter", write_streaming)
+        print(f"Arquivo: {os.path.getsize(path) / 1024 / 1024:.1f} MiB, idêntico: {open(path, 'rb').read() == reference}")
+
+        def load_full():
+            with open(path, "r", encoding="utf-8") as f:
+                schema = json.load(f)
+            return schema[target]["columns"]
+
+        measure("abrir + tabela: json.load", load_full)
+        measure("abrir + tabela: LazySchema", lambda: LazySchema(path)[target]["columns"])
+        os.remove(index_path_for(path))
+        measure("abrir + tabela: LazySchema (sem .idx)", lambda: LazySchema(path)[target]["columns"])
+
+
+if __name__ == "__main__":
+    main()
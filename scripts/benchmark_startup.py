@@ -0,0 +1,121 @@
+"""
+Benchmark: tempo de inicialização ligado ao banco de histórico.
+Cada cenário roda num interpretador novo (subprocess), num diretório temporário, e mede o tempo
+total do processo (mediana de --runs execuções). Também informa o custo de importação do próprio
+src.database.history (-X importtime) e se algum cenário de leitura criou/alterou o banco.
+
+O app.py completo não entra: ele exige o .venv e roda pip install antes de tudo. O cenário
+"app.py: banco" reproduz a parte de banco da inicialização dele (importar history,
+history_writer e migrations e chamar migrate()). "legado" repete o que a importação de
+history fazia antes: conectar, CREATE TABLE e tentar o ALTER TABLE a cada processo.
+
+Uso:
+    python scripts/benchmark_startup.py --runs 10
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+LEGACY_INIT = """
+import sqlite3
+conn = sqlite3.connect("chat_history.db")
+conn.execute('''CREATE TABLE IF NOT EXISTS chat_history (id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT, timestamp DATETIME DEFAULT CURRENT_TIMESTAMP, user_message TEXT NOT NULL,
+    assistant_message TEXT NOT NULL, feedback INTEGER DEFAULT NULL)''')
+try:
+    conn.execute("ALTER TABLE chat_history ADD COLUMN feedback INTEGER DEFAULT NULL")
+except sqlite3.OperationalError:
+    pass
+conn.commit()
+conn.close()
+"""
+
+APP_DB_STARTUP = """
+import src.database.history, src.database.history_writer
+from src.database.migrations import migrate
+migrate()
+"""
+
+SCENARIOS = [
+    ("import src.database.history", ["-c", "import src.database.history"], None),
+    ("legado: import + init_db", ["-c", "import src.database.history\n" + LEGACY_INIT], None),
+    ("app.py: banco", ["-c", APP_DB_STARTUP], None),
+    ("check_db.py", [os.path.join(REPO_DIR, "check_db.py")], None),
+    ("inspect_tables.py", ["-m", "src.database.inspect_tables"], "3\n"),
+]
+
+
+def run_once(args, cwd, stdin):
+    env = dict(os.environ, PYTHONPATH=REPO_DIR)
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, *args], cwd=cwd, env=env, input=stdin,
+                          capture_output=True, text=True)
+    return time.perf_counter() - start, proc
+
+
+def history_import_us(cwd):
+    """Tempo próprio e acumulado (µs) de src.database.history, com as dependências da stdlib já carregadas."""
+    code = "import sqlite3, logging, random, atexit, threading\nimport src.database.history"
+    _, proc = run_once(["-X", "importtime", "-c", code], cwd, None)
+    for line in proc.stderr.splitlines():
+        if line.rstrip().endswith("| src.database.history"):
+            self_us, cumulative_us, _ = line.split(":", 1)[1].split("|")
+            return int(self_us), int(cumulative_us)
+    return None
+
+
+def db_state(path):
+    if not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    # Garante .pyc atualizados para não medir compilação
+    subprocess.run([sys.executable, "-m", "compileall", "-q", os.path.join(REPO_DIR, "src"),
+                    os.path.join(REPO_DIR, "check_db.py")], check=False)
+    baseline = statistics.median(run_once(["-c", "pass"], REPO_DIR, None)[0] for _ in range(args.runs))
+    print(f"Interpretador vazio: {baseline * 1000:.1f} ms (descontado abaixo)")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        timings = history_import_us(tmp)
+        if timings:
+            print(f"src.database.history: {timings[0]} µs próprios, {timings[1]} µs com src/src.database")
+
+        db_path = os.path.join(tmp, "chat_history.db")
+        for label, cmd, stdin in SCENARIOS:
+            # Banco já migrado (situação normal); os cenários de leitura não podem alterá-lo
+            for path in (db_path, db_path + "-wal", db_path + "-shm"):
+                if os.path.exists(path):
+                    os.remove(path)
+            run_once(["-c", APP_DB_STARTUP], tmp, None)
+            before = db_state(db_path)
+            walls = []
+            failed = None
+            for _ in range(args.runs):
+                wall, proc = run_once(cmd, tmp, stdin)
+                walls.append(wall)
+                if proc.returncode != 0:
+                    failed = (proc.stderr.strip().splitlines() or ["?"])[-1]
+                    break
+            if failed:
+                print(f"{label:<30} indisponível ({failed})")
+                continue
+            changed = "sim" if db_state(db_path) != before else "não"
+            print(f"{label:<30} {(statistics.median(walls) - baseline) * 1000:7.1f} ms  alterou o banco: {changed}")
+
+
+if __name__ == "__main__":
+    main()
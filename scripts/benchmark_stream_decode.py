@@ -0,0 +1,141 @@
+"""
+Micro-benchmark do loop de streaming do chat_completion.
+Reproduz um stream NDJSON gravado (ou sintético, 10k linhas por padrão) através do gerador
+real do chat_completion, usando uma sessão injetada no pool, e compara com o loop antigo
+(log DEBUG por linha + acúmulo da resposta). Reporta tokens/s e memória alocada.
+
+Uso:
+    python scripts/benchmark_stream_decode.py --lines 10000
+    python scripts/benchmark_stream_decode.py --file stream_gravado.ndjson
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+import tracemalloc
+from typing import List
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.ollama_integration import client
+from src.ollama_integration.session import OllamaSessionPool, set_session_pool
+from src.ollama_integration.streaming import json_loads
+
+MESSAGES = [{"role": "user", "content": "Conte uma história longa."}]
+
+
+def synthetic_stream(lines: int) -> List[bytes]:
+    """Gera linhas no mesmo formato do /api/chat do Ollama."""
+    out = []
+    for i in range(lines - 1):
+        out.append(json.dumps({
+            "model": "llama3", "created_at": "2025-01-01T00:00:00.000000Z",
+            "message": {"role": "assistant", "content": f" palavra{i % 97}"}, "done": False,
+        }).encode("utf-8"))
+    out.append(json.dumps({
+        "model": "llama3", "created_at": "2025-01-01T00:00:00.000000Z",
+        "message": {"role": "assistant", "content": ""}, "done": True,
+        "total_duration": 1, "eval_count": lines - 1,
+    }).encode("utf-8"))
+    return out
+
+
+class ReplayResponse:
+    status_code = 200
+
+    def __init__(self, lines: List[bytes]):
+        self._lines = lines
+
+    def raise_for_status(self):
+        pass
+
+    def iter_lines(self):
+        return iter(self._lines)
+
+    def close(self):
+        pass
+
+
+def replay_session_factory(lines: List[bytes]):
+    class ReplaySession(requests.Session):
+        def request(self, method, url, **kwargs):
+            return ReplayResponse(lines)
+    return ReplaySession
+
+
+def legacy_stream_generator(lines: List[bytes], target_model: str):
+    """Cópia do loop antigo de stream_generator, para comparação."""
+    full_response_content = ""
+    line_count = 0
+    yield_count = 0
+    for line in lines:
+        line_count += 1
+        if line:
+            decoded_line = line.decode('utf-8')
+            logging.debug(f"Stream Line {line_count} Raw: {decoded_line}")
+            try:
+                json_line = json.loads(decoded_line)
+                logging.debug(f"Stream Line {line_count} JSON: {json_line}")
+                chunk = json_line.get("message", {}).get("content", "")
+                logging.debug(f"Stream Line {line_count} Chunk: '{chunk}'")
+                if chunk:
+                    full_response_content += chunk
+                    logging.debug(f"Stream Line {line_count}: Yielding chunk...")
+                    yield_count += 1
+                    yield chunk
+                else:
+                    logging.debug(f"Stream Line {line_count}: Chunk is empty, skipping yield.")
+                if json_line.get("done", False):
+                    logging.info(f"Stream completo recebido (done=True na linha {line_count}). Resposta: {full_response_content}")
+                    break
+            except json.JSONDecodeError:
+                break
+    logging.info(f"Stream finalizado para {target_model}. Total linhas: {line_count}, Total yields: {yield_count}.")
+
+
+def measure(name: str, make_stream, repeat: int) -> None:
+    # Tempo de CPU sem tracemalloc (que distorce o tempo)
+    tokens = 0
+    cpu = time.process_time()
+    for _ in range(repeat):
+        tokens += sum(1 for _ in make_stream())
+    cpu = time.process_time() - cpu
+
+    tracemalloc.start()
+    sum(1 for _ in make_stream())
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"{name:<8} tokens/s={tokens / cpu:,.0f}  CPU/token={cpu / tokens * 1e6:.2f}µs  pico de memória={peak / 1024:,.1f} KiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, default=10_000)
+    parser.add_argument("--file", help="Arquivo NDJSON gravado de uma resposta real do Ollama")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--log-level", default="INFO", help="Nível do logging durante a medição")
+    args = parser.parse_args()
+
+    # Logs vão para /dev/null: medimos o custo de formatar, não o de escrever no terminal
+    logging.basicConfig(level=args.log_level.upper(), stream=open(os.devnull, "w"))
+
+    if args.file:
+        with open(args.file, "rb") as f:
+            lines = [line.rstrip(b"\n") for line in f]
+    else:
+        lines = synthetic_stream(args.lines)
+    print(f"{len(lines)} linhas NDJSON, decoder={json_loads.__module__}, nível de log={args.log_level.upper()}")
+
+    set_session_pool(OllamaSessionPool(session_factory=replay_session_factory(lines)))
+    measure("legado", lambda: legacy_stream_generator(lines, "llama3"), args.repeat)
+    measure("atual", lambda: client.chat_completion(MESSAGES, model="llama3", stream=True), args.repeat)
+
+
+if __name__ == "__main__":
+    main()
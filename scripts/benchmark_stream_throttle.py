@@ -0,0 +1,112 @@
+"""
+Benchmark: quadros enviados à interface x tokens recebidos, com e sem o agrupamento do stream_throttle.
+Sobe o servidor Ollama falso e roda --sessions streams simultâneos (achat_completion). Para cada
+quadro aplica o custo que o Gradio tem no servidor (Chatbot.postprocess + model_dump + diff da
+conversa; sem gradio, só conta os quadros) e mede o CPU do processo e o atraso do texto na tela.
+
+Uso:
+    python scripts/benchmark_stream_throttle.py --sessions 1 20 50 --tokens 300 --token-delay 0.002
+"""
+
+import argparse
+import asyncio
+import inspect
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_ollama_server import FakeOllamaConfig, start_in_background
+
+
+def frame_cost():
+    """Função chamada a cada quadro com o valor do Chatbot (a conversa)."""
+    try:
+        import gradio as gr
+        from gradio.utils import diff
+    except ImportError:
+        return lambda value, state: None
+    chatbot = gr.Chatbot(**({"type": "messages"} if "type" in inspect.signature(gr.Chatbot.__init__).parameters else {}))
+
+    def render(value, state):
+        current = chatbot.postprocess(value).model_dump()
+        diff(state.get("previous"), current)
+        state["previous"] = current
+    return render
+
+
+async def one_session(achat_completion, throttle, render, interval_ms, lags):
+    from src.core.conversation import Conversation
+
+    conversation = Conversation()
+    conversation.add_user("Qual o faturamento por filial?")
+    conversation.start_assistant()
+    state = {}
+    stream = await achat_completion(messages=[{"role": "user", "content": "oi"}], stream=True)
+    arrivals = []
+
+    async def timed(chunks):
+        async for chunk in chunks:
+            arrivals.append(time.perf_counter())
+            yield chunk
+
+    frames = shown = 0
+    source = timed(stream)
+    async for frame in (throttle(source, interval_ms=interval_ms) if throttle else source):
+        conversation.append_chunk(frame)
+        render(conversation.messages, state)
+        frames += 1
+        # Atraso do token mais antigo do quadro: da chegada até ir para a tela
+        lags.append(time.perf_counter() - arrivals[shown])
+        shown = len(arrivals)
+        await asyncio.sleep(0)
+    return frames, len(arrivals)
+
+
+async def run(sessions: int, throttle, interval_ms):
+    from src.ollama_integration.async_client import achat_completion
+
+    render = frame_cost()
+    lags = []
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+    results = await asyncio.gather(*(one_session(achat_completion, throttle, render, interval_ms, lags)
+                                     for _ in range(sessions)))
+    cpu, wall = time.process_time() - cpu_start, time.perf_counter() - wall_start
+    frames = sum(r[0] for r in results)
+    tokens = sum(r[1] for r in results)
+    return frames, tokens, cpu, wall, lags
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 20, 50])
+    parser.add_argument("--tokens", type=int, default=300)
+    parser.add_argument("--token-delay", type=float, default=0.002, help="Segundos entre tokens no servidor falso")
+    parser.add_argument("--interval-ms", type=float, default=None, help="Intervalo base (padrão: STREAM_FRAME_INTERVAL_MS)")
+    args = parser.parse_args()
+
+    base_url, server = start_in_background(FakeOllamaConfig(
+        tokens=args.tokens, token_delay=args.token_delay, first_token_delay=0.01))
+    os.environ["OLLAMA_API_URL"] = f"{base_url}/api/chat"
+    try:
+        from src.core.stream_throttle import athrottle_stream, stream_metrics
+
+        print(f"{'sessões':>8} {'modo':>12} {'quadros':>8} {'tokens':>8} {'tokens/quadro':>14} "
+              f"{'CPU (s)':>8} {'parede (s)':>10} {'atraso p50/p99 (ms)':>20}")
+        for sessions in args.sessions:
+            for label, throttle in (("por token", None), ("agrupado", athrottle_stream)):
+                frames, tokens, cpu, wall, lags = asyncio.run(run(sessions, throttle, args.interval_ms))
+                lags.sort()
+                p99 = lags[min(len(lags) - 1, int(len(lags) * 0.99))]
+                print(f"{sessions:>8} {label:>12} {frames:>8} {tokens:>8} {tokens / max(1, frames):>14.1f} "
+                      f"{cpu:>8.2f} {wall:>10.2f} {statistics.median(lags) * 1000:>9.1f}/{p99 * 1000:<9.1f}")
+        print(f"Métricas do throttle: {stream_metrics()}")
+    finally:
+        server.terminate()
+
+
+if __name__ == "__main__":
+    main()
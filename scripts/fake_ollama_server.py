@@ -0,0 +1,226 @@
+"""
+Servidor Ollama falso para benchmarks locais.
+Implementa o mínimo de /api/chat (stream NDJSON ou resposta única), /api/tags e /api/ps
+sobre asyncio, com atrasos configuráveis para simular a geração de tokens.
+Pode ser executado diretamente ou iniciado em um subprocesso por outro script.
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import socket
+import time
+from typing import Dict, Optional, Tuple
+
+
+class FakeOllamaConfig:
+    """Parâmetros de simulação do servidor."""
+
+    def __init__(
+        self,
+        tokens: int = 50,
+        token_delay: float = 0.005,
+        first_token_delay: float = 0.05,
+        prompt_delay_per_char: float = 0.0,
+        load_delay: float = 0.0,
+        models: Tuple[str, ...] = ("llama3",),
+        tags_delay: float = 0.0,
+        default_keep_alive: Optional[float] = None,
+        max_loaded: Optional[int] = None,
+    ):
+        self.tokens = tokens
+        self.token_delay = token_delay
+        self.first_token_delay = first_token_delay
+        # Atraso extra antes do primeiro token proporcional ao tamanho do prompt (prompt eval)
+        self.prompt_delay_per_char = prompt_delay_per_char
+        # Atraso de "carregar o modelo" na primeira requisição a cada modelo
+        self.load_delay = load_delay
+        self.models = models
+        # Atraso de resposta do /api/tags (servidor lento ou ocupado)
+        self.tags_delay = tags_delay
+        # Segundos que um modelo fica carregado sem uso quando a requisição não manda keep_alive
+        # (None = para sempre; o Ollama real usa 5 minutos)
+        self.default_keep_alive = default_keep_alive
+        # Máximo de modelos carregados ao mesmo tempo (OLLAMA_MAX_LOADED_MODELS); None = sem limite
+        self.max_loaded = max_loaded
+
+
+def parse_keep_alive(value, default: Optional[float]) -> Optional[float]:
+    """keep_alive do Ollama em segundos: número, "30s"/"5m"/"1h", negativo = para sempre (None)."""
+    if value is None or value == "":
+        return default
+    if isinstance(value, str) and value[-1:] in ("s", "m", "h"):
+        seconds = float(value[:-1]) * {"s": 1, "m": 60, "h": 3600}[value[-1]]
+    else:
+        seconds = float(value)
+    return None if seconds < 0 else seconds
+
+
+def _ndjson(obj: Dict) -> bytes:
+    return json.dumps(obj).encode("utf-8") + b"\n"
+
+
+def _chunk(data: bytes) -> bytes:
+    return f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n"
+
+
+class FakeOllamaServer:
+    def __init__(self, config: FakeOllamaConfig):
+        self.config = config
+        # Modelo carregado -> instante em que expira (None = não expira), em ordem de uso
+        self.loaded: Dict[str, Optional[float]] = {}
+        self.loads = 0
+
+    def _expire(self) -> None:
+        now = time.time()
+        for name, expires_at in list(self.loaded.items()):
+            if expires_at is not None and expires_at <= now:
+                del self.loaded[name]
+
+    async def _use_model(self, model: str, keep_alive) -> None:
+        """Carrega o modelo se preciso (load_delay) e renova a expiração pelo keep_alive."""
+        self._expire()
+        if model not in self.loaded:
+            if self.config.max_loaded and len(self.loaded) >= self.config.max_loaded:
+                # Descarrega o usado há mais tempo para abrir espaço
+                del self.loaded[next(iter(self.loaded))]
+            if self.config.load_delay:
+                await asyncio.sleep(self.config.load_delay)
+            self.loads += 1
+        self.loaded.pop(model, None)
+        seconds = parse_keep_alive(keep_alive, self.config.default_keep_alive)
+        self.loaded[model] = None if seconds is None else time.time() + seconds
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request = await self._read_request(reader)
+                if request is None:
+                    break
+                method, path, body = request
+                await self._dispatch(method, path, body, writer)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Optional[Tuple[str, str, bytes]]:
+        head = await reader.readuntil(b"\r\n\r\n") if not reader.at_eof() else b""
+        if not head:
+            return None
+        lines = head.decode("latin-1").split("\r\n")
+        method, path, _ = lines[0].split(" ", 2)
+        length = 0
+        for line in lines[1:]:
+            if line.lower().startswith("content-length:"):
+                length = int(line.split(":", 1)[1])
+        body = await reader.readexactly(length) if length else b""
+        return method, path, body
+
+    async def _send_json(self, writer: asyncio.StreamWriter, obj: Dict) -> None:
+        data = json.dumps(obj).encode("utf-8")
+        writer.write(
+            b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+            + f"Content-Length: {len(data)}\r\n\r\n".encode("ascii") + data
+        )
+        await writer.drain()
+
+    async def _dispatch(self, method: str, path: str, body: bytes, writer: asyncio.StreamWriter) -> None:
+        if path == "/api/tags":
+            await asyncio.sleep(self.config.tags_delay)
+            await self._send_json(writer, {"models": [
+                {"name": name, "model": name, "size": 4_000_000_000,
+                 "details": {"family": name.split(":")[0], "parameter_size": "8B", "quantization_level": "Q4_0"}}
+                for name in self.config.models
+            ]})
+            return
+        if path == "/api/ps":
+            self._expire()
+            await self._send_json(writer, {"models": [
+                {"name": name, "model": name, "size_vram": 4_000_000_000,
+                 "expires_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(expires_at)) if expires_at else "2318-01-01T00:00:00Z"}
+                for name, expires_at in self.loaded.items()
+            ]})
+            return
+
+        payload = json.loads(body or b"{}")
+        model = payload.get("model", "llama3")
+        messages = payload.get("messages", [])
+        await self._use_model(model, payload.get("keep_alive"))
+
+        prompt_chars = sum(len(m.get("content", "")) for m in messages)
+        await asyncio.sleep(self.config.first_token_delay + prompt_chars * self.config.prompt_delay_per_char)
+
+        words = [f"tok{i} " for i in range(self.config.tokens)] if messages else []
+        if not payload.get("stream", True):
+            response_format = payload.get("format")
+            if isinstance(response_format, dict):
+                # Saída estruturada: uma descrição curta para cada chave exigida pelo schema
+                content = json.dumps({name: f"Descrição gerada para {name}." for name in response_format.get("required", [])},
+                                     ensure_ascii=False)
+            else:
+                content = "".join(words)
+            eval_count = max(1, len(content) // 4)
+            await asyncio.sleep(self.config.token_delay * eval_count)
+            await self._send_json(writer, {
+                "model": model, "message": {"role": "assistant", "content": content}, "done": True,
+                "prompt_eval_count": prompt_chars // 4, "eval_count": eval_count,
+            })
+            return
+
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\nTransfer-Encoding: chunked\r\n\r\n")
+        for word in words:
+            writer.write(_chunk(_ndjson({"model": model, "message": {"role": "assistant", "content": word}, "done": False})))
+            await writer.drain()
+            if self.config.token_delay:
+                await asyncio.sleep(self.config.token_delay)
+        writer.write(_chunk(_ndjson({"model": model, "message": {"role": "assistant", "content": ""}, "done": True,
+                                     "prompt_eval_count": prompt_chars // 4, "eval_count": len(words)})))
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+
+async def serve(port: int, config: FakeOllamaConfig) -> None:
+    server = await asyncio.start_server(FakeOllamaServer(config).handle, "127.0.0.1", port, backlog=1024)
+    async with server:
+        await server.serve_forever()
+
+
+def _run(port: int, config: FakeOllamaConfig) -> None:
+    asyncio.run(serve(port, config))
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_in_background(config: FakeOllamaConfig | None = None) -> Tuple[str, multiprocessing.Process]:
+    """Inicia o servidor em um subprocesso (para não somar CPU ao processo medido).
+
+    Returns:
+        Tupla (URL base, processo). Encerre com process.terminate().
+    """
+    port = _free_port()
+    process = multiprocessing.Process(target=_run, args=(port, config or FakeOllamaConfig()), daemon=True)
+    process.start()
+    deadline = time.time() + 10
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.2):
+                break
+        except OSError:
+            time.sleep(0.05)
+    return f"http://127.0.0.1:{port}", process
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor Ollama falso para benchmarks.")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--tokens", type=int, default=50)
+    parser.add_argument("--token-delay", type=float, default=0.005)
+    args = parser.parse_args()
+    print(f"Servidor Ollama falso em http://127.0.0.1:{args.port}")
+    _run(args.port, FakeOllamaConfig(tokens=args.tokens, token_delay=args.token_delay))
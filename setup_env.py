@@ -3,6 +3,8 @@ import sys
 import subprocess
 import platform
 
+from src.core.bootstrap import stamp_path, write_stamp
+
 def create_venv():
     """Cria um ambiente virtual se não existir."""
     if not os.path.exists('.venv'):
@@ -37,6 +39,8 @@ def install_dependencies():
         subprocess.check_call([python_path, '-m', 'pip', 'install', '--upgrade', 'pip'])
         # Instala as dependências
         subprocess.check_call([python_path, '-m', 'pip', 'install', '-r', 'requirements.txt'])
+        # Carimbo no venv: o app.py não roda o pip de novo enquanto o requirements.txt não mudar
+        write_stamp('requirements.txt', stamp_path('.venv'))
         print("Dependências instaladas com sucesso!")
     except subprocess.CalledProcessError as e:
         print(f"Erro ao instalar dependências: {e}")
@@ -3,6 +3,7 @@ import psutil
 import logging
 from typing import List, Dict, Tuple, Optional
 from src.ollama_integration.client import chat_completion, get_available_models
+from src.ollama_integration.async_client import achat_completion
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
@@ -54,6 +55,23 @@ class MonitoredChat:
         response_content = chat_completion(messages=self.history, model=self.model, stream=False)
         end_time = time.time()
 
+        return self._record_response(response_content, start_time, end_time)
+
+    async def asend_message(self, user_input: str) -> Optional[str]:
+        """Versão assíncrona de send_message, usando achat_completion."""
+        if not user_input or user_input.strip().lower() in ["sair", "exit", "quit"]:
+            return None
+
+        self.history.append({"role": "user", "content": user_input})
+
+        start_time = time.time()
+        response_content = await achat_completion(messages=self.history, model=self.model, stream=False)
+        end_time = time.time()
+
+        return self._record_response(response_content, start_time, end_time)
+
+    def _record_response(self, response_content: Optional[str], start_time: float, end_time: float) -> str:
+        """Adiciona a resposta ao histórico e registra o desempenho (ou desfaz o turno em caso de falha)."""
         if response_content:
             self.history.append({"role": "assistant", "content": response_content})
             self._monitor_performance(start_time, end_time)
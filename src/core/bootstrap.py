@@ -0,0 +1,89 @@
+"""
+Inicialização rápida do app.py: só roda `pip install -r requirements.txt` quando o arquivo mudou.
+
+Depois de uma instalação bem-sucedida, o hash (SHA-256) do requirements.txt é gravado num carimbo
+dentro do próprio ambiente virtual (sys.prefix). Nas inicializações seguintes, se o hash atual for
+igual ao do carimbo, o pip não é chamado. Um venv recriado não tem carimbo, então instala de novo.
+
+Só usa a biblioteca padrão: roda antes de qualquer dependência estar instalada.
+
+Configuração (.env / ambiente):
+    FAST_BOOT           0 = roda o pip a cada início (comportamento antigo); padrão 1
+    REQUIREMENTS_STAMP  caminho do carimbo (padrão: <venv>/.requirements.sha256)
+"""
+
+import hashlib
+import os
+import subprocess
+import sys
+from typing import Optional
+
+FAST_BOOT = os.getenv("FAST_BOOT", "1") != "0"
+
+
+def stamp_path(prefix: Optional[str] = None) -> str:
+    """Carimbo do ambiente `prefix` (padrão: o do interpretador atual)."""
+    return os.getenv("REQUIREMENTS_STAMP") or os.path.join(prefix or sys.prefix, ".requirements.sha256")
+
+
+def requirements_hash(requirements_path: str) -> str:
+    """Hash do conteúdo relevante: ignora comentários, linhas vazias e espaços nas pontas."""
+    digest = hashlib.sha256()
+    with open(requirements_path, encoding="utf-8") as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if line:
+                digest.update(line.encode("utf-8") + b"\n")
+    return digest.hexdigest()
+
+
+def read_stamp(path: Optional[str] = None) -> Optional[str]:
+    try:
+        with open(path or stamp_path(), encoding="utf-8") as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def write_stamp(requirements_path: str, path: Optional[str] = None) -> None:
+    """Registra que as dependências de `requirements_path` estão instaladas."""
+    path = path or stamp_path()
+    try:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(requirements_hash(requirements_path) + "\n")
+    except OSError as e:
+        print(f"AVISO: Não foi possível gravar o carimbo de dependências em {path}: {e}")
+
+
+def dependencies_up_to_date(requirements_path: str, path: Optional[str] = None) -> bool:
+    return read_stamp(path) == requirements_hash(requirements_path)
+
+
+def ensure_dependencies(requirements_path: str = "requirements.txt", force: bool = not FAST_BOOT) -> bool:
+    """Instala as dependências se o requirements.txt mudou desde a última instalação (ou se force).
+
+    Returns:
+        True se as dependências estão instaladas, False em caso de erro.
+    """
+    if not os.path.exists(requirements_path):
+        print(f"ERRO: Arquivo {requirements_path} não encontrado.")
+        return False
+
+    if not force and dependencies_up_to_date(requirements_path):
+        print(f"Dependências de {requirements_path} sem alterações desde a última instalação (pip ignorado).")
+        return True
+
+    print(f"Garantindo que as dependências em {requirements_path} estão instaladas...")
+    try:
+        subprocess.check_call([sys.executable, '-m', 'pip', 'install', '-r', requirements_path])
+    except subprocess.CalledProcessError as e:
+        print(f"ERRO: Falha ao instalar dependências: {e}")
+        print("Verifique se o pip está funcionando e se o arquivo requirements.txt está correto.")
+        return False
+    except FileNotFoundError:
+        print("ERRO: Comando 'pip' não encontrado.")
+        print("Certifique-se de que Python e pip estão instalados e no PATH.")
+        return False
+    write_stamp(requirements_path)
+    print("Dependências verificadas/instaladas com sucesso.")
+    return True
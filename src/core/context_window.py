@@ -0,0 +1,201 @@
+"""
+Janela de contexto por sessão: decide quais mensagens do histórico vão para o modelo em cada turno.
+
+O histórico completo fica na sessão, mas só o que cabe no orçamento de tokens do modelo é enviado,
+para que o tempo até o primeiro token (prompt eval) não cresça com o tamanho da conversa.
+
+Estratégias (CONTEXT_STRATEGY):
+    sliding  últimas mensagens que cabem no orçamento
+    pinned   como sliding, mas o prompt de sistema (SYSTEM_PROMPT) vai sempre, fora da janela
+    summary  como pinned, e o que sai da janela é resumido num texto que vai junto (rolling summary)
+
+Orçamento (tokens estimados como caracteres/4):
+    CONTEXT_TOKEN_BUDGET     padrão para qualquer modelo (padrão 3072)
+    CONTEXT_TOKEN_BUDGETS    por modelo, ex: "llama3=6144,phi3=3072" (nome sem a tag também vale)
+"""
+
+import logging
+import math
+import os
+from typing import Callable, Dict, List, Optional
+
+STRATEGIES = ("sliding", "pinned", "summary")
+DEFAULT_STRATEGY = os.getenv("CONTEXT_STRATEGY", "pinned")
+DEFAULT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "3072"))
+SYSTEM_PROMPT = os.getenv("SYSTEM_PROMPT", "")
+# Tokens de mensagens descartadas acumulados antes de pedir um novo resumo, e tamanho máximo dele
+SUMMARY_TRIGGER_TOKENS = int(os.getenv("CONTEXT_SUMMARY_TRIGGER_TOKENS", "512"))
+SUMMARY_MAX_TOKENS = int(os.getenv("CONTEXT_SUMMARY_MAX_TOKENS", "256"))
+# Custo fixo aproximado de cada mensagem no template de chat (papel, separadores)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+SUMMARY_PREFIX = "Resumo da conversa até aqui:"
+
+Message = Dict[str, str]
+Summarizer = Callable[[str, List[Message]], Optional[str]]
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimativa barata (sem tokenizer): ~4 caracteres por token."""
+    return math.ceil(len(text) / 4)
+
+
+def message_tokens(message: Message) -> int:
+    return estimate_tokens(message.get("content", "")) + MESSAGE_OVERHEAD_TOKENS
+
+
+def parse_budgets(spec: str) -> Dict[str, int]:
+    """"llama3=6144,phi3:mini=2048" -> {"llama3": 6144, "phi3:mini": 2048} (entradas inválidas são ignoradas)."""
+    budgets = {}
+    for item in spec.split(","):
+        name, _, value = item.partition("=")
+        try:
+            budgets[name.strip()] = int(value)
+        except ValueError:
+            if item.strip():
+                logging.warning(f"Orçamento de contexto inválido ignorado: '{item}'")
+    return budgets
+
+
+MODEL_TOKEN_BUDGETS = parse_budgets(os.getenv("CONTEXT_TOKEN_BUDGETS", ""))
+
+
+def budget_for_model(model: Optional[str]) -> int:
+    """Orçamento do modelo (nome exato, depois sem a tag ":..."), ou o padrão."""
+    if model:
+        if model in MODEL_TOKEN_BUDGETS:
+            return MODEL_TOKEN_BUDGETS[model]
+        base = model.split(":")[0]
+        if base in MODEL_TOKEN_BUDGETS:
+            return MODEL_TOKEN_BUDGETS[base]
+    return DEFAULT_TOKEN_BUDGET
+
+
+class ContextWindow:
+    """Histórico de uma sessão com contagem de tokens mantida a cada mensagem.
+
+    A janela é um índice de início sobre a lista de mensagens: cada append soma os tokens da nova
+    mensagem e avança o início enquanto o total passar do orçamento, então montar o contexto de um
+    turno custa o tamanho da janela, não o da conversa inteira.
+
+    Args:
+        strategy: "sliding", "pinned" ou "summary".
+        system_prompt: Mensagem de sistema (fixada nas estratégias pinned/summary).
+    """
+
+    def __init__(self, strategy: str = DEFAULT_STRATEGY, system_prompt: str = SYSTEM_PROMPT):
+        if strategy not in STRATEGIES:
+            logging.warning(f"Estratégia de contexto '{strategy}' desconhecida; usando 'sliding'.")
+            strategy = "sliding"
+        self.strategy = strategy
+        self.system_prompt = system_prompt
+        self.messages: List[Message] = []
+        self.tokens: List[int] = []
+        self.total_tokens = 0 # Conversa inteira
+        self.summary = ""
+        self._summarized_until = 0 # Mensagens [0, n) já incorporadas ao resumo
+        self._start = 0 # Início da janela
+        self._window_tokens = 0
+        self._budget: Optional[int] = None
+
+    # --- Montagem do histórico ---
+
+    def append(self, role: str, content: str) -> None:
+        message = {"role": role, "content": content}
+        tokens = message_tokens(message)
+        self.messages.append(message)
+        self.tokens.append(tokens)
+        self.total_tokens += tokens
+        self._window_tokens += tokens
+        if self._budget is not None:
+            self._shrink()
+
+    # --- Janela ---
+
+    def _fixed_tokens(self) -> int:
+        tokens = 0
+        if self.strategy != "sliding" and self.system_prompt:
+            tokens += estimate_tokens(self.system_prompt) + MESSAGE_OVERHEAD_TOKENS
+        if self.strategy == "summary" and self.summary:
+            tokens += estimate_tokens(self.summary) + estimate_tokens(SUMMARY_PREFIX) + MESSAGE_OVERHEAD_TOKENS
+        return tokens
+
+    def _shrink(self) -> None:
+        # Mantém ao menos a última mensagem (a pergunta atual), mesmo que sozinha passe do orçamento
+        limit = self._budget - self._fixed_tokens()
+        while self._window_tokens > limit and self._start < len(self.messages) - 1:
+            self._window_tokens -= self.tokens[self._start]
+            self._start += 1
+        # Não começa a janela com uma resposta órfã do assistente
+        if self._start < len(self.messages) - 1 and self.messages[self._start]["role"] == "assistant":
+            self._window_tokens -= self.tokens[self._start]
+            self._start += 1
+
+    def _set_budget(self, budget: int) -> None:
+        if budget != self._budget:
+            # Orçamento mudou (outro modelo): recalcula a janela a partir do fim
+            self._budget = budget
+            self._start = len(self.messages)
+            self._window_tokens = 0
+            limit = budget - self._fixed_tokens()
+            # O que já está no resumo não volta para a janela
+            floor = self._summarized_until if self.strategy == "summary" else 0
+            while self._start > floor and self._window_tokens + self.tokens[self._start - 1] <= limit:
+                self._start -= 1
+                self._window_tokens += self.tokens[self._start]
+            if self._start == len(self.messages) and self.messages:
+                self._start -= 1
+                self._window_tokens += self.tokens[self._start]
+        self._shrink()
+
+    def build(self, model: Optional[str] = None, budget: Optional[int] = None) -> List[Message]:
+        """Mensagens a enviar ao modelo neste turno, dentro do orçamento."""
+        self._set_budget(budget if budget is not None else budget_for_model(model))
+        prefix = []
+        if self.strategy != "sliding" and self.system_prompt:
+            prefix.append({"role": "system", "content": self.system_prompt})
+        if self.strategy == "summary" and self.summary:
+            prefix.append({"role": "system", "content": f"{SUMMARY_PREFIX} {self.summary}"})
+        return prefix + self.messages[self._start:]
+
+    def window_tokens(self) -> int:
+        """Tokens estimados do que build() envia (janela + mensagens fixas)."""
+        return self._window_tokens + self._fixed_tokens()
+
+    # --- Resumo ---
+
+    def needs_summary(self) -> bool:
+        if self.strategy != "summary":
+            return False
+        evicted = sum(self.tokens[self._summarized_until:self._start])
+        return evicted >= SUMMARY_TRIGGER_TOKENS
+
+    def update_summary(self, summarizer: Summarizer) -> bool:
+        """Incorpora ao resumo as mensagens que saíram da janela desde o último resumo.
+
+        Chamado fora do caminho crítico (depois de a resposta já ter sido exibida).
+        O summarizer recebe (resumo atual, mensagens descartadas) e devolve o novo resumo ou None.
+        """
+        if not self.needs_summary():
+            return False
+        evicted = self.messages[self._summarized_until:self._start]
+        new_summary = summarizer(self.summary, evicted)
+        if not new_summary:
+            return False
+        # Limita o resumo para que ele não consuma o orçamento da janela
+        self.summary = new_summary[:SUMMARY_MAX_TOKENS * 4]
+        self._summarized_until = self._start
+        if self._budget is not None:
+            self._shrink()
+        return True
+
+
+def summary_prompt(current_summary: str, evicted: List[Message]) -> List[Message]:
+    """Mensagens para pedir ao modelo o resumo atualizado (usado pelo summarizer do app)."""
+    transcript = "\n".join(f"{m['role']}: {m['content']}" for m in evicted)
+    return [
+        {"role": "system", "content": (
+            "Você resume conversas. Atualize o resumo com os novos trechos, mantendo fatos, nomes, "
+            f"decisões e pedidos do usuário. Responda só com o resumo, em até {SUMMARY_MAX_TOKENS * 3} caracteres.")},
+        {"role": "user", "content": f"Resumo atual:\n{current_summary or '(vazio)'}\n\nNovos trechos:\n{transcript}"},
+    ]
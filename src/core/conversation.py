@@ -0,0 +1,60 @@
+"""
+Conversa de uma sessão do chat, guardada no session_state.
+
+As mensagens ficam no formato "messages" ({"role", "content"}), o mesmo da API do Ollama e do
+gr.Chatbot(type="messages"), e são acrescentadas uma a uma: nada é reconstruído a partir do
+histórico da UI a cada turno. A interface mostra a conversa inteira (messages); a janela de
+contexto limita só o que é enviado ao modelo (api_messages).
+"""
+
+from typing import Dict, List, Optional
+
+from src.core.context_window import ContextWindow
+
+Message = Dict[str, str]
+
+
+class Conversation:
+    """Mensagens de uma sessão + janela de contexto para a API.
+
+    Args:
+        context: Janela de contexto usada para montar as mensagens enviadas ao modelo.
+    """
+
+    def __init__(self, context: Optional[ContextWindow] = None):
+        self.messages: List[Message] = []
+        self.context = context or ContextWindow()
+
+    def add_user(self, content: str) -> None:
+        """Abre um novo turno com a pergunta do usuário."""
+        self.messages.append({"role": "user", "content": content})
+        self.context.append("user", content)
+
+    def start_assistant(self) -> None:
+        """Cria a resposta vazia que será preenchida pelo streaming."""
+        self.messages.append({"role": "assistant", "content": ""})
+
+    def append_chunk(self, chunk: str) -> None:
+        """Acrescenta um pedaço à resposta em andamento (no próprio dict, sem recriar o histórico)."""
+        self.messages[-1]["content"] += chunk
+
+    def set_assistant(self, content: str) -> None:
+        self.messages[-1]["content"] = content
+
+    @property
+    def assistant_text(self) -> str:
+        last = self.messages[-1] if self.messages else None
+        return last["content"] if last and last["role"] == "assistant" else ""
+
+    def finish_assistant(self) -> str:
+        """Fecha o turno: registra a resposta na janela de contexto (ou descarta a vazia). Retorna o texto."""
+        content = self.assistant_text
+        if content:
+            self.context.append("assistant", content)
+        elif self.messages and self.messages[-1]["role"] == "assistant":
+            self.messages.pop()
+        return content
+
+    def api_messages(self, model: Optional[str] = None) -> List[Message]:
+        """Mensagens a enviar ao modelo (só o que cabe no orçamento, ver ContextWindow)."""
+        return self.context.build(model=model)
@@ -0,0 +1,148 @@
+"""
+Agrupa os pedaços (chunks) do streaming do modelo em quadros para a interface.
+
+Em vez de um quadro por chunk (centenas por segundo em modelos rápidos), o texto recebido é
+acumulado e emitido quando passa o intervalo mínimo entre quadros ou quando o acumulado atinge
+um tamanho máximo. O primeiro chunk sai imediatamente (tempo até o primeiro token não muda) e
+o que sobrar sai no fim. Com muitas sessões em streaming ao mesmo tempo, o intervalo cresce
+(ritmo adaptativo), para limitar o total de quadros por segundo do servidor.
+
+Configuração (.env):
+    STREAM_FRAME_INTERVAL_MS      intervalo mínimo entre quadros (padrão 50; 0 = um quadro por chunk)
+    STREAM_FRAME_MAX_CHARS        emite antes do intervalo se acumular isso (padrão 400)
+    STREAM_FRAME_MAX_INTERVAL_MS  teto do intervalo adaptativo (padrão 250)
+    STREAM_STREAMS_PER_STEP       sessões simultâneas que somam mais um intervalo base (padrão 20)
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Any, AsyncIterable, AsyncIterator, Dict, Iterable, Iterator, Optional
+
+FRAME_INTERVAL_MS = float(os.getenv("STREAM_FRAME_INTERVAL_MS", "50"))
+FRAME_MAX_CHARS = int(os.getenv("STREAM_FRAME_MAX_CHARS", "400"))
+FRAME_MAX_INTERVAL_MS = float(os.getenv("STREAM_FRAME_MAX_INTERVAL_MS", "250"))
+STREAMS_PER_STEP = int(os.getenv("STREAM_STREAMS_PER_STEP", "20"))
+
+
+class StreamMetrics:
+    """Contadores globais do processo (todas as sessões)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.active_streams = 0
+        self.streams = 0
+        self.chunks_received = 0
+        self.frames_sent = 0
+
+    def start(self) -> None:
+        with self._lock:
+            self.active_streams += 1
+            self.streams += 1
+
+    def finish(self, chunks: int, frames: int) -> None:
+        with self._lock:
+            self.active_streams -= 1
+            self.chunks_received += chunks
+            self.frames_sent += frames
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "active_streams": self.active_streams,
+                "streams": self.streams,
+                "chunks_received": self.chunks_received,
+                "frames_sent": self.frames_sent,
+                "chunks_per_frame": self.chunks_received / self.frames_sent if self.frames_sent else 0.0,
+                "frame_interval_ms": current_interval_ms(self.active_streams),
+            }
+
+
+metrics = StreamMetrics()
+
+
+def current_interval_ms(active_streams: Optional[int] = None, base_ms: float = FRAME_INTERVAL_MS) -> float:
+    """Intervalo entre quadros para a carga atual: base * (1 + sessões ativas / STREAMS_PER_STEP), com teto."""
+    if base_ms <= 0:
+        return 0.0
+    active = metrics.active_streams if active_streams is None else active_streams
+    return min(max(base_ms, FRAME_MAX_INTERVAL_MS), base_ms * (1 + max(0, active - 1) / STREAMS_PER_STEP))
+
+
+def stream_metrics() -> Dict[str, Any]:
+    """Quadros enviados x chunks recebidos, sessões ativas e o intervalo atual."""
+    return metrics.snapshot()
+
+
+class _Coalescer:
+    """Estado de um stream: decide, a cada chunk, se o texto acumulado vira um quadro."""
+
+    def __init__(self, interval_ms: Optional[float], max_chars: Optional[int]):
+        self.base_ms = FRAME_INTERVAL_MS if interval_ms is None else interval_ms
+        self.max_chars = FRAME_MAX_CHARS if max_chars is None else max_chars
+        self.buffer = []
+        self.buffered_chars = 0
+        self.last_frame = 0.0 # 0 = nenhum quadro ainda: o primeiro chunk sai direto
+        self.chunks = 0
+        self.frames = 0
+
+    def add(self, chunk: str) -> Optional[str]:
+        self.chunks += 1
+        self.buffer.append(chunk)
+        self.buffered_chars += len(chunk)
+        now = time.perf_counter()
+        interval = current_interval_ms(base_ms=self.base_ms) / 1000
+        if self.last_frame and now - self.last_frame < interval and self.buffered_chars < self.max_chars:
+            return None
+        self.last_frame = now
+        return self.flush()
+
+    def flush(self) -> Optional[str]:
+        if not self.buffer:
+            return None
+        text = "".join(self.buffer)
+        self.buffer.clear()
+        self.buffered_chars = 0
+        self.frames += 1
+        return text
+
+    def close(self) -> None:
+        metrics.finish(self.chunks, self.frames)
+        logging.debug(f"Streaming: {self.chunks} chunks em {self.frames} quadros")
+
+
+def throttle_stream(chunks: Iterable[str], interval_ms: Optional[float] = None,
+                    max_chars: Optional[int] = None) -> Iterator[str]:
+    """Reagrupa os chunks de um stream síncrono; cada item produzido é um quadro (texto novo)."""
+    coalescer = _Coalescer(interval_ms, max_chars)
+    metrics.start()
+    try:
+        for chunk in chunks:
+            if chunk:
+                frame = coalescer.add(chunk)
+                if frame is not None:
+                    yield frame
+        frame = coalescer.flush()
+        if frame is not None:
+            yield frame
+    finally:
+        coalescer.close()
+
+
+async def athrottle_stream(chunks: AsyncIterable[str], interval_ms: Optional[float] = None,
+                           max_chars: Optional[int] = None) -> AsyncIterator[str]:
+    """Versão assíncrona de throttle_stream (para achat_completion)."""
+    coalescer = _Coalescer(interval_ms, max_chars)
+    metrics.start()
+    try:
+        async for chunk in chunks:
+            if chunk:
+                frame = coalescer.add(chunk)
+                if frame is not None:
+                    yield frame
+        frame = coalescer.flush()
+        if frame is not None:
+            yield frame
+    finally:
+        coalescer.close()
@@ -1,76 +1,135 @@
 import sqlite3
 import logging
 import os
-from datetime import datetime
+import atexit
+import random
+import threading
+import time
 
 # Define o nome do arquivo do banco de dados
 DB_FILE = "chat_history.db"
 
+# Espera máxima por um lock de escrita (SQLite busy_timeout), em milissegundos
+BUSY_TIMEOUT_MS = int(os.getenv("HISTORY_BUSY_TIMEOUT_MS", "5000"))
+# Tentativas extras quando o busy_timeout estoura ("database is locked")
+WRITE_RETRIES = int(os.getenv("HISTORY_WRITE_RETRIES", "3"))
+
+# SQL fixo em constantes: o sqlite3 mantém um cache de statements preparados por conexão,
+# então reaproveitar a conexão e o mesmo texto SQL evita recompilar a cada turno
+SQL_INSERT_MESSAGE = ''' INSERT INTO chat_history(user_message, assistant_message, session_id)
+              VALUES(?,?,?) '''
+SQL_UPDATE_FEEDBACK = ''' UPDATE chat_history
+              SET feedback = ?
+              WHERE id = ? '''
+
+# Uma conexão por thread (sqlite3 não deve compartilhar conexão entre threads sem lock)
+_local = threading.local()
+_all_connections = []
+_all_connections_lock = threading.Lock()
+
+def _open_connection(path):
+    conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+    conn.row_factory = sqlite3.Row # Retorna linhas como dicionários
+    # Só vale para bancos novos (antes da primeira tabela); permite devolver espaço com incremental_vacuum
+    conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    conn.execute("PRAGMA journal_mode=WAL") # Leitores não bloqueiam o escritor e vice-versa
+    conn.execute("PRAGMA synchronous=NORMAL") # Seguro com WAL; evita fsync a cada commit
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    return conn
+
 def get_db_connection():
-    """Estabelece conexão com o banco de dados SQLite."""
-    conn = None
-    try:
-        conn = sqlite3.connect(DB_FILE)
-        conn.row_factory = sqlite3.Row # Retorna linhas como dicionários
-        logging.info(f"Conexão com o banco de dados {DB_FILE} estabelecida.")
+    """Retorna a conexão SQLite da thread atual, abrindo-a no primeiro uso.
+
+    A conexão é reaproveitada entre chamadas e não deve ser fechada por quem a usa;
+    use close_db_connection() ou deixe o atexit fechar todas ao encerrar o processo.
+    """
+    conn = getattr(_local, "conn", None)
+    if conn is not None and _local.path == DB_FILE:
         return conn
+    close_db_connection() # DB_FILE mudou (ex: testes/benchmarks): descarta a conexão antiga
+    try:
+        conn = _open_connection(DB_FILE)
     except sqlite3.Error as e:
         logging.error(f"Erro ao conectar ao banco de dados {DB_FILE}: {e}")
         return None
+    _local.conn, _local.path = conn, DB_FILE
+    with _all_connections_lock:
+        _all_connections.append(conn)
+    logging.debug(f"Conexão com o banco de dados {DB_FILE} estabelecida (thread {threading.current_thread().name}).")
+    return conn
 
-def init_db():
-    """Inicializa o BD, adicionando a coluna feedback se necessário."""
-    conn = get_db_connection()
-    if conn is None: return
-
+def close_db_connection():
+    """Fecha a conexão da thread atual, se houver."""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        return
+    _local.conn = None
+    with _all_connections_lock:
+        if conn in _all_connections:
+            _all_connections.remove(conn)
     try:
-        cursor = conn.cursor()
-        # Cria a tabela se não existir (já inclui a coluna nova)
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS chat_history (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                session_id TEXT, -- Para agrupar mensagens de uma mesma sessão (opcional)
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                user_message TEXT NOT NULL,
-                assistant_message TEXT NOT NULL,
-                feedback INTEGER DEFAULT NULL
-            )
-        """)
-        # Tenta adicionar a coluna 'feedback' se ela não existir (para bancos antigos)
+        conn.close()
+    except sqlite3.Error:
+        pass
+
+def close_all_connections():
+    """Fecha as conexões de todas as threads (chamado no encerramento do processo)."""
+    with _all_connections_lock:
+        connections = list(_all_connections)
+        _all_connections.clear()
+    for conn in connections:
         try:
-            cursor.execute("ALTER TABLE chat_history ADD COLUMN feedback INTEGER DEFAULT NULL")
-            logging.info("Coluna 'feedback' adicionada à tabela 'chat_history'.")
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+atexit.register(close_all_connections)
+
+def _execute_write(sql, params):
+    """Executa um comando de escrita e faz commit, repetindo com backoff se o banco estiver bloqueado.
+
+    Returns:
+        O cursor usado (para lastrowid/rowcount) ou None se não houver conexão.
+    """
+    for attempt in range(WRITE_RETRIES + 1):
+        conn = get_db_connection()
+        if conn is None:
+            return None
+        try:
+            cursor = conn.execute(sql, params)
+            conn.commit()
+            return cursor
         except sqlite3.OperationalError as e:
-            # Ignora o erro se a coluna já existir
-            if "duplicate column name" in str(e):
-                pass # Coluna já existe, tudo bem
-            else:
-                raise # Levanta outros erros de alteração
-        conn.commit()
-        logging.info("Tabela 'chat_history' verificada/atualizada com sucesso.")
-    except sqlite3.Error as e:
-        logging.error(f"Erro ao inicializar/atualizar a tabela 'chat_history': {e}")
-    finally:
-        if conn: conn.close()
+            conn.rollback()
+            if "locked" not in str(e) or attempt == WRITE_RETRIES:
+                raise
+            delay = (2 ** attempt) * 0.05 * (1 + random.random())
+            logging.warning(f"Banco {DB_FILE} bloqueado; nova tentativa em {delay:.2f}s ({attempt + 1}/{WRITE_RETRIES}).")
+            time.sleep(delay)
+        except sqlite3.ProgrammingError:
+            # Conexão fechada por fora (ex: close_all_connections): reabre na próxima tentativa
+            close_db_connection()
+            if attempt == WRITE_RETRIES:
+                raise
+
+def init_db():
+    """Garante que o BD está na última versão do esquema (ver src.database.migrations).
+
+    Não é mais chamada na importação do módulo: o app a chama na inicialização.
+    """
+    from src.database.migrations import migrate # Import tardio: migrations importa este módulo
+    migrate()
 
 def save_chat_message(user_message: str, assistant_message: str, session_id: str | None = None) -> int | None:
     """Salva uma interação de chat no BD e retorna o ID da linha inserida."""
-    conn = get_db_connection()
-    if conn is None: return None
-
-    sql = ''' INSERT INTO chat_history(user_message, assistant_message, session_id)
-              VALUES(?,?,?) '''
     last_id = None
     try:
-        cursor = conn.cursor()
-        cursor.execute(sql, (user_message, assistant_message, session_id))
-        conn.commit()
+        cursor = _execute_write(SQL_INSERT_MESSAGE, (user_message, assistant_message, session_id))
+        if cursor is None: return None
         last_id = cursor.lastrowid # Obtém o ID da última linha inserida
         logging.info(f"Mensagem salva no histórico (ID: {last_id})")
     except sqlite3.Error as e:
         logging.error(f"Erro ao salvar mensagem no histórico: {e}")
-    finally:
-        if conn: conn.close()
     return last_id # Retorna o ID
 
 def update_feedback(message_id: int, feedback_value: int):
@@ -79,21 +138,8 @@ def update_feedback(message_id: int, feedback_value: int):
         logging.warning(f"Tentativa de atualizar feedback com ID inválido ({message_id}) ou valor ({feedback_value})")
         return
 
-    conn = get_db_connection()
-    if conn is None: return
-
-    sql = ''' UPDATE chat_history
-              SET feedback = ?
-              WHERE id = ? '''
     try:
-        cursor = conn.cursor()
-        cursor.execute(sql, (feedback_value, message_id))
-        conn.commit()
+        if _execute_write(SQL_UPDATE_FEEDBACK, (feedback_value, message_id)) is None: return
         logging.info(f"Feedback ({feedback_value}) atualizado para a mensagem ID: {message_id}")
     except sqlite3.Error as e:
         logging.error(f"Erro ao atualizar feedback para mensagem ID {message_id}: {e}")
-    finally:
-        if conn: conn.close()
-
-# Chama init_db quando o módulo é importado para garantir que a tabela exista
-init_db() 
\ No newline at end of file
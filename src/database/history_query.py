@@ -0,0 +1,160 @@
+"""
+Consultas de leitura sobre chat_history: replay de sessão, filtro por feedback e busca por palavras.
+
+Todas usam os índices criados pelas migrações 3 e 4 (ver src.database.migrations), então o custo
+depende do tamanho do resultado, não do tamanho da tabela. As funções retornam listas de dicts
+com as colunas da tabela (busca: mais a coluna "rank", menor = mais relevante).
+"""
+
+import logging
+import sqlite3
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from src.database import history
+
+HISTORY_COLUMNS = "id, session_id, timestamp, user_message, assistant_message, feedback"
+
+
+def _query(sql: str, params, conn: Optional[sqlite3.Connection] = None) -> List[Dict[str, Any]]:
+    conn = conn or history.get_db_connection()
+    if conn is None:
+        return []
+    try:
+        return [dict(row) for row in conn.execute(sql, params)]
+    except sqlite3.Error as e:
+        logging.error(f"Erro ao consultar o histórico: {e}")
+        return []
+
+
+def get_session_messages(session_id: str, after_id: int = 0, limit: Optional[int] = None,
+                         conn: Optional[sqlite3.Connection] = None) -> List[Dict[str, Any]]:
+    """Interações de uma sessão na ordem em que aconteceram (índice session_id, id).
+
+    Args:
+        after_id: Só mensagens com id maior (para continuar um replay de onde parou).
+        limit: Máximo de linhas (None = todas).
+    """
+    sql = f"SELECT {HISTORY_COLUMNS} FROM chat_history WHERE session_id = ? AND id > ? ORDER BY id"
+    params = [session_id, after_id]
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+    return _query(sql, params, conn)
+
+
+def get_messages_by_feedback(feedback_value: int, since: Optional[str] = None, until: Optional[str] = None,
+                             limit: int = 100, conn: Optional[sqlite3.Connection] = None) -> List[Dict[str, Any]]:
+    """Mensagens com o feedback dado (1 ou -1), mais recentes primeiro.
+
+    Args:
+        since/until: Limites de timestamp no formato do SQLite ("AAAA-MM-DD" ou "AAAA-MM-DD HH:MM:SS"),
+                     since inclusivo e until exclusivo.
+    """
+    sql = f"SELECT {HISTORY_COLUMNS} FROM chat_history WHERE feedback = ?"
+    params: List[Any] = [feedback_value]
+    if since is not None:
+        sql += " AND timestamp >= ?"
+        params.append(since)
+    if until is not None:
+        sql += " AND timestamp < ?"
+        params.append(until)
+    sql += " ORDER BY timestamp DESC LIMIT ?"
+    params.append(limit)
+    return _query(sql, params, conn)
+
+
+def get_recent_messages(limit: int = 50, conn: Optional[sqlite3.Connection] = None) -> List[Dict[str, Any]]:
+    """Últimas interações registradas (índice por timestamp)."""
+    return _query(f"SELECT {HISTORY_COLUMNS} FROM chat_history ORDER BY timestamp DESC LIMIT ?", (limit,), conn)
+
+
+def fts_query(text: str) -> str:
+    """Converte o texto digitado numa consulta FTS5 segura: cada palavra vira um termo entre aspas
+    (AND implícito), sem deixar operadores/sintaxe do FTS5 vazarem do texto do usuário."""
+    return " ".join('"' + term.replace('"', '""') + '"' for term in text.split())
+
+
+def has_fts(conn: sqlite3.Connection) -> bool:
+    row = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'chat_history_fts'").fetchone()
+    return row is not None
+
+
+def search_messages(text: str, session_id: Optional[str] = None, limit: int = 50,
+                    conn: Optional[sqlite3.Connection] = None) -> List[Dict[str, Any]]:
+    """Busca por palavras em user_message/assistant_message, mais relevantes primeiro (bm25).
+
+    Todas as palavras precisam aparecer (acentos e maiúsculas são ignorados). Sem FTS5 no SQLite,
+    cai para LIKE por palavra (varredura completa, só para não deixar a busca indisponível).
+    """
+    conn = conn or history.get_db_connection()
+    if conn is None or not text.split():
+        return []
+    session_filter = " AND h.session_id = ?" if session_id is not None else ""
+    if has_fts(conn):
+        sql = (f"SELECT h.{HISTORY_COLUMNS.replace(', ', ', h.')}, bm25(chat_history_fts) AS rank "
+               "FROM chat_history_fts JOIN chat_history h ON h.id = chat_history_fts.rowid "
+               f"WHERE chat_history_fts MATCH ?{session_filter} ORDER BY rank LIMIT ?")
+        params: List[Any] = [fts_query(text)]
+    else:
+        terms = text.split()
+        like = " AND ".join("(h.user_message LIKE ? OR h.assistant_message LIKE ?)" for _ in terms)
+        sql = (f"SELECT h.{HISTORY_COLUMNS.replace(', ', ', h.')}, 0 AS rank FROM chat_history h "
+               f"WHERE {like}{session_filter} ORDER BY h.id DESC LIMIT ?")
+        params = [f"%{term}%" for term in terms for _ in range(2)]
+    if session_id is not None:
+        params.append(session_id)
+    params.append(limit)
+    return _query(sql, params, conn)
+
+
+def get_history_page(session_id: Optional[str] = None, since: Optional[str] = None, until: Optional[str] = None,
+                     feedback: Optional[int] = None, page_size: int = 500, after: Optional[Tuple[str, int]] = None,
+                     ascending: bool = False, conn: Optional[sqlite3.Connection] = None
+                     ) -> Tuple[List[Dict[str, Any]], Optional[Tuple[str, int]]]:
+    """Uma página do histórico com paginação por chave (keyset), ordenada por (timestamp, id).
+
+    Em vez de OFFSET (que relê tudo o que ficou para trás), cada página começa depois da chave
+    (timestamp, id) da última linha da anterior, então o custo por página é constante.
+
+    Args:
+        session_id, since, until, feedback: Filtros opcionais (since inclusivo, until exclusivo).
+        after: Chave devolvida pela página anterior (None = primeira página).
+        ascending: Mais antigas primeiro (padrão: mais recentes primeiro).
+
+    Returns:
+        (linhas, chave da próxima página ou None se esta foi a última).
+    """
+    conditions, params = [], []
+    if session_id is not None:
+        conditions.append("session_id = ?")
+        params.append(session_id)
+    if since is not None:
+        conditions.append("timestamp >= ?")
+        params.append(since)
+    if until is not None:
+        conditions.append("timestamp < ?")
+        params.append(until)
+    if feedback is not None:
+        conditions.append("feedback = ?")
+        params.append(feedback)
+    if after is not None:
+        conditions.append("(timestamp, id) > (?, ?)" if ascending else "(timestamp, id) < (?, ?)")
+        params.extend(after)
+    where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+    order = "ASC" if ascending else "DESC"
+    rows = _query(f"SELECT {HISTORY_COLUMNS} FROM chat_history{where} "
+                  f"ORDER BY timestamp {order}, id {order} LIMIT ?", params + [page_size], conn)
+    next_key = (rows[-1]["timestamp"], rows[-1]["id"]) if len(rows) == page_size else None
+    return rows, next_key
+
+
+def iter_history(session_id: Optional[str] = None, since: Optional[str] = None, until: Optional[str] = None,
+                 feedback: Optional[int] = None, page_size: int = 500, ascending: bool = False,
+                 conn: Optional[sqlite3.Connection] = None) -> Iterator[Dict[str, Any]]:
+    """Percorre o histórico filtrado linha a linha, buscando uma página por vez (memória constante)."""
+    after = None
+    while True:
+        rows, after = get_history_page(session_id, since, until, feedback, page_size, after, ascending, conn)
+        yield from rows
+        if after is None:
+            return
@@ -0,0 +1,276 @@
+import atexit
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Dict, Optional
+
+from src.database import history
+
+# Máximo de escritas agrupadas numa mesma transação
+BATCH_SIZE = int(os.getenv("HISTORY_BATCH_SIZE", "200"))
+# Quanto o escritor espera por mais itens antes de gravar um lote incompleto (ms)
+FLUSH_INTERVAL_MS = float(os.getenv("HISTORY_FLUSH_INTERVAL_MS", "20"))
+# Limite da fila; com a fila cheia, submit() bloqueia (contrapressão em vez de memória sem limite)
+QUEUE_MAX = int(os.getenv("HISTORY_QUEUE_MAX", "10000"))
+# Amostras guardadas para os percentis das métricas
+METRICS_WINDOW = 1000
+
+_INSERT = "insert"
+_FEEDBACK = "feedback"
+_FLUSH = "flush"
+_STOP = "stop"
+
+
+def _percentile(samples, pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+class HistoryWriter:
+    """Grava o histórico do chat em segundo plano (write-behind), em transações agrupadas.
+
+    As inserções de todas as sessões entram numa fila; uma thread dedicada as grava em lotes
+    de até BATCH_SIZE, com um único commit por lote. submit() devolve um Future com o ID da
+    linha (ou None se a gravação falhar), e o feedback pode ser enfileirado com esse Future
+    antes mesmo de a mensagem chegar ao banco.
+    """
+
+    def __init__(self, batch_size: int = BATCH_SIZE, flush_interval_ms: float = FLUSH_INTERVAL_MS,
+                 queue_max: int = QUEUE_MAX):
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval_ms / 1000
+        self._queue = queue.Queue(maxsize=queue_max)
+        self._lock = threading.Lock()
+        # Protege _closed junto com o put na fila: nada entra na fila depois do marcador de parada
+        self._enqueue_lock = threading.Lock()
+        self._closed = False
+        self._batches = 0
+        self._rows = 0
+        self._failures = 0
+        self._max_batch = 0
+        self._flush_ms = deque(maxlen=METRICS_WINDOW)
+        self._wait_ms = deque(maxlen=METRICS_WINDOW)
+        self._thread = threading.Thread(target=self._run, name="history-writer", daemon=True)
+        self._thread.start()
+
+    # --- API pública ---
+
+    def submit(self, user_message: str, assistant_message: str, session_id: Optional[str] = None) -> Future:
+        """Enfileira uma interação; o Future resolve para o ID da linha inserida (ou None)."""
+        params = (user_message, assistant_message, session_id)
+        return self._enqueue(_INSERT, params)
+
+    def submit_feedback(self, message_id, feedback_value: int) -> Future:
+        """Enfileira o feedback de uma mensagem.
+
+        Args:
+            message_id: ID da linha ou o Future devolvido por submit() (resolvido pelo escritor,
+                        que grava a inserção antes por ela ter entrado antes na fila).
+            feedback_value: 1 ou -1.
+        """
+        return self._enqueue(_FEEDBACK, (message_id, feedback_value))
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Espera até que tudo o que foi enfileirado antes desta chamada esteja gravado."""
+        if self._closed or not self._thread.is_alive():
+            return True
+        try:
+            self._enqueue(_FLUSH, None).result(timeout=timeout)
+            return True
+        except Exception:
+            return False
+
+    def close(self, timeout: Optional[float] = 10.0) -> None:
+        """Grava o que estiver pendente e encerra a thread do escritor."""
+        with self._enqueue_lock:
+            if self._closed:
+                return
+            self._closed = True
+            alive = self._thread.is_alive()
+            if alive:
+                self._queue.put((_STOP, None, None, time.perf_counter()))
+        if alive:
+            self._thread.join(timeout)
+            if self._thread.is_alive():
+                logging.warning(f"Escritor do histórico não terminou em {timeout}s; {self._queue.qsize()} itens pendentes.")
+        # Quem espera por um Future que ficou na fila recebe o erro em vez de travar
+        self._fail_pending()
+        m = self.metrics()
+        logging.info(
+            f"Escritor do histórico encerrado: {m['rows_written']} escritas em {m['batches']} lotes, "
+            f"commit p50={m['flush_ms_p50']:.1f}ms p99={m['flush_ms_p99']:.1f}ms, falhas={m['failures']}"
+        )
+
+    def metrics(self) -> Dict[str, Any]:
+        """Profundidade da fila e latências (commit por lote e espera fila→commit por item)."""
+        with self._lock:
+            flush_ms = list(self._flush_ms)
+            wait_ms = list(self._wait_ms)
+            return {
+                "queue_depth": self._queue.qsize(),
+                "batches": self._batches,
+                "rows_written": self._rows,
+                "failures": self._failures,
+                "max_batch": self._max_batch,
+                "flush_ms_last": flush_ms[-1] if flush_ms else 0.0,
+                "flush_ms_avg": sum(flush_ms) / len(flush_ms) if flush_ms else 0.0,
+                "flush_ms_p50": _percentile(flush_ms, 50),
+                "flush_ms_p99": _percentile(flush_ms, 99),
+                "wait_ms_p50": _percentile(wait_ms, 50),
+                "wait_ms_p99": _percentile(wait_ms, 99),
+            }
+
+    # --- Thread do escritor ---
+
+    def _enqueue(self, kind: str, params) -> Future:
+        future = Future()
+        with self._enqueue_lock:
+            if not self._closed:
+                self._queue.put((kind, params, future, time.perf_counter()))
+                return future
+        # Depois do close() (ex: atexit já rodou) grava direto, sem fila
+        self._write_one(kind, params, future)
+        return future
+
+    def _fail_pending(self) -> None:
+        """Esvazia a fila, falhando os Futures que não chegaram a ser gravados."""
+        error = RuntimeError("escritor do histórico encerrado antes de gravar o item")
+        while True:
+            try:
+                _, _, future, _ = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if future is not None and not future.done():
+                future.set_exception(error)
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.flush_interval
+        # Um marcador de flush/stop fecha o lote: tudo o que veio antes dele é gravado junto
+        while len(batch) < self.batch_size and batch[-1][0] in (_INSERT, _FEEDBACK):
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            writes = [item for item in batch if item[0] in (_INSERT, _FEEDBACK)]
+            try:
+                if writes:
+                    self._write_batch(writes)
+            except Exception as e:
+                # Não deixa a thread morrer com Futures pendentes (quem espera ficaria travado)
+                logging.error(f"Erro inesperado no escritor do histórico: {e}", exc_info=True)
+                self._rollback()
+                for _, _, future, _ in writes:
+                    if not future.done():
+                        future.set_exception(e)
+            kind, _, future, _ = batch[-1]
+            if kind == _FLUSH:
+                future.set_result(True)
+            elif kind == _STOP:
+                self._fail_pending()
+                history.close_db_connection()
+                return
+
+    def _rollback(self) -> None:
+        """Desfaz a transação aberta por um lote que falhou no meio (senão o próximo commit a gravaria)."""
+        conn = history.get_db_connection()
+        if conn is None:
+            return
+        try:
+            conn.rollback()
+        except sqlite3.Error as e:
+            logging.error(f"Erro ao desfazer o lote do histórico: {e}")
+
+    def _write_batch(self, writes) -> None:
+        start = time.perf_counter()
+        results = {}
+        conn = history.get_db_connection()
+        try:
+            if conn is None:
+                raise sqlite3.OperationalError("sem conexão com o banco")
+            for kind, params, future, _ in writes:
+                results[future] = self._execute(conn, kind, params, results)
+            conn.commit()
+        except sqlite3.Error as e:
+            if conn is not None:
+                conn.rollback()
+            logging.warning(f"Falha ao gravar lote de {len(writes)} itens no histórico ({e}); gravando um a um.")
+            for kind, params, future, _ in writes:
+                self._write_one(kind, params, future)
+            self._record(writes, start, failed=True)
+            return
+        for _, _, future, _ in writes:
+            future.set_result(results[future])
+        self._record(writes, start)
+
+    def _execute(self, conn, kind: str, params, batch_results: Dict[Future, Any]):
+        if kind == _INSERT:
+            return conn.execute(history.SQL_INSERT_MESSAGE, params).lastrowid
+        message_id, feedback_value = params
+        if isinstance(message_id, Future):
+            # A inserção pode estar neste mesmo lote, ainda sem commit
+            message_id = batch_results[message_id] if message_id in batch_results else message_id.result()
+        if message_id is None or feedback_value not in [1, -1]:
+            logging.warning(f"Tentativa de atualizar feedback com ID inválido ({message_id}) ou valor ({feedback_value})")
+            return None
+        conn.execute(history.SQL_UPDATE_FEEDBACK, (feedback_value, message_id))
+        return message_id
+
+    def _write_one(self, kind: str, params, future: Future) -> None:
+        """Caminho síncrono (fallback de lote com erro ou escritor já encerrado), via history.py."""
+        if kind == _FLUSH:
+            future.set_result(True) # Sem fila não há nada pendente
+            return
+        if kind == _INSERT:
+            future.set_result(history.save_chat_message(*params))
+            return
+        message_id, feedback_value = params
+        if isinstance(message_id, Future):
+            message_id = message_id.result()
+        history.update_feedback(message_id=message_id, feedback_value=feedback_value)
+        future.set_result(message_id)
+
+    def _record(self, writes, start: float, failed: bool = False) -> None:
+        now = time.perf_counter()
+        with self._lock:
+            self._batches += 1
+            self._rows += len(writes)
+            self._failures += int(failed)
+            self._max_batch = max(self._max_batch, len(writes))
+            self._flush_ms.append((now - start) * 1000)
+            self._wait_ms.extend((now - enqueued) * 1000 for _, _, _, enqueued in writes)
+        logging.debug(f"Histórico: lote de {len(writes)} gravado em {(now - start) * 1000:.1f}ms")
+
+
+_writer: Optional[HistoryWriter] = None
+_writer_lock = threading.Lock()
+
+
+def get_history_writer() -> HistoryWriter:
+    """Retorna o escritor compartilhado do processo, criando-o (e a thread) no primeiro uso."""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = HistoryWriter()
+            # Registrado depois do atexit de history.py, então roda antes de as conexões fecharem
+            atexit.register(_writer.close)
+        return _writer
+
+
+def history_writer_metrics() -> Dict[str, Any]:
+    """Métricas do escritor compartilhado ({} se ele ainda não foi criado)."""
+    return _writer.metrics() if _writer is not None else {}
@@ -19,15 +19,24 @@ def get_table_schema(cursor, table_name):
     cursor.execute(f"PRAGMA table_info({table_name});")
     return cursor.fetchall()
 
-def preview_table_data(cursor, table_name, limit=5):
-    """Retorna uma prévia dos dados de uma tabela"""
+# Linhas buscadas e exibidas por vez na prévia (a prévia nunca fica inteira em memória)
+PREVIEW_PAGE_SIZE = 50
+
+def iter_pages(cursor, page_size):
+    """Gera listas de até page_size linhas com fetchmany, até esgotar o cursor"""
+    while True:
+        rows = cursor.fetchmany(page_size)
+        if not rows:
+            return
+        yield rows
+
+def preview_table_data(cursor, table_name, limit=5, page_size=PREVIEW_PAGE_SIZE):
+    """Retorna os nomes das colunas e um gerador de páginas com a prévia dos dados de uma tabela"""
     try:
-        cursor.execute(f"SELECT * FROM {table_name} LIMIT {limit};")
-        rows = cursor.fetchall()
-        # Obtém os nomes das colunas
-        cursor.execute(f"PRAGMA table_info({table_name});")
-        columns = [col[1] for col in cursor.fetchall()]
-        return columns, rows
+        cursor.execute(f"SELECT * FROM {table_name} LIMIT ?;", (limit,))
+        # Nomes das colunas vêm do próprio cursor
+        columns = [col[0] for col in cursor.description]
+        return columns, iter_pages(cursor, page_size)
     except sqlite3.Error as e:
         print(f"Erro ao acessar a tabela {table_name}: {e}")
         return None, None
@@ -80,10 +89,11 @@ def main():
                     else:  # choice == "2"
                         # Mostra prévia dos dados
                         limit = int(input("Quantas linhas deseja visualizar? (padrão: 5) ") or 5)
-                        columns, rows = preview_table_data(cursor, table_name, limit)
-                        if columns and rows:
+                        columns, pages = preview_table_data(cursor, table_name, limit)
+                        if columns:
                             print(f"\n=== Prévia dos Dados da Tabela {table_name} ===")
-                            print(tabulate(rows, headers=columns, tablefmt="grid"))
+                            for rows in pages:
+                                print(tabulate(rows, headers=columns, tablefmt="grid"))
                 else:
                     print("Número de tabela inválido!")
             else:
@@ -0,0 +1,189 @@
+"""
+Migrações versionadas do banco de histórico (chat_history.db).
+
+Cada migração tem um número de versão crescente e é aplicada uma única vez; as versões
+aplicadas ficam registradas na tabela schema_version. Rodar migrate() com o banco já na última
+versão custa uma consulta. O app chama migrate() na inicialização; ferramentas de leitura
+(check_db.py, inspect_tables.py) não chamam e, portanto, não escrevem no banco.
+
+Uso:
+    python -m src.database.migrations            # aplica as pendentes
+    python -m src.database.migrations --status   # só mostra a versão atual
+"""
+
+import argparse
+import logging
+import sqlite3
+from typing import Callable, List, NamedTuple, Optional
+
+from src.database import history
+
+SQL_CREATE_VERSION_TABLE = """
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        description TEXT NOT NULL,
+        applied_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+
+class Migration(NamedTuple):
+    version: int
+    description: str
+    apply: Callable[[sqlite3.Connection], None]
+
+
+def _create_chat_history(conn: sqlite3.Connection) -> None:
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS chat_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_id TEXT, -- Para agrupar mensagens de uma mesma sessão (opcional)
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            user_message TEXT NOT NULL,
+            assistant_message TEXT NOT NULL,
+            feedback INTEGER DEFAULT NULL
+        )
+    """)
+
+
+def _add_feedback_column(conn: sqlite3.Connection) -> None:
+    # Bancos criados antes da coluna feedback (a criação da v1 já a inclui)
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(chat_history)")}
+    if "feedback" not in columns:
+        conn.execute("ALTER TABLE chat_history ADD COLUMN feedback INTEGER DEFAULT NULL")
+        logging.info("Coluna 'feedback' adicionada à tabela 'chat_history'.")
+
+
+def _create_indexes(conn: sqlite3.Connection) -> None:
+    # Replay de sessão (session_id + ordem de inserção), listagens por data e filtro por feedback.
+    # O índice de feedback é parcial: a maioria das linhas não tem feedback.
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_chat_history_session ON chat_history(session_id, id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_chat_history_timestamp ON chat_history(timestamp)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_chat_history_feedback ON chat_history(feedback, timestamp) "
+                 "WHERE feedback IS NOT NULL")
+
+
+def _create_fts(conn: sqlite3.Connection) -> None:
+    # Índice de texto com conteúdo externo (não duplica as mensagens), mantido por triggers.
+    # O trigger de UPDATE só dispara quando o texto muda, não a cada feedback.
+    try:
+        conn.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS chat_history_fts USING fts5(
+                user_message, assistant_message,
+                content='chat_history', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+            )
+        """)
+    except sqlite3.OperationalError as e:
+        if "fts5" not in str(e):
+            raise
+        logging.warning(f"SQLite sem FTS5 ({e}); a busca por palavras usará LIKE.")
+        return
+    for sql in (
+        """CREATE TRIGGER IF NOT EXISTS chat_history_fts_insert AFTER INSERT ON chat_history BEGIN
+               INSERT INTO chat_history_fts(rowid, user_message, assistant_message)
+               VALUES (new.id, new.user_message, new.assistant_message);
+           END""",
+        """CREATE TRIGGER IF NOT EXISTS chat_history_fts_delete AFTER DELETE ON chat_history BEGIN
+               INSERT INTO chat_history_fts(chat_history_fts, rowid, user_message, assistant_message)
+               VALUES ('delete', old.id, old.user_message, old.assistant_message);
+           END""",
+        """CREATE TRIGGER IF NOT EXISTS chat_history_fts_update
+               AFTER UPDATE OF user_message, assistant_message ON chat_history BEGIN
+               INSERT INTO chat_history_fts(chat_history_fts, rowid, user_message, assistant_message)
+               VALUES ('delete', old.id, old.user_message, old.assistant_message);
+               INSERT INTO chat_history_fts(rowid, user_message, assistant_message)
+               VALUES (new.id, new.user_message, new.assistant_message);
+           END""",
+    ):
+        conn.execute(sql)
+    # Indexa as linhas que já existiam
+    conn.execute("INSERT INTO chat_history_fts(chat_history_fts) VALUES ('rebuild')")
+
+
+# Em ordem de versão; novas migrações entram sempre no fim, nunca alterando as já publicadas
+MIGRATIONS: List[Migration] = [
+    Migration(1, "cria a tabela chat_history", _create_chat_history),
+    Migration(2, "adiciona a coluna feedback em bancos antigos", _add_feedback_column),
+    Migration(3, "índices por sessão, data e feedback", _create_indexes),
+    Migration(4, "busca por palavras (FTS5) em chat_history", _create_fts),
+]
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+def current_version(conn: sqlite3.Connection) -> int:
+    """Versão aplicada no banco (0 se a tabela schema_version ainda não existe)."""
+    try:
+        row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    except sqlite3.OperationalError:
+        return 0
+    return row[0] or 0
+
+
+def migrate(conn: Optional[sqlite3.Connection] = None, target: Optional[int] = None) -> Optional[int]:
+    """Aplica as migrações pendentes até `target` (padrão: a última).
+
+    Cada migração roda na sua própria transação, junto com o registro em schema_version.
+    A transação é aberta com BEGIN IMMEDIATE e a versão é relida depois do lock, então dois
+    processos iniciando ao mesmo tempo não aplicam a mesma migração duas vezes.
+
+    Returns:
+        A versão do banco ao final, ou None se não foi possível conectar/migrar.
+    """
+    conn = conn or history.get_db_connection()
+    if conn is None:
+        return None
+    target = LATEST_VERSION if target is None else target
+    try:
+        version = current_version(conn)
+        if version >= target:
+            return version
+        conn.execute(SQL_CREATE_VERSION_TABLE)
+        conn.commit()
+        for migration in MIGRATIONS:
+            if migration.version > target:
+                break
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if migration.version <= current_version(conn):
+                    conn.rollback()
+                    continue
+                migration.apply(conn)
+                conn.execute("INSERT INTO schema_version(version, description) VALUES(?, ?)",
+                             (migration.version, migration.description))
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+            logging.info(f"Migração {migration.version} aplicada: {migration.description}")
+        return current_version(conn)
+    except sqlite3.Error as e:
+        logging.error(f"Erro ao migrar o banco de histórico {history.DB_FILE}: {e}")
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default=None, help=f"Arquivo do banco (padrão: {history.DB_FILE})")
+    parser.add_argument("--status", action="store_true", help="Só mostra a versão atual, sem migrar")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    if args.db:
+        history.DB_FILE = args.db
+    if args.status:
+        try:
+            conn = sqlite3.connect(f"file:{history.DB_FILE}?mode=ro", uri=True)
+        except sqlite3.Error as e:
+            print(f"Erro ao abrir {history.DB_FILE}: {e}")
+            return
+        print(f"{history.DB_FILE}: versão {current_version(conn)} (última disponível: {LATEST_VERSION})")
+        conn.close()
+        return
+    version = migrate()
+    if version is not None:
+        print(f"{history.DB_FILE}: versão {version}")
+
+
+if __name__ == "__main__":
+    main()
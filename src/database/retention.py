@@ -0,0 +1,359 @@
+"""
+Retenção do histórico: mantém só os últimos dias em chat_history.db e move o resto para arquivos
+mensais (chat_history_AAAA-MM.db, mesmo esquema, com índices e FTS5), além de devolver ao sistema
+o espaço liberado com incremental_vacuum.
+
+A movimentação é feita em lotes pequenos (uma transação curta por lote no banco principal), para
+não segurar o lock de escrita e não atrasar as inserções do chat. As funções *_all consultam o
+banco principal e os arquivos como se fossem uma tabela só.
+
+Configuração (.env):
+    HISTORY_RETENTION_DAYS     dias mantidos no banco principal (padrão 0 = retenção desligada). Opcional porque
+                               src/database/prepare_training_data.py lê só chat_history.db: com a retenção
+                               ligada, as conversas arquivadas ficam fora dos dados de treino
+    HISTORY_ARCHIVE_DIR        pasta dos arquivos mensais (padrão: chat_history_archive ao lado do banco)
+    HISTORY_ARCHIVE_KEEP_DAYS  apaga arquivos mensais mais antigos que isso (padrão: nunca)
+    HISTORY_RETENTION_INTERVAL segundos entre execuções do worker (padrão 3600)
+
+Uso:
+    python -m src.database.retention --status
+    python -m src.database.retention --run --days 90
+    python -m src.database.retention --vacuum-full   # converte bancos antigos para auto_vacuum incremental
+"""
+
+import argparse
+import atexit
+import glob
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional
+
+from src.database import history, history_query
+from src.database.migrations import migrate
+
+RETENTION_DAYS = int(os.getenv("HISTORY_RETENTION_DAYS", "0"))
+ARCHIVE_DIR = os.getenv("HISTORY_ARCHIVE_DIR", "")
+ARCHIVE_KEEP_DAYS = int(os.getenv("HISTORY_ARCHIVE_KEEP_DAYS", "0"))
+RETENTION_INTERVAL = float(os.getenv("HISTORY_RETENTION_INTERVAL", "3600"))
+# Linhas movidas por transação e pausa entre lotes (deixa as inserções do chat passarem)
+BATCH_ROWS = int(os.getenv("HISTORY_RETENTION_BATCH_ROWS", "2000"))
+BATCH_PAUSE = float(os.getenv("HISTORY_RETENTION_BATCH_PAUSE", "0.01"))
+# Páginas devolvidas por chamada de incremental_vacuum
+VACUUM_PAGES = int(os.getenv("HISTORY_VACUUM_PAGES", "2000"))
+
+ARCHIVE_PREFIX = "chat_history_"
+SQL_ARCHIVE_INSERT = ("INSERT OR IGNORE INTO chat_history(id, session_id, timestamp, user_message, assistant_message, feedback) "
+                      "VALUES (?, ?, ?, ?, ?, ?)")
+
+
+class RetentionPolicy(NamedTuple):
+    hot_days: int
+    archive_dir: str
+    archive_keep_days: Optional[int] = None # None = arquivos mensais nunca são apagados
+
+
+def default_archive_dir(db_file: Optional[str] = None) -> str:
+    return ARCHIVE_DIR or os.path.join(os.path.dirname(os.path.abspath(db_file or history.DB_FILE)), "chat_history_archive")
+
+
+def policy_from_env() -> RetentionPolicy:
+    return RetentionPolicy(RETENTION_DAYS, default_archive_dir(), ARCHIVE_KEEP_DAYS or None)
+
+
+def _cutoff(days: int, now: Optional[datetime] = None) -> str:
+    # CURRENT_TIMESTAMP do SQLite é UTC no formato "AAAA-MM-DD HH:MM:SS"
+    now = now or datetime.now(timezone.utc)
+    return (now - timedelta(days=days)).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def archive_path(archive_dir: str, month: str) -> str:
+    return os.path.join(archive_dir, f"{ARCHIVE_PREFIX}{month}.db")
+
+
+def list_archives(archive_dir: str) -> List[str]:
+    """Arquivos mensais existentes, do mais antigo para o mais recente."""
+    return sorted(glob.glob(os.path.join(archive_dir, f"{ARCHIVE_PREFIX}????-??.db")))
+
+
+def _archive_month(path: str) -> str:
+    return os.path.basename(path)[len(ARCHIVE_PREFIX):-len(".db")]
+
+
+def open_archive(path: str) -> sqlite3.Connection:
+    """Abre (criando, se preciso) um arquivo mensal com o mesmo esquema do banco principal."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = history._open_connection(path)
+    if migrate(conn) is None:
+        conn.close()
+        raise sqlite3.OperationalError(f"não foi possível preparar o arquivo {path}")
+    return conn
+
+
+def archive_old_rows(policy: RetentionPolicy, conn: Optional[sqlite3.Connection] = None,
+                     now: Optional[datetime] = None, stop_event: Optional[threading.Event] = None) -> int:
+    """Move as linhas mais antigas que policy.hot_days para os arquivos mensais.
+
+    Cada lote é primeiro gravado (INSERT OR IGNORE) e confirmado no arquivo e só então apagado
+    do banco principal; se o processo cair no meio, a próxima execução repete o lote sem duplicar.
+
+    Returns:
+        Número de linhas movidas.
+    """
+    conn = conn or history.get_db_connection()
+    if conn is None or policy.hot_days <= 0:
+        return 0
+    cutoff = _cutoff(policy.hot_days, now)
+    archives: Dict[str, sqlite3.Connection] = {}
+    moved = 0
+    try:
+        while stop_event is None or not stop_event.is_set():
+            rows = conn.execute(f"SELECT {history_query.HISTORY_COLUMNS} FROM chat_history WHERE timestamp < ? "
+                                "ORDER BY timestamp, id LIMIT ?", (cutoff, BATCH_ROWS)).fetchall()
+            if not rows:
+                break
+            by_month = defaultdict(list)
+            for row in rows:
+                by_month[row["timestamp"][:7]].append(tuple(row))
+            for month, month_rows in by_month.items():
+                if month not in archives:
+                    archives[month] = open_archive(archive_path(policy.archive_dir, month))
+                archives[month].executemany(SQL_ARCHIVE_INSERT, month_rows)
+                archives[month].commit()
+            # Só apaga do banco principal o que já está confirmado nos arquivos
+            conn.executemany("DELETE FROM chat_history WHERE id = ?", [(row["id"],) for row in rows])
+            conn.commit()
+            moved += len(rows)
+            time.sleep(BATCH_PAUSE)
+    except sqlite3.Error as e:
+        conn.rollback()
+        logging.warning(f"Retenção do histórico interrompida após {moved} linhas: {e}")
+    finally:
+        for archive in archives.values():
+            archive.close()
+    if moved:
+        logging.info(f"Retenção: {moved} linhas anteriores a {cutoff} movidas para {policy.archive_dir}")
+    return moved
+
+
+def expire_archives(policy: RetentionPolicy, now: Optional[datetime] = None) -> List[str]:
+    """Apaga os arquivos mensais inteiramente anteriores a policy.archive_keep_days."""
+    if not policy.archive_keep_days:
+        return []
+    cutoff_month = _cutoff(policy.archive_keep_days, now)[:7]
+    removed = []
+    for path in list_archives(policy.archive_dir):
+        if _archive_month(path) < cutoff_month:
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+            removed.append(path)
+            logging.info(f"Retenção: arquivo {path} apagado (mais antigo que {policy.archive_keep_days} dias)")
+    return removed
+
+
+def incremental_vacuum(conn: Optional[sqlite3.Connection] = None, pages: int = VACUUM_PAGES) -> int:
+    """Devolve até `pages` páginas livres ao sistema e trunca o WAL. Retorna as páginas livres restantes.
+
+    Só tem efeito em bancos com auto_vacuum=INCREMENTAL (os novos já nascem assim; os antigos
+    precisam de um --vacuum-full uma vez).
+    """
+    conn = conn or history.get_db_connection()
+    if conn is None:
+        return 0
+    try:
+        if history_query.has_fts(conn):
+            # Apagar linhas só grava marcadores de remoção no FTS5; o merge funde os segmentos e
+            # descarta as entradas removidas, senão o índice de texto cresce sem parar
+            conn.execute("INSERT INTO chat_history_fts(chat_history_fts, rank) VALUES ('merge', 500)")
+            conn.commit()
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            return conn.execute("PRAGMA freelist_count").fetchone()[0]
+        conn.execute(f"PRAGMA incremental_vacuum({int(pages)})").fetchall()
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+        return conn.execute("PRAGMA freelist_count").fetchone()[0]
+    except sqlite3.Error as e:
+        logging.warning(f"incremental_vacuum falhou: {e}")
+        return 0
+
+
+def vacuum_full(conn: Optional[sqlite3.Connection] = None) -> None:
+    """Ativa auto_vacuum=INCREMENTAL num banco existente (exige um VACUUM completo, que bloqueia o banco)."""
+    conn = conn or history.get_db_connection()
+    conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    conn.execute("VACUUM")
+
+
+def run_retention(policy: Optional[RetentionPolicy] = None, now: Optional[datetime] = None,
+                  stop_event: Optional[threading.Event] = None) -> Dict[str, Any]:
+    """Uma rodada completa: arquiva, apaga arquivos expirados e devolve espaço."""
+    policy = policy or policy_from_env()
+    moved = archive_old_rows(policy, now=now, stop_event=stop_event)
+    removed = expire_archives(policy, now)
+    free_pages = incremental_vacuum() if moved else None
+    return {"moved": moved, "archives_removed": len(removed), "free_pages": free_pages}
+
+
+class RetentionWorker:
+    """Roda run_retention() periodicamente numa thread em segundo plano."""
+
+    def __init__(self, policy: Optional[RetentionPolicy] = None, interval: float = RETENTION_INTERVAL):
+        self.policy = policy
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="history-retention", daemon=True)
+
+    def start(self) -> "RetentionWorker":
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = 5.0) -> None:
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                run_retention(self.policy, stop_event=self._stop)
+            except Exception as e:
+                logging.error(f"Erro na retenção do histórico: {e}", exc_info=True)
+            self._stop.wait(self.interval)
+        history.close_db_connection()
+
+
+_worker: Optional[RetentionWorker] = None
+
+
+def start_retention_worker() -> Optional[RetentionWorker]:
+    """Inicia o worker de retenção do processo (uma vez); None se HISTORY_RETENTION_DAYS=0."""
+    global _worker
+    if RETENTION_DAYS <= 0:
+        return None
+    if _worker is None:
+        _worker = RetentionWorker().start()
+        atexit.register(_worker.stop)
+    return _worker
+
+
+# --- Consultas sobre banco principal + arquivos ---
+
+def _open_read_only(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def _archives_in_range(archive_dir: str, since: Optional[str], until: Optional[str]) -> List[str]:
+    paths = list_archives(archive_dir)
+    return [p for p in paths
+            if (since is None or _archive_month(p) >= since[:7]) and (until is None or _archive_month(p) <= until[:7])]
+
+
+def iter_history_all(session_id: Optional[str] = None, since: Optional[str] = None, until: Optional[str] = None,
+                     feedback: Optional[int] = None, page_size: int = 500, ascending: bool = False,
+                     conn: Optional[sqlite3.Connection] = None, archive_dir: Optional[str] = None
+                     ) -> Iterator[Dict[str, Any]]:
+    """Como history_query.iter_history, mas incluindo os arquivos mensais.
+
+    Os arquivos guardam só linhas mais antigas que as do banco principal e não se sobrepõem,
+    então basta percorrê-los em sequência (arquivos do mês mais recente para o mais antigo).
+    """
+    archive_dir = archive_dir or policy_from_env().archive_dir
+    archives = _archives_in_range(archive_dir, since, until)
+    sources: List[Optional[str]] = [None] + archives[::-1] # None = banco principal
+    if ascending:
+        sources.reverse()
+    for source in sources:
+        source_conn = conn if source is None else _open_read_only(source)
+        try:
+            yield from history_query.iter_history(session_id, since, until, feedback, page_size, ascending, source_conn)
+        finally:
+            if source is not None:
+                source_conn.close()
+
+
+def get_session_messages_all(session_id: str, conn: Optional[sqlite3.Connection] = None,
+                             archive_dir: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Replay completo de uma sessão, incluindo as interações já arquivadas."""
+    archive_dir = archive_dir or policy_from_env().archive_dir
+    messages = []
+    for path in list_archives(archive_dir):
+        archive = _open_read_only(path)
+        try:
+            messages.extend(history_query.get_session_messages(session_id, conn=archive))
+        finally:
+            archive.close()
+    messages.extend(history_query.get_session_messages(session_id, conn=conn))
+    return messages
+
+
+def search_messages_all(text: str, session_id: Optional[str] = None, limit: int = 50,
+                        conn: Optional[sqlite3.Connection] = None, archive_dir: Optional[str] = None
+                        ) -> List[Dict[str, Any]]:
+    """Busca por palavras no banco principal e nos arquivos; junta os resultados pelo rank (bm25)."""
+    archive_dir = archive_dir or policy_from_env().archive_dir
+    results = history_query.search_messages(text, session_id, limit, conn)
+    for path in list_archives(archive_dir):
+        archive = _open_read_only(path)
+        try:
+            results.extend(history_query.search_messages(text, session_id, limit, archive))
+        finally:
+            archive.close()
+    results.sort(key=lambda row: row["rank"])
+    return results[:limit]
+
+
+def status(policy: RetentionPolicy) -> Dict[str, Any]:
+    """Tamanhos e contagens do banco principal e dos arquivos mensais."""
+    def size(path):
+        return sum(os.path.getsize(path + s) for s in ("", "-wal") if os.path.exists(path + s))
+
+    conn = _open_read_only(history.DB_FILE)
+    try:
+        hot_rows = conn.execute("SELECT COUNT(*) FROM chat_history").fetchone()[0]
+        oldest = conn.execute("SELECT MIN(timestamp) FROM chat_history").fetchone()[0]
+        free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        auto_vacuum = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+    finally:
+        conn.close()
+    archives = [{"month": _archive_month(p), "bytes": size(p)} for p in list_archives(policy.archive_dir)]
+    return {"hot_rows": hot_rows, "hot_oldest": oldest, "hot_bytes": size(history.DB_FILE),
+            "free_pages": free_pages, "incremental_vacuum": auto_vacuum == 2, "archives": archives}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default=None, help=f"Arquivo do banco (padrão: {history.DB_FILE})")
+    parser.add_argument("--days", type=int, default=None, help=f"Dias mantidos no banco principal (padrão: {RETENTION_DAYS})")
+    parser.add_argument("--run", action="store_true", help="Executa uma rodada de retenção")
+    parser.add_argument("--vacuum-full", action="store_true", help="Ativa auto_vacuum incremental (VACUUM completo)")
+    parser.add_argument("--status", action="store_true", help="Mostra tamanhos e arquivos")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    if args.db:
+        history.DB_FILE = args.db
+    policy = policy_from_env()
+    if args.days is not None:
+        policy = policy._replace(hot_days=args.days)
+    if args.vacuum_full:
+        vacuum_full()
+        print("auto_vacuum=INCREMENTAL ativado.")
+    if args.run:
+        print(run_retention(policy))
+    if args.status or not (args.run or args.vacuum_full):
+        info = status(policy)
+        print(f"{history.DB_FILE}: {info['hot_rows']} linhas desde {info['hot_oldest']}, "
+              f"{info['hot_bytes'] / 1024 / 1024:.1f} MiB, {info['free_pages']} páginas livres, "
+              f"vacuum incremental: {'sim' if info['incremental_vacuum'] else 'não'}")
+        for archive in info["archives"]:
+            print(f"  {archive['month']}: {archive['bytes'] / 1024 / 1024:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
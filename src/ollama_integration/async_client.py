@@ -0,0 +1,116 @@
+import asyncio
+import json
+import logging
+import os
+from typing import AsyncIterator, Dict, List, Optional, Union
+
+import httpx
+
+from src.ollama_integration.client import OLLAMA_API_URL
+from src.ollama_integration.residency import prepare_request
+from src.ollama_integration.streaming import decode_stream_line
+from src.ollama_integration.session import DEFAULT_CONNECT_TIMEOUT, DEFAULT_POOL_SIZE, DEFAULT_READ_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+# Um AsyncClient fica preso ao event loop em que foi criado, então guardamos um por loop
+_clients: Dict[asyncio.AbstractEventLoop, httpx.AsyncClient] = {}
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """Retorna o httpx.AsyncClient (com pool keep-alive) do event loop atual."""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=DEFAULT_POOL_SIZE, max_keepalive_connections=DEFAULT_POOL_SIZE),
+            timeout=httpx.Timeout(DEFAULT_READ_TIMEOUT, connect=DEFAULT_CONNECT_TIMEOUT),
+        )
+        _clients[loop] = client
+        logger.info(f"Cliente HTTP assíncrono do Ollama criado (pool_size={DEFAULT_POOL_SIZE}).")
+    return client
+
+
+async def aclose_async_client() -> None:
+    """Fecha o cliente assíncrono do event loop atual, se existir."""
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+async def achat_completion(
+    messages: List[Dict[str, str]], model: str | None = None, stream: bool = False
+) -> Union[str, AsyncIterator[str], None]:
+    """Versão assíncrona de chat_completion, sem bloquear uma thread por geração.
+
+    Args:
+        messages: Uma lista de dicionários, cada um com "role" (user/assistant) e "content".
+        model: O nome do modelo Ollama a ser usado. Se None, usa OLLAMA_DEFAULT_MODEL do .env ou 'llama3'.
+        stream: Se a resposta deve ser retornada como stream (True) ou de uma vez (False).
+
+    Returns:
+        Se stream=False, retorna a string completa da resposta do assistant.
+        Se stream=True, retorna um iterador assíncrono que produz os pedaços (chunks) da resposta.
+        Retorna None em caso de erro.
+    """
+    target_model = model if model else os.getenv("OLLAMA_DEFAULT_MODEL", "llama3")
+    payload = {
+        "model": target_model,
+        "messages": messages,
+        "stream": stream
+    }
+    prepare_request(payload)
+    client = get_async_client()
+    response: Optional[httpx.Response] = None
+
+    try:
+        request = client.build_request("POST", OLLAMA_API_URL, json=payload)
+        response = await client.send(request, stream=stream)
+        response.raise_for_status()
+
+        if stream:
+            async def stream_generator() -> AsyncIterator[str]:
+                line_count = 0
+                try:
+                    async for line in response.aiter_lines():
+                        line_count += 1
+                        if not line:
+                            continue
+                        try:
+                            chunk, done = decode_stream_line(line)
+                        except json.JSONDecodeError:
+                            logger.error("Erro ao decodificar linha do stream JSON: %r", line)
+                            break
+                        if chunk:
+                            yield chunk
+                        if done:
+                            break
+                    logger.info(f"Stream assíncrono finalizado para {target_model}. Total linhas: {line_count}.")
+                except Exception as e:
+                    # Como no caminho síncrono: qualquer erro encerra o stream com log, sem chegar à interface
+                    logger.exception(f"Erro durante o processamento do stream assíncrono: {e}")
+                finally:
+                    await response.aclose()
+            return stream_generator()
+        else:
+            response_data = response.json()
+            return response_data.get("message", {}).get("content", "")
+
+    except httpx.HTTPStatusError as e:
+        await response.aread()
+        logger.error(f"Erro HTTP {response.status_code} ao acessar {OLLAMA_API_URL}: {e}")
+        logger.error(f"Resposta recebida: {response.text}")
+        await response.aclose()
+        return None
+    except httpx.TimeoutException as e:
+        logger.error(f"Timeout ao tentar acessar {OLLAMA_API_URL}: {e}")
+        return None
+    except httpx.HTTPError as e:
+        logger.error(f"Erro de conexão/request ao tentar acessar {OLLAMA_API_URL}: {e}")
+        return None
+    except json.JSONDecodeError:
+        logger.error(f"Erro ao decodificar a resposta JSON do Ollama (stream=False). Status: {response.status_code}")
+        return None
+    except Exception as e:
+        logger.exception(f"Erro inesperado na função achat_completion: {e}")
+        return None
@@ -0,0 +1,155 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Configuração do cache (pode ser sobrescrita pelo .env)
+DEFAULT_CACHE_FILE = os.getenv("OLLAMA_CACHE_FILE", "ollama_cache.db")
+DEFAULT_CACHE_TTL = float(os.getenv("OLLAMA_CACHE_TTL", str(30 * 24 * 3600)))  # segundos
+DEFAULT_CACHE_MAX_ENTRIES = int(os.getenv("OLLAMA_CACHE_MAX_ENTRIES", "50000"))
+
+
+# Opções para chamadas que usam o cache: sem amostragem, a resposta guardada é a que o modelo daria de novo
+DETERMINISTIC_OPTIONS = {"temperature": 0}
+
+
+def is_deterministic(options: Optional[Dict[str, Any]]) -> bool:
+    """True se as opções fixam temperature=0 (o padrão do Ollama amostra, com temperature 0.8)."""
+    return bool(options) and options.get("temperature") == 0
+
+
+def normalize_messages(messages: List[Dict[str, str]]) -> List[Dict[str, str]]:
+    """Mantém só role/content, sem espaços nas pontas, para que prompts equivalentes gerem a mesma chave."""
+    return [{"role": m.get("role", ""), "content": (m.get("content") or "").strip()} for m in messages]
+
+
+def make_cache_key(
+    model: str,
+    messages: List[Dict[str, str]],
+    options: Optional[Dict[str, Any]] = None,
+    response_format: Any = None,
+) -> str:
+    """Gera a chave do cache: SHA-256 do modelo, das mensagens normalizadas, das opções e do formato."""
+    material = json.dumps(
+        {"model": model, "messages": normalize_messages(messages), "options": options or {}, "format": response_format},
+        sort_keys=True, ensure_ascii=False, separators=(",", ":"),
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Cache persistente em SQLite das respostas completas (stream=False) do Ollama.
+
+    As entradas expiram após ttl_seconds e, passado max_entries, as menos usadas
+    recentemente são removidas (LRU). Seguro para uso por várias threads.
+    """
+
+    def __init__(self, path: str | None = None, ttl_seconds: float | None = None, max_entries: int | None = None):
+        self.path = path or DEFAULT_CACHE_FILE
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else DEFAULT_CACHE_TTL
+        self.max_entries = max_entries if max_entries is not None else DEFAULT_CACHE_MAX_ENTRIES
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS response_cache (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_response_cache_last_access ON response_cache(last_access)")
+        self._conn.commit()
+        logger.info(f"Cache de respostas do Ollama aberto em {self.path} (ttl={self.ttl_seconds}s, max={self.max_entries}).")
+
+    def get(self, key: str) -> Optional[str]:
+        """Retorna a resposta em cache (atualizando o acesso) ou None se ausente/expirada."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM response_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            response, created_at = row
+            if self.ttl_seconds and now - created_at > self.ttl_seconds:
+                self._conn.execute("DELETE FROM response_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE response_cache SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+            return response
+
+    def set(self, key: str, model: str, response: str) -> None:
+        """Grava uma resposta e aplica o limite de tamanho."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO response_cache (key, model, response, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, model, response, now, now),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM response_cache").fetchone()
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM response_cache WHERE key IN "
+                "(SELECT key FROM response_cache ORDER BY last_access ASC LIMIT ?)",
+                (excess,),
+            )
+            logger.debug(f"Cache de respostas: {excess} entradas antigas removidas (LRU).")
+
+    def clear(self) -> None:
+        """Remove todas as entradas e zera os contadores."""
+        with self._lock:
+            self._conn.execute("DELETE FROM response_cache")
+            self._conn.commit()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Retorna os contadores de acertos/faltas e o número de entradas."""
+        with self._lock:
+            (entries,) = self._conn.execute("SELECT COUNT(*) FROM response_cache").fetchone()
+            return {"hits": self.hits, "misses": self.misses, "entries": entries}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_default_cache: Optional[ResponseCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """Retorna o cache padrão do processo, abrindo-o no primeiro uso."""
+    global _default_cache
+    if _default_cache is None:
+        with _default_cache_lock:
+            if _default_cache is None:
+                _default_cache = ResponseCache()
+    return _default_cache
+
+
+def set_response_cache(cache: ResponseCache | None) -> None:
+    """Substitui o cache padrão (ex: outro arquivo ou outra política de expiração)."""
+    global _default_cache
+    with _default_cache_lock:
+        _default_cache = cache
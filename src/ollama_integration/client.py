@@ -4,13 +4,12 @@ import os
 import logging
 from typing import List, Dict, Generator, Any, Union # Melhorar type hinting
 from dotenv import load_dotenv
+from src.ollama_integration.cache import get_response_cache, is_deterministic, make_cache_key
+from src.ollama_integration.session import get_session_pool
+from src.ollama_integration.streaming import iter_stream_chunks
 
-# Configuração básica do logging - MUDADO PARA DEBUG
-logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(name)s - %(message)s')
-
-# Para evitar logs muito verbosos de bibliotecas externas (opcional)
-logging.getLogger("urllib3").setLevel(logging.WARNING)
-logging.getLogger("requests").setLevel(logging.WARNING)
+# O nível/formato do logging é configurado por quem usa o cliente (ex: app.py via LOG_LEVEL),
+# não mais forçado em DEBUG na importação.
 
 # Carrega as variáveis do arquivo .env para o ambiente
 load_dotenv()
@@ -22,47 +21,59 @@ OLLAMA_API_URL = os.getenv("OLLAMA_API_URL", "http://localhost:11434/api/chat")
 OLLAMA_BASE_URL = OLLAMA_API_URL.replace("/api/chat", "").replace("/api/generate", "")
 OLLAMA_TAGS_URL = f"{OLLAMA_BASE_URL}/api/tags"
 
-def get_available_models() -> List[str]:
-    """Busca a lista de modelos disponíveis na API /api/tags do Ollama."""
-    try:
-        logging.info(f"Buscando modelos disponíveis em {OLLAMA_TAGS_URL}...")
-        response = requests.get(OLLAMA_TAGS_URL, timeout=5) # Timeout curto
-        response.raise_for_status()
-        data = response.json()
-        models = [model['name'] for model in data.get('models', [])]
-        logging.info(f"Modelos encontrados: {models}")
-        # Garante que o modelo padrão do .env esteja na lista, se existir
-        default_model = os.getenv("OLLAMA_DEFAULT_MODEL", "llama3")
-        if default_model not in models:
-             logging.warning(f"Modelo padrão '{default_model}' do .env não encontrado via API /tags.")
-             # Poderíamos optar por adicioná-lo mesmo assim, ou apenas logar.
-             # Por segurança, não vamos adicioná-lo se a API não o listou.
-        return models
-    except requests.exceptions.RequestException as e:
-        logging.error(f"Erro ao buscar modelos da API Ollama ({OLLAMA_TAGS_URL}): {e}")
-        # Retorna lista vazia ou com fallback?
-        # Retornar apenas o default pode ser uma opção segura.
-        default_model = os.getenv("OLLAMA_DEFAULT_MODEL", "llama3")
-        logging.warning(f"Retornando apenas o modelo padrão '{default_model}' devido a erro na API /tags.")
-        return [default_model]
-    except json.JSONDecodeError as e:
-        logging.error(f"Erro ao decodificar resposta JSON da API /tags: {e}")
-        default_model = os.getenv("OLLAMA_DEFAULT_MODEL", "llama3")
-        logging.warning(f"Retornando apenas o modelo padrão '{default_model}' devido a erro JSON.")
-        return [default_model]
-    except Exception as e:
-        logging.exception(f"Erro inesperado ao buscar modelos: {e}")
-        default_model = os.getenv("OLLAMA_DEFAULT_MODEL", "llama3")
-        logging.warning(f"Retornando apenas o modelo padrão '{default_model}' devido a erro inesperado.")
+def get_available_models(wait: float = 5) -> List[str]:
+    """Lista os nomes dos modelos disponíveis (cache do ModelRegistry, atualizado em segundo plano).
+
+    Só espera pela rede (até `wait` segundos) se a lista ainda não foi buscada nenhuma vez neste processo.
+    """
+    from src.ollama_integration.model_registry import get_model_registry # Evita importação circular
+
+    registry = get_model_registry()
+    registry.wait_ready(wait)
+    models = registry.names()
+    default_model = os.getenv("OLLAMA_DEFAULT_MODEL", "llama3")
+    if not models:
+        # Retornar apenas o default é a opção segura quando a API não respondeu
+        logging.warning(f"Nenhum modelo obtido da API /tags; retornando apenas o modelo padrão '{default_model}'.")
         return [default_model]
+    if default_model not in models:
+        logging.warning(f"Modelo padrão '{default_model}' do .env não encontrado via API /tags.")
+    return models
+
+def _is_valid_structured_response(text: str, response_format: str | Dict[str, Any] | None) -> bool:
+    """Se foi pedida saída JSON, só é válida (e só vai para o cache) se for JSON e tiver todas as chaves
+    obrigatórias do schema preenchidas. Sem response_format, qualquer texto vale."""
+    if not response_format:
+        return True
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError:
+        return False
+    if isinstance(response_format, dict) and response_format.get("required"):
+        return isinstance(data, dict) and all(data.get(key) not in (None, "") for key in response_format["required"])
+    return True
 
-def chat_completion(messages: List[Dict[str, str]], model: str | None = None, stream: bool = False) -> Union[str, Generator[str, Any, None], None]:
+def chat_completion(
+    messages: List[Dict[str, str]],
+    model: str | None = None,
+    stream: bool = False,
+    options: Dict[str, Any] | None = None,
+    use_cache: bool = False,
+    response_format: str | Dict[str, Any] | None = None
+) -> Union[str, Generator[str, Any, None], None]:
     """Envia um histórico de mensagens para a API /api/chat do Ollama e retorna a resposta.
 
     Args:
         messages: Uma lista de dicionários, cada um com "role" (user/assistant) e "content".
         model: O nome do modelo Ollama a ser usado. Se None, usa OLLAMA_DEFAULT_MODEL do .env ou 'llama3'.
         stream: Se a resposta deve ser retornada como stream (True) ou de uma vez (False).
+        options: Opções do modelo repassadas ao Ollama (ex: {"temperature": 0}).
+        use_cache: Se True (e stream=False), consulta/grava o cache persistente de respostas,
+            chaveado por modelo + mensagens normalizadas + opções. Só vale com options determinísticas
+            (temperature=0, ver cache.DETERMINISTIC_OPTIONS); sem isso o cache é ignorado, para não fixar
+            uma resposta amostrada. Com response_format, só grava respostas JSON válidas com as chaves
+            obrigatórias (uma resposta ruim não fica presa no cache).
+        response_format: Campo "format" do Ollama: "json" ou um JSON schema para saída estruturada.
 
     Returns:
         Se stream=False, retorna a string completa da resposta do assistant ou None.
@@ -70,68 +81,61 @@ def chat_completion(messages: List[Dict[str, str]], model: str | None = None, st
         Retorna None em caso de erro.
     """
     target_model = model if model else os.getenv("OLLAMA_DEFAULT_MODEL", "llama3")
-    logging.debug(f"Enviando para {OLLAMA_API_URL} com modelo {target_model} e stream={stream}")
-    logging.debug(f"Messages: {messages}")
+    if logging.getLogger().isEnabledFor(logging.DEBUG):
+        logging.debug(f"Enviando para {OLLAMA_API_URL} com modelo {target_model} e stream={stream}")
+        logging.debug(f"Messages: {messages}")
 
     payload = {
         "model": target_model,
         "messages": messages,
         "stream": stream
     }
+    if options:
+        payload["options"] = options
+    if response_format:
+        payload["format"] = response_format
+
+    # Cache opcional de respostas completas (chamadas determinísticas, ex: descrições de metadados)
+    cache_key = None
+    if use_cache and not stream and not is_deterministic(options):
+        logging.debug("Cache ignorado: opções sem temperature=0 (resposta amostrada).")
+    elif use_cache and not stream:
+        cache = get_response_cache()
+        cache_key = make_cache_key(target_model, messages, options, response_format)
+        cached_response = cache.get(cache_key)
+        if cached_response is not None:
+            logging.debug(f"Resposta obtida do cache para o modelo {target_model}.")
+            return cached_response
 
+    # keep_alive do modelo (evita que o Ollama o descarregue entre requisições espaçadas)
+    from src.ollama_integration.residency import prepare_request # Evita importação circular
+    prepare_request(payload)
+
+    pool = get_session_pool()
+    response = None
     try:
-        response = requests.post(OLLAMA_API_URL, json=payload, stream=stream) # Habilita stream na request
+        # Usa a sessão compartilhada (keep-alive) em vez de abrir uma conexão nova por turno
+        response = pool.request("POST", OLLAMA_API_URL, json=payload, stream=stream) # Habilita stream na request
         response.raise_for_status()
 
         if stream:
             def stream_generator() -> Generator[str, Any, None]:
                 logging.info(f"Iniciando stream para o modelo {target_model}...")
-                full_response_content = "" # Para log completo no final
-                line_count = 0 # Contador de linhas
-                yield_count = 0 # Contador de yields
                 try:
-                    for line in response.iter_lines():
-                        line_count += 1
-                        if line:
-                            decoded_line = line.decode('utf-8')
-                            logging.debug(f"Stream Line {line_count} Raw: {decoded_line}") # Log linha crua
-                            try:
-                                json_line = json.loads(decoded_line)
-                                logging.debug(f"Stream Line {line_count} JSON: {json_line}") # Log JSON decodificado
-                                
-                                chunk = json_line.get("message", {}).get("content", "")
-                                logging.debug(f"Stream Line {line_count} Chunk: '{chunk}'") # Log pedaço extraído
-                                
-                                if chunk:
-                                    full_response_content += chunk
-                                    logging.debug(f"Stream Line {line_count}: Yielding chunk...") # Log antes do yield
-                                    yield_count += 1
-                                    yield chunk
-                                else:
-                                    logging.debug(f"Stream Line {line_count}: Chunk is empty, skipping yield.")
-                                
-                                if json_line.get("done", False):
-                                    logging.info(f"Stream completo recebido (done=True na linha {line_count}). Resposta: {full_response_content}")
-                                    break
-                            except json.JSONDecodeError:
-                                logging.error(f"Erro ao decodificar linha do stream JSON: {decoded_line}")
-                                break
-                            except Exception as e:
-                                logging.exception(f"Erro processando linha do stream: {decoded_line}")
-                                break
-                    # Log final após o loop
-                    logging.info(f"Stream finalizado para {target_model}. Total linhas: {line_count}, Total yields: {yield_count}.")
+                    yield from iter_stream_chunks(response.iter_lines(), target_model)
                 except Exception as e:
                     logging.exception(f"Erro durante o processamento do stream: {e}")
                 finally:
-                    response.close()
+                    pool.release(response) # Devolve a conexão ao pool
             return stream_generator()
         else:
             logging.info(f"Recebendo resposta completa para o modelo {target_model}...")
             response_data = response.json()
             # Na API /chat, a resposta está em response_data["message"]["content"]
             full_response = response_data.get("message", {}).get("content", "")
-            logging.info(f"Resposta completa recebida: {full_response}")
+            logging.info(f"Resposta completa recebida ({len(full_response)} caracteres).")
+            if cache_key and full_response and _is_valid_structured_response(full_response, response_format):
+                get_response_cache().set(cache_key, target_model, full_response)
             return full_response
 
     except requests.exceptions.ConnectionError as e:
@@ -143,6 +147,8 @@ def chat_completion(messages: List[Dict[str, str]], model: str | None = None, st
     except requests.exceptions.HTTPError as e:
         logging.error(f"Erro HTTP {response.status_code} ao acessar {OLLAMA_API_URL}: {e}")
         logging.error(f"Resposta recebida: {response.text}")
+        if stream:
+            pool.release(response)
         return None
     except requests.exceptions.RequestException as e:
         logging.error(f"Erro inesperado de request para {OLLAMA_API_URL}: {e}")
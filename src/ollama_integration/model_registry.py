@@ -0,0 +1,197 @@
+"""
+Registro dos modelos do Ollama (/api/tags) com cache, TTL e atualização em segundo plano.
+
+Quem pede a lista recebe o que está em cache na hora, sem esperar pela rede. Uma thread
+dedicada atualiza o cache a cada TTL (ou antes, se alguém pedir a lista já vencida); se o Ollama
+estiver fora do ar, a última lista boa continua sendo servida (dados antigos em vez de lista
+vazia), e a próxima tentativa acontece após MODELS_RETRY segundos. Cada mudança na lista
+incrementa `version`, que a interface usa para saber quando atualizar o dropdown.
+
+Configuração (.env):
+    OLLAMA_MODELS_TTL      segundos até a lista ser considerada antiga (padrão 60)
+    OLLAMA_MODELS_RETRY    espera após uma falha antes de tentar de novo (padrão 10)
+    OLLAMA_TAGS_TIMEOUT    timeout de leitura do /api/tags (padrão 5)
+"""
+
+import atexit
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+from src.ollama_integration.client import OLLAMA_TAGS_URL
+from src.ollama_integration.session import get_session_pool
+
+MODELS_TTL = float(os.getenv("OLLAMA_MODELS_TTL", "60"))
+MODELS_RETRY = float(os.getenv("OLLAMA_MODELS_RETRY", "10"))
+TAGS_TIMEOUT = float(os.getenv("OLLAMA_TAGS_TIMEOUT", "5"))
+
+
+class ModelInfo(NamedTuple):
+    name: str
+    size: int = 0 # bytes
+    family: str = ""
+    parameter_size: str = ""
+    quantization: str = ""
+    modified_at: str = ""
+
+
+def parse_tags(data: Dict[str, Any]) -> List[ModelInfo]:
+    """Converte a resposta do /api/tags em ModelInfo (ordem da API)."""
+    models = []
+    for model in data.get("models", []):
+        details = model.get("details") or {}
+        models.append(ModelInfo(
+            name=model["name"],
+            size=model.get("size") or 0,
+            family=details.get("family") or "",
+            parameter_size=details.get("parameter_size") or "",
+            quantization=details.get("quantization_level") or "",
+            modified_at=model.get("modified_at") or "",
+        ))
+    return models
+
+
+def fetch_models(timeout: float = TAGS_TIMEOUT) -> Optional[List[ModelInfo]]:
+    """Busca /api/tags. Retorna None em caso de erro (já registrado no log)."""
+    try:
+        pool = get_session_pool()
+        response = pool.request("GET", OLLAMA_TAGS_URL, timeout=pool.timeout(timeout))
+        response.raise_for_status()
+        return parse_tags(response.json())
+    except Exception as e:
+        logging.error(f"Erro ao buscar modelos da API Ollama ({OLLAMA_TAGS_URL}): {e}")
+        return None
+
+
+def model_label(model: ModelInfo) -> str:
+    """Texto do dropdown, ex: "llama3:8b (8.0B, Q4_0, 4.7 GB)"."""
+    details = [d for d in (model.parameter_size, model.quantization) if d]
+    if model.size:
+        details.append(f"{model.size / 1e9:.1f} GB")
+    return f"{model.name} ({', '.join(details)})" if details else model.name
+
+
+class ModelRegistry:
+    """Cache da lista de modelos, atualizado por uma thread em segundo plano.
+
+    Args:
+        ttl: Idade (s) a partir da qual a lista é atualizada.
+        retry: Espera (s) após uma falha antes da próxima tentativa.
+        fetcher: Função que busca a lista (None em caso de falha).
+    """
+
+    def __init__(self, ttl: float = MODELS_TTL, retry: float = MODELS_RETRY,
+                 fetcher: Callable[[], Optional[List[ModelInfo]]] = fetch_models):
+        self.ttl = ttl
+        self.retry = retry
+        self._fetcher = fetcher
+        self._lock = threading.Lock()
+        self._models: List[ModelInfo] = []
+        self._fetched_at: Optional[float] = None # time.monotonic() da última lista boa
+        self._next_attempt = 0.0
+        self.version = 0 # Incrementado quando a lista muda
+        self.refreshes = 0
+        self.failures = 0
+        self.last_error_at: Optional[float] = None
+        self._ready = threading.Event() # Primeira tentativa concluída (com ou sem sucesso)
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # --- Leitura (nunca espera pela rede, exceto wait_ready) ---
+
+    def models(self) -> List[ModelInfo]:
+        """Lista em cache; se estiver vencida, pede uma atualização em segundo plano."""
+        if self.is_stale():
+            self._wake.set()
+        with self._lock:
+            return list(self._models)
+
+    def names(self) -> List[str]:
+        return [model.name for model in self.models()]
+
+    def get(self, name: str) -> Optional[ModelInfo]:
+        with self._lock:
+            return next((model for model in self._models if model.name == name), None)
+
+    def is_stale(self) -> bool:
+        fetched_at = self._fetched_at
+        return fetched_at is None or time.monotonic() - fetched_at >= self.ttl
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        """Espera a primeira busca terminar (para quem precisa de um modelo antes de começar)."""
+        return self._ready.wait(timeout)
+
+    # --- Atualização ---
+
+    def refresh(self) -> bool:
+        """Busca a lista agora, nesta thread. Em caso de falha mantém a lista anterior."""
+        models = self._fetcher()
+        now = time.monotonic()
+        with self._lock:
+            if models is None:
+                self.failures += 1
+                self.last_error_at = now
+                self._next_attempt = now + self.retry
+                if self._models:
+                    logging.warning(f"Ollama indisponível; mantendo a lista anterior de {len(self._models)} modelos.")
+            else:
+                self.refreshes += 1
+                self._fetched_at = now
+                self._next_attempt = now + self.ttl
+                if models != self._models:
+                    self._models = models
+                    self.version += 1
+                    logging.info(f"Modelos disponíveis: {[model.name for model in models]}")
+        self._ready.set()
+        return models is not None
+
+    def start(self) -> "ModelRegistry":
+        """Inicia a thread de atualização (a primeira busca começa imediatamente)."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="ollama-model-registry", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            # Acordado antes da hora (lista vencida pedida) só adianta a busca se não estiver em espera após falha
+            if time.monotonic() >= self._next_attempt:
+                self.refresh()
+            self._wake.clear()
+            self._wake.wait(max(0.0, self._next_attempt - time.monotonic()))
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            fetched_at = self._fetched_at
+            return {
+                "models": len(self._models),
+                "version": self.version,
+                "age_s": None if fetched_at is None else round(time.monotonic() - fetched_at, 1),
+                "stale": self.is_stale(),
+                "refreshes": self.refreshes,
+                "failures": self.failures,
+            }
+
+
+_registry: Optional[ModelRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_model_registry() -> ModelRegistry:
+    """Registro do processo, com a thread de atualização já iniciada."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ModelRegistry().start()
+            atexit.register(_registry.stop, 1.0)
+        return _registry
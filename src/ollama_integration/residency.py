@@ -0,0 +1,279 @@
+"""
+Residência dos modelos no Ollama: mantém carregados (quentes) os modelos que o chat usa.
+
+Sem keep_alive, o Ollama descarrega um modelo após 5 minutos sem uso, e a primeira requisição
+seguinte paga o carregamento inteiro (segundos) antes do primeiro token. Este módulo:
+    - envia keep_alive em toda chamada ao /api/chat (por modelo, ver keep_alive_for);
+    - pré-carrega na inicialização o modelo padrão e, se pedido, os usados recentemente (lista salva em disco);
+      só o app registra o uso e pré-carrega (ResidencyManager.start()); scripts como
+      auto_generate_metadata_draft.py recebem apenas o keep_alive;
+    - acompanha quais modelos estão carregados via /api/ps, para avisar quando trocar de modelo
+      vai causar um carregamento (e já começar a carregá-lo em segundo plano).
+
+Configuração (.env):
+    OLLAMA_KEEP_ALIVE          keep_alive padrão: "30m", "1h", segundos, -1 = sempre (padrão 30m; vazio = não envia)
+    OLLAMA_KEEP_ALIVE_MODELS   por modelo, ex: "llama3=-1,phi3=10m" (nome sem a tag também vale)
+    OLLAMA_PRELOAD_MODELS      modelos a pré-carregar além do padrão, separados por vírgula
+    OLLAMA_PRELOAD_RECENT      quantos modelos recentes pré-carregar (padrão 0 = só o padrão; cada modelo a mais
+                               fica na RAM pelo keep_alive)
+    OLLAMA_RECENT_MODELS_FILE  arquivo com os modelos usados recentemente (padrão recent_models.json na raiz do projeto)
+    OLLAMA_PS_INTERVAL         intervalo (s) de consulta ao /api/ps (padrão 30)
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+from src.ollama_integration.client import OLLAMA_API_URL, OLLAMA_BASE_URL
+from src.ollama_integration.session import get_session_pool
+
+KeepAlive = Union[int, str]
+
+DEFAULT_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m") or None
+PRELOAD_MODELS = [m.strip() for m in os.getenv("OLLAMA_PRELOAD_MODELS", "").split(",") if m.strip()]
+PRELOAD_RECENT = int(os.getenv("OLLAMA_PRELOAD_RECENT", "0"))
+# Caminho fixo (não relativo ao diretório de trabalho de quem importa o módulo)
+RECENT_MODELS_FILE = os.getenv("OLLAMA_RECENT_MODELS_FILE") or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "recent_models.json")
+RECENT_MODELS_MAX = 10
+PS_INTERVAL = float(os.getenv("OLLAMA_PS_INTERVAL", "30"))
+# Timeout de leitura do pré-carregamento (carregar um modelo grande do disco pode levar minutos)
+PRELOAD_TIMEOUT = float(os.getenv("OLLAMA_PRELOAD_TIMEOUT", "300"))
+
+
+def parse_keep_alive(value: str) -> KeepAlive:
+    """"-1" / "300" viram número (segundos, como a API espera); "30m", "1h" ficam como texto."""
+    value = value.strip()
+    return int(value) if value.lstrip("-").isdigit() else value
+
+
+def parse_model_keep_alive(spec: str) -> Dict[str, KeepAlive]:
+    """"llama3=-1,phi3=10m" -> {"llama3": -1, "phi3": "10m"} (entradas inválidas são ignoradas)."""
+    values = {}
+    for item in spec.split(","):
+        name, sep, value = item.partition("=")
+        if sep and name.strip() and value.strip():
+            values[name.strip()] = parse_keep_alive(value)
+        elif item.strip():
+            logging.warning(f"keep_alive por modelo inválido ignorado: '{item}'")
+    return values
+
+
+MODEL_KEEP_ALIVE = parse_model_keep_alive(os.getenv("OLLAMA_KEEP_ALIVE_MODELS", ""))
+
+
+def keep_alive_for(model: Optional[str]) -> Optional[KeepAlive]:
+    """keep_alive do modelo (nome exato, depois sem a tag ":..."), ou o padrão; None = não enviar."""
+    if model:
+        if model in MODEL_KEEP_ALIVE:
+            return MODEL_KEEP_ALIVE[model]
+        base = model.split(":")[0]
+        if base in MODEL_KEEP_ALIVE:
+            return MODEL_KEEP_ALIVE[base]
+    return None if DEFAULT_KEEP_ALIVE is None else parse_keep_alive(DEFAULT_KEEP_ALIVE)
+
+
+def load_recent_models(path: str = RECENT_MODELS_FILE) -> List[str]:
+    try:
+        with open(path, encoding="utf-8") as f:
+            models = json.load(f)
+        return [m for m in models if isinstance(m, str)][:RECENT_MODELS_MAX]
+    except FileNotFoundError:
+        return []
+    except (OSError, ValueError) as e:
+        logging.warning(f"Lista de modelos recentes ilegível ({path}): {e}")
+        return []
+
+
+class ResidencyManager:
+    """Sabe quais modelos estão carregados no Ollama e os mantém quentes.
+
+    Args:
+        recent_file: Arquivo JSON com os modelos usados recentemente (mais recente primeiro).
+    """
+
+    def __init__(self, recent_file: str = RECENT_MODELS_FILE):
+        self.recent_file = recent_file
+        self.recent: List[str] = load_recent_models(recent_file)
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._hot: Dict[str, Optional[str]] = {} # modelo -> expires_at do /api/ps
+        self._loading: set = set()
+        self.ps_ok: Optional[bool] = None # None = /api/ps ainda não consultado
+        self.preloads = 0
+        self.tracking = False # Registrar o uso (e gravar os recentes) só depois de start()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # --- Estado ---
+
+    def is_hot(self, model: str) -> bool:
+        with self._lock:
+            return model in self._hot
+
+    def hot_models(self) -> List[str]:
+        with self._lock:
+            return list(self._hot)
+
+    def record_use(self, model: str) -> None:
+        """Chamado a cada requisição ao modelo: ele fica (ou continua) carregado e vai para o topo dos recentes."""
+        with self._lock:
+            self._hot.setdefault(model, None)
+            if self.recent[:1] == [model]:
+                return
+            self.recent = ([model] + [m for m in self.recent if m != model])[:RECENT_MODELS_MAX]
+        # Grava fora da thread de quem pediu (no caminho assíncrono seria o event loop)
+        threading.Thread(target=self._save_recent, name="ollama-recent-models", daemon=True).start()
+
+    def _save_recent(self) -> None:
+        """Grava a lista atual de recentes; o lock garante que a última gravação é a mais nova."""
+        with self._save_lock:
+            with self._lock:
+                recent = list(self.recent)
+            try:
+                with open(self.recent_file, "w", encoding="utf-8") as f:
+                    json.dump(recent, f)
+            except OSError as e:
+                logging.warning(f"Não foi possível salvar os modelos recentes em {self.recent_file}: {e}")
+
+    def refresh(self) -> bool:
+        """Atualiza a lista de modelos carregados pelo /api/ps. Em caso de erro mantém a anterior."""
+        try:
+            pool = get_session_pool()
+            response = pool.request("GET", f"{OLLAMA_BASE_URL}/api/ps", timeout=pool.timeout(5))
+            response.raise_for_status()
+            loaded = {m["name"]: m.get("expires_at") for m in response.json().get("models", [])}
+        except Exception as e:
+            if self.ps_ok is not False:
+                logging.warning(f"Não foi possível consultar os modelos carregados (/api/ps): {e}")
+            self.ps_ok = False
+            return False
+        with self._lock:
+            # Um modelo sendo carregado por nós ainda pode não aparecer no /api/ps
+            self._hot = {**{m: None for m in self._loading}, **loaded}
+        self.ps_ok = True
+        return True
+
+    # --- Pré-carregamento ---
+
+    def preload(self, model: str) -> bool:
+        """Carrega o modelo (requisição sem mensagens com keep_alive), nesta thread. Retorna True se carregou."""
+        with self._lock:
+            if model in self._loading:
+                return False
+            self._loading.add(model)
+        payload: Dict[str, Any] = {"model": model, "messages": [], "stream": False}
+        keep_alive = keep_alive_for(model)
+        if keep_alive is not None:
+            payload["keep_alive"] = keep_alive
+        start = time.perf_counter()
+        try:
+            pool = get_session_pool()
+            response = pool.request("POST", OLLAMA_API_URL, json=payload, timeout=pool.timeout(PRELOAD_TIMEOUT))
+            response.raise_for_status()
+        except Exception as e:
+            logging.warning(f"Falha ao pré-carregar o modelo '{model}': {e}")
+            return False
+        finally:
+            with self._lock:
+                self._loading.discard(model)
+        with self._lock:
+            self._hot.setdefault(model, None)
+        self.preloads += 1
+        logging.info(f"Modelo '{model}' carregado em {time.perf_counter() - start:.2f}s (keep_alive={keep_alive}).")
+        return True
+
+    def preload_async(self, models: Iterable[str]) -> threading.Thread:
+        """Pré-carrega em segundo plano, um modelo por vez (carregar vários juntos disputa memória e disco)."""
+        models = list(dict.fromkeys(models))
+
+        def run():
+            for model in models:
+                if not self.is_hot(model):
+                    self.preload(model)
+
+        thread = threading.Thread(target=run, name="ollama-preload", daemon=True)
+        thread.start()
+        return thread
+
+    def startup_models(self, default_model: Optional[str]) -> List[str]:
+        """Modelos a pré-carregar: os recentes, os de OLLAMA_PRELOAD_MODELS e, por último, o padrão.
+
+        O padrão vai por último porque, no limite de modelos carregados, o Ollama descarrega o usado
+        há mais tempo; carregado primeiro, ele seria o descartado pelos seguintes.
+        """
+        models = self.recent[:PRELOAD_RECENT] + PRELOAD_MODELS
+        if default_model:
+            models = [m for m in models if m != default_model] + [default_model]
+        return list(dict.fromkeys(models))
+
+    def switch_warning(self, model: str) -> Optional[str]:
+        """Aviso para a troca de modelo, se ela vai causar um carregamento (e já inicia o carregamento)."""
+        if not model or self.is_hot(model) or self.ps_ok is False:
+            return None
+        self.preload_async([model])
+        return (f"O modelo '{model}' não está carregado no Ollama; ele já está sendo carregado, "
+                "e a primeira resposta pode demorar alguns segundos.")
+
+    # --- Thread de acompanhamento ---
+
+    def start(self, default_model: Optional[str] = None) -> "ResidencyManager":
+        """Consulta o /api/ps, pré-carrega os modelos de startup_models e segue consultando a cada PS_INTERVAL.
+
+        A partir daqui as requisições do processo passam a ser registradas em record_use().
+        """
+        self.tracking = True
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, args=(default_model,),
+                                            name="ollama-residency", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self, default_model: Optional[str]) -> None:
+        self.refresh()
+        for model in self.startup_models(default_model):
+            if self._stop.is_set():
+                return
+            # O padrão é tocado mesmo já carregado, para ficar como o usado mais recentemente
+            if model == default_model or not self.is_hot(model):
+                self.preload(model)
+        while not self._stop.wait(PS_INTERVAL):
+            self.refresh()
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"hot": dict(self._hot), "loading": sorted(self._loading), "recent": list(self.recent),
+                    "preloads": self.preloads, "ps_ok": self.ps_ok}
+
+
+_manager: Optional[ResidencyManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_residency_manager() -> ResidencyManager:
+    """Gerenciador do processo (a thread só roda depois de start())."""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = ResidencyManager()
+        return _manager
+
+
+def prepare_request(payload: Dict[str, Any]) -> None:
+    """Acrescenta o keep_alive do modelo ao payload do /api/chat e, se o gerenciador foi iniciado, registra o uso."""
+    model = payload.get("model")
+    keep_alive = keep_alive_for(model)
+    if keep_alive is not None:
+        payload["keep_alive"] = keep_alive
+    manager = _manager
+    if model and manager is not None and manager.tracking:
+        manager.record_use(model)
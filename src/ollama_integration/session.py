@@ -0,0 +1,190 @@
+import atexit
+import logging
+import os
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# Configuração do pool (pode ser sobrescrita pelo .env)
+DEFAULT_POOL_SIZE = int(os.getenv("OLLAMA_POOL_SIZE", "10"))
+DEFAULT_CONNECT_TIMEOUT = float(os.getenv("OLLAMA_CONNECT_TIMEOUT", "5"))
+DEFAULT_READ_TIMEOUT = float(os.getenv("OLLAMA_READ_TIMEOUT", "300"))
+
+# Eventos de ciclo de vida aceitos por register_hook
+SESSION_EVENTS = ("open", "close", "request", "response")
+
+
+class OllamaSessionPool:
+    """Mantém uma requests.Session com pool de conexões keep-alive para o servidor Ollama.
+
+    A sessão é criada sob demanda no primeiro uso e reaproveitada por todas as
+    chamadas, evitando um novo handshake TCP/TLS a cada turno de chat.
+    """
+
+    def __init__(
+        self,
+        pool_size: int | None = None,
+        connect_timeout: float | None = None,
+        read_timeout: float | None = None,
+        session_factory: Callable[[], requests.Session] | None = None,
+    ):
+        self.pool_size = pool_size or DEFAULT_POOL_SIZE
+        self.connect_timeout = connect_timeout if connect_timeout is not None else DEFAULT_CONNECT_TIMEOUT
+        self.read_timeout = read_timeout if read_timeout is not None else DEFAULT_READ_TIMEOUT
+        self._session_factory = session_factory or requests.Session
+        self._session: Optional[requests.Session] = None
+        self._adapter: Optional[HTTPAdapter] = None
+        self._lock = threading.Lock()
+        self._hooks: Dict[str, List[Callable[..., None]]] = {event: [] for event in SESSION_EVENTS}
+        self._requests_total = 0
+        self._in_flight = 0
+        self._errors = 0
+
+    # --- Ciclo de vida ---
+
+    def register_hook(self, event: str, callback: Callable[..., None]) -> None:
+        """Registra um callback para um evento ('open', 'close', 'request' ou 'response')."""
+        if event not in self._hooks:
+            raise ValueError(f"Evento de sessão desconhecido: {event}. Use um de {SESSION_EVENTS}.")
+        self._hooks[event].append(callback)
+
+    def _fire(self, event: str, *args: Any) -> None:
+        for callback in self._hooks[event]:
+            try:
+                callback(*args)
+            except Exception:
+                logger.exception(f"Erro no hook '{event}' da sessão Ollama.")
+
+    @property
+    def session(self) -> requests.Session:
+        """Retorna a sessão compartilhada, criando-a no primeiro acesso."""
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    session = self._session_factory()
+                    adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+                    session.mount("http://", adapter)
+                    session.mount("https://", adapter)
+                    session.headers.update({"Connection": "keep-alive"})
+                    self._adapter = adapter
+                    self._session = session
+                    logger.info(f"Sessão HTTP do Ollama criada (pool_size={self.pool_size}).")
+                    self._fire("open", session)
+        return self._session
+
+    def close(self) -> None:
+        """Fecha a sessão e todas as conexões do pool. Uma nova sessão é criada no próximo uso."""
+        with self._lock:
+            session, self._session, self._adapter = self._session, None, None
+        if session is not None:
+            session.close()
+            logger.info("Sessão HTTP do Ollama fechada.")
+            self._fire("close", session)
+
+    # --- Requisições ---
+
+    def timeout(self, read_timeout: float | None = None) -> Tuple[float, float]:
+        """Retorna a tupla (connect, read) usada pelo requests."""
+        return (self.connect_timeout, read_timeout if read_timeout is not None else self.read_timeout)
+
+    def request(self, method: str, url: str, stream: bool = False, **kwargs: Any) -> requests.Response:
+        """Executa uma requisição pela sessão compartilhada.
+
+        Com stream=True a requisição continua contada como 'em andamento' até
+        que release() seja chamado para a resposta.
+        """
+        kwargs.setdefault("timeout", self.timeout())
+        with self._lock:
+            self._requests_total += 1
+            self._in_flight += 1
+        self._fire("request", method, url)
+        try:
+            response = self.session.request(method, url, stream=stream, **kwargs)
+        except Exception:
+            with self._lock:
+                self._in_flight -= 1
+                self._errors += 1
+            raise
+        self._fire("response", response)
+        if not stream:
+            self._mark_done()
+        return response
+
+    def release(self, response: requests.Response) -> None:
+        """Fecha uma resposta em stream e devolve a conexão ao pool."""
+        response.close()
+        self._mark_done()
+
+    def _mark_done(self) -> None:
+        with self._lock:
+            self._in_flight = max(0, self._in_flight - 1)
+
+    # --- Métricas ---
+
+    def metrics(self) -> Dict[str, int]:
+        """Retorna métricas do pool: requisições, conexões abertas/reutilizadas e em andamento."""
+        connections_opened = 0
+        pool_requests = 0
+        adapter = self._adapter
+        if adapter is not None:
+            # Cada HTTPConnectionPool do urllib3 conta conexões novas e requisições feitas
+            for key in list(adapter.poolmanager.pools.keys()):
+                pool = adapter.poolmanager.pools.get(key)
+                if pool is None:
+                    continue
+                connections_opened += pool.num_connections
+                pool_requests += pool.num_requests
+        with self._lock:
+            return {
+                "pool_size": self.pool_size,
+                "requests_total": self._requests_total,
+                "in_flight": self._in_flight,
+                "errors": self._errors,
+                "connections_opened": connections_opened,
+                "connections_reused": max(0, pool_requests - connections_opened),
+            }
+
+
+# --- Pool padrão do módulo (injetável) ---
+_default_pool: Optional[OllamaSessionPool] = None
+_default_pool_lock = threading.Lock()
+
+
+def get_session_pool() -> OllamaSessionPool:
+    """Retorna o pool padrão do processo, criando-o com a configuração do .env se necessário."""
+    global _default_pool
+    if _default_pool is None:
+        with _default_pool_lock:
+            if _default_pool is None:
+                _default_pool = OllamaSessionPool()
+    return _default_pool
+
+
+def set_session_pool(pool: OllamaSessionPool | None) -> None:
+    """Substitui o pool padrão (ex: outra configuração ou uma sessão falsa em testes).
+
+    O pool anterior é fechado. Passar None faz o próximo uso criar um pool novo.
+    """
+    global _default_pool
+    with _default_pool_lock:
+        previous, _default_pool = _default_pool, pool
+    if previous is not None and previous is not pool:
+        previous.close()
+
+
+def close_session_pool() -> None:
+    """Fecha o pool padrão, se existir. Registrado para rodar na saída do processo."""
+    if _default_pool is not None:
+        _default_pool.close()
+
+
+def get_pool_metrics() -> Dict[str, int]:
+    """Atalho para as métricas do pool padrão."""
+    return get_session_pool().metrics()
+
+
+atexit.register(close_session_pool)
@@ -0,0 +1,60 @@
+import json
+import logging
+import os
+from typing import Any, Callable, Generator, Iterable, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Usa orjson quando instalado (bem mais rápido e aceita bytes direto); senão, o json da stdlib.
+# orjson.JSONDecodeError herda de json.JSONDecodeError, então o tratamento de erro é o mesmo.
+try:
+    import orjson
+    json_loads: Callable[[Any], Any] = orjson.loads
+except ImportError:
+    json_loads = json.loads
+
+# Em DEBUG, registra apenas 1 a cada N linhas do stream (0 desativa o log por linha)
+STREAM_LOG_EVERY = int(os.getenv("OLLAMA_STREAM_LOG_EVERY", "100"))
+
+
+def decode_stream_line(line: bytes | str) -> Tuple[str, bool]:
+    """Decodifica uma linha NDJSON do /api/chat e retorna (pedaço do conteúdo, done)."""
+    data = json_loads(line)
+    message = data.get("message")
+    chunk = message.get("content", "") if message else ""
+    return chunk, data.get("done", False)
+
+
+def iter_stream_chunks(lines: Iterable[bytes], model: str) -> Generator[str, Any, None]:
+    """Converte as linhas NDJSON do stream do Ollama nos pedaços de texto da resposta.
+
+    Não acumula a resposta: só conta linhas e caracteres para o log final.
+    Linhas inválidas interrompem o stream, como antes.
+    """
+    debug_enabled = logger.isEnabledFor(logging.DEBUG) and STREAM_LOG_EVERY > 0
+    line_count = 0
+    yield_count = 0
+    char_count = 0
+    for line in lines:
+        line_count += 1
+        if not line:
+            continue
+        try:
+            chunk, done = decode_stream_line(line)
+        except json.JSONDecodeError:
+            logger.error("Erro ao decodificar linha do stream JSON: %r", line)
+            break
+        except Exception:
+            logger.exception("Erro processando linha do stream: %r", line)
+            break
+        if debug_enabled and line_count % STREAM_LOG_EVERY == 0:
+            logger.debug("Stream %s linha %d: %r", model, line_count, line)
+        if chunk:
+            yield_count += 1
+            char_count += len(chunk)
+            yield chunk
+        if done:
+            logger.debug("Stream completo recebido (done=True na linha %d).", line_count)
+            break
+    logger.info("Stream finalizado para %s. Total linhas: %d, Total yields: %d, Caracteres: %d.",
+                model, line_count, yield_count, char_count)
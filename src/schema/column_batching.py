@@ -0,0 +1,122 @@
+import json
+import logging
+import os
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Quantas colunas vão em um único prompt (1 = um prompt por coluna, como antes)
+DEFAULT_BATCH_SIZE = int(os.getenv("METADATA_BATCH_SIZE", "15"))
+# Quantas vezes reenviar, em lote, apenas as colunas que vieram faltando/inválidas
+DEFAULT_BATCH_RETRIES = int(os.getenv("METADATA_BATCH_RETRIES", "1"))
+
+# Assinaturas das funções de geração injetadas pelos chamadores:
+#   gera_json(prompt, json_schema, use_cache) -> texto JSON ou None (use_cache=False nas novas tentativas,
+#       para não receber de novo uma resposta ruim guardada no cache)
+#   gera_texto(prompt) -> descrição ou None (fallback por coluna)
+JsonGenerator = Callable[[str, Dict[str, Any], bool], Optional[str]]
+TextGenerator = Callable[[str], Optional[str]]
+
+
+def build_column_batch_prompt(object_name: str, object_type: str, columns: List[Dict[str, Any]]) -> str:
+    """Monta um prompt único pedindo a descrição de várias colunas de um mesmo objeto."""
+    column_lines = "\n".join(f"- {col['name']} ({col.get('type', '?')})" for col in columns)
+    return (
+        f"Para cada coluna abaixo, que pertence ao objeto de banco de dados '{object_name}' ({object_type}), "
+        f"sugira uma descrição concisa em português brasileiro, focando no significado provável do dado armazenado.\n"
+        f"Responda apenas com um objeto JSON cujas chaves são exatamente os nomes das colunas "
+        f"e cujos valores são as descrições sugeridas.\n\n"
+        f"Colunas:\n{column_lines}"
+    )
+
+
+def build_column_batch_schema(col_names: List[str]) -> Dict[str, Any]:
+    """JSON schema enviado no campo "format" do Ollama: uma string por coluna, todas obrigatórias."""
+    return {
+        "type": "object",
+        "properties": {name: {"type": "string"} for name in col_names},
+        "required": list(col_names),
+    }
+
+
+def clean_description(text: str) -> str:
+    """Mesma limpeza aplicada às respostas por coluna: remove aspas e espaços nas pontas."""
+    return text.strip().strip('"').strip('\'').strip()
+
+
+def parse_column_batch_response(response: Optional[str], col_names: List[str]) -> Dict[str, str]:
+    """Extrai {coluna: descrição} da resposta JSON, descartando colunas ausentes ou vazias.
+
+    Chaves são comparadas sem diferenciar maiúsculas/minúsculas; chaves extras são ignoradas.
+    """
+    if not response:
+        return {}
+    try:
+        data = json.loads(response)
+    except json.JSONDecodeError:
+        logger.warning(f"Resposta em lote não é JSON válido: {response[:200]!r}")
+        return {}
+    if not isinstance(data, dict):
+        logger.warning(f"Resposta em lote não é um objeto JSON: {type(data).__name__}")
+        return {}
+
+    by_upper = {str(key).strip().upper(): value for key, value in data.items()}
+    parsed = {}
+    for name in col_names:
+        value = by_upper.get(name.upper())
+        if isinstance(value, str) and clean_description(value):
+            parsed[name] = clean_description(value)
+    return parsed
+
+
+def describe_columns_batched(
+    object_name: str,
+    object_type: str,
+    columns: List[Dict[str, Any]],
+    generate_json: JsonGenerator,
+    generate_text: Optional[TextGenerator] = None,
+    build_single_prompt: Optional[Callable[[Dict[str, Any]], str]] = None,
+    batch_size: int | None = None,
+    max_retries: int | None = None,
+) -> Tuple[Dict[str, str], List[str]]:
+    """Gera descrições para as colunas em lotes de batch_size colunas por prompt.
+
+    Colunas que faltarem ou vierem inválidas na resposta são reenviadas sozinhas em
+    um novo lote (até max_retries vezes). Se ainda assim falharem e generate_text e
+    build_single_prompt forem informados, caem no prompt individual por coluna.
+
+    Returns:
+        Tupla ({coluna: descrição}, [colunas que não foram descritas]).
+    """
+    batch_size = max(1, batch_size or DEFAULT_BATCH_SIZE)
+    max_retries = DEFAULT_BATCH_RETRIES if max_retries is None else max_retries
+    by_name = {col['name']: col for col in columns if col.get('name')}
+    results: Dict[str, str] = {}
+
+    pending = list(by_name)
+    for attempt in range(max_retries + 1):
+        if not pending:
+            break
+        failed = []
+        for start in range(0, len(pending), batch_size):
+            names = pending[start:start + batch_size]
+            prompt = build_column_batch_prompt(object_name, object_type, [by_name[n] for n in names])
+            response = generate_json(prompt, build_column_batch_schema(names), attempt == 0)
+            parsed = parse_column_batch_response(response, names)
+            results.update(parsed)
+            failed.extend(n for n in names if n not in parsed)
+        if failed:
+            logger.info(f"{object_name}: {len(failed)} colunas sem descrição válida no lote (tentativa {attempt + 1}).")
+        pending = failed
+
+    if pending and generate_text and build_single_prompt:
+        still_failed = []
+        for name in pending:
+            description = generate_text(build_single_prompt(by_name[name]))
+            if description:
+                results[name] = description
+            else:
+                still_failed.append(name)
+        pending = still_failed
+
+    return results, pending
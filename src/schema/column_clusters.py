@@ -0,0 +1,131 @@
+import re
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+# Prefixo curto de tabela usado no ERP (ex: CLP_ em CLP_EMPRESA, PDV_ em PDV_FILIAL)
+_TABLE_PREFIX_RE = re.compile(r"^([A-Z][A-Z0-9]{1,3})_(?=.)")
+
+# Prefixos com o mesmo formato que fazem parte do significado da coluna (DATA_SEMANA != DIA_SEMANA)
+SEMANTIC_PREFIXES = frozenset({
+    "ANO", "COD", "CPF", "DATA", "DESC", "DIA", "DT", "FL", "FLAG", "HORA", "ID", "IND", "MES", "NOME",
+    "NR", "NRO", "NUM", "OBS", "PERC", "QTD", "QTDE", "SEQ", "TIPO", "TP", "UF", "VL", "VLR",
+})
+
+
+def table_prefix(column_names: List[str]) -> str:
+    """Prefixo próprio do objeto, deduzido das colunas ('CLP' se a maioria é CLP_...); '' se não houver.
+
+    Views que juntam colunas de várias tabelas normalmente não têm um prefixo majoritário.
+    """
+    names = [(n or "").strip().upper() for n in column_names if n]
+    counts = Counter(
+        m.group(1) for m in map(_TABLE_PREFIX_RE.match, names) if m and m.group(1) not in SEMANTIC_PREFIXES
+    )
+    if not counts:
+        return ""
+    prefix, count = counts.most_common(1)[0]
+    return prefix if count >= 2 and count * 2 >= len(names) else ""
+
+
+def normalize_column_name(name: str, owner_prefix: Optional[str] = None) -> str:
+    """Remove o prefixo de tabela do nome da coluna: 'CLP_EMPRESA' -> 'EMPRESA'.
+
+    Args:
+        owner_prefix: Prefixo do objeto dono da coluna (ver table_prefix); só ele é removido
+                      ('' = o objeto não tem prefixo). None quando o dono não é conhecido: remove
+                      qualquer prefixo curto que não esteja em SEMANTIC_PREFIXES.
+    """
+    name = (name or "").strip().upper()
+    match = _TABLE_PREFIX_RE.match(name)
+    if not match:
+        return name
+    prefix = match.group(1)
+    if owner_prefix is not None:
+        strip = prefix == owner_prefix
+    else:
+        strip = prefix not in SEMANTIC_PREFIXES
+    return name[match.end():] if strip else name
+
+
+def column_suffix(name: str) -> str:
+    """Último segmento do nome: 'XXX_COD_EMPRESA' -> 'EMPRESA'."""
+    return (name or "").strip().upper().rsplit("_", 1)[-1]
+
+
+def user_domain(domain: Optional[str]) -> Optional[str]:
+    """Retorna o domínio se for definido pelo usuário; domínios 'RDB$...' são gerados por coluna e não agrupam nada."""
+    if not domain or domain.upper().startswith("RDB$"):
+        return None
+    return domain.upper()
+
+
+def cluster_key(col: Dict[str, Any], owner_prefix: Optional[str] = None) -> Tuple[str, str, str]:
+    """Chave de agrupamento: (nome normalizado, domínio de usuário ou '', tipo)."""
+    return (normalize_column_name(col.get("name", ""), owner_prefix), user_domain(col.get("domain")) or "",
+            col.get("type") or "")
+
+
+class ColumnCluster:
+    """Grupo de colunas equivalentes (mesmo nome normalizado, domínio e tipo) em objetos diferentes."""
+
+    def __init__(self, key: Tuple[str, str, str]):
+        self.key = key
+        self.members: List[Tuple[str, str, str]] = []  # (key_type, objeto, coluna)
+
+    @property
+    def normalized_name(self) -> str:
+        return self.key[0]
+
+    @property
+    def domain(self) -> str:
+        return self.key[1]
+
+    @property
+    def col_type(self) -> str:
+        return self.key[2]
+
+    def __len__(self) -> int:
+        return len(self.members)
+
+
+def cluster_schema_columns(schema_data: Dict[str, Any], min_size: int = 2) -> List[ColumnCluster]:
+    """Agrupa as colunas de todo o esquema; retorna só os grupos com pelo menos min_size membros."""
+    clusters: Dict[Tuple[str, str, str], ColumnCluster] = {}
+    for object_name, object_info in schema_data.items():
+        key_type = object_info.get("object_type", "TABLE") + "S"
+        columns = object_info.get("columns", [])
+        owner_prefix = table_prefix([col.get("name") for col in columns])
+        for col in columns:
+            if not col.get("name") or not col.get("type"):
+                continue
+            key = cluster_key(col, owner_prefix)
+            if not key[0]:
+                continue
+            cluster = clusters.get(key)
+            if cluster is None:
+                cluster = clusters[key] = ColumnCluster(key)
+            cluster.members.append((key_type, object_name, col["name"]))
+    return sorted((c for c in clusters.values() if len(c) >= min_size), key=lambda c: (-len(c), c.key))
+
+
+def calls_avoided(clusters: List[ColumnCluster]) -> int:
+    """Chamadas ao LLM economizadas ao gerar uma descrição por grupo em vez de uma por coluna."""
+    return sum(len(c) - 1 for c in clusters)
+
+
+def build_cluster_prompt(cluster: ColumnCluster, max_examples: int = 5) -> str:
+    """Prompt único para descrever todas as colunas de um grupo."""
+    examples = defaultdict(list)
+    for _, object_name, col_name in cluster.members:
+        examples[col_name].append(object_name)
+    example_text = "; ".join(
+        f"'{col_name}' em {', '.join(objects[:3])}" for col_name, objects in list(examples.items())[:max_examples]
+    )
+    domain_text = f", domínio '{cluster.domain}'" if cluster.domain else ""
+    return (
+        f"Sugira uma descrição concisa em português brasileiro para uma coluna de banco de dados que representa "
+        f"'{cluster.normalized_name}' (tipo '{cluster.col_type}'{domain_text}). "
+        f"Ela aparece com o mesmo significado em {len(cluster)} tabelas/views, por exemplo: {example_text}. "
+        f"Foque no significado provável do dado armazenado, sem citar uma tabela específica. "
+        f"Responda apenas com a descrição sugerida."
+    )
@@ -0,0 +1,108 @@
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from src.schema.column_clusters import column_suffix, normalize_column_name
+
+# Seções dos metadados que alimentam o índice, na ordem de prioridade da busca
+INDEXED_SECTIONS = ("TABLES", "VIEWS")
+
+_Owner = Tuple[str, str, str]  # (key_type, objeto, coluna)
+
+MATCH_NORMALIZED = "normalized"  # Mesmo nome sem o prefixo de tabela
+MATCH_SUFFIX = "suffix"  # Mesmo último segmento do nome
+
+
+class DescriptionCandidate(NamedTuple):
+    """Descrição de outra coluna com nome parecido, para o usuário aceitar ou não."""
+    description: str
+    key_type: str
+    object_name: str
+    column_name: str
+    match: str  # MATCH_NORMALIZED ou MATCH_SUFFIX
+
+
+class DescriptionIndex:
+    """Índice invertido de descrições de colunas já preenchidas nos metadados.
+
+    Mapeia o nome exato, o nome sem prefixo de tabela e o último segmento do nome
+    para as descrições existentes, de modo que a busca por uma coluna não percorra
+    todas as tabelas/views. Deve ser mantido com update() a cada edição.
+
+    Só o nome exato é confiável para preenchimento automático (lookup); os nomes
+    parecidos são devolvidos por candidates() como sugestões a confirmar.
+    """
+
+    def __init__(self):
+        self._by_name: Dict[str, Dict[_Owner, str]] = {}
+        self._by_normalized: Dict[str, Dict[_Owner, str]] = {}
+        self._by_suffix: Dict[str, Dict[_Owner, str]] = {}
+        self._current: Dict[_Owner, str] = {}
+
+    @classmethod
+    def from_metadata(cls, metadata: Dict[str, Any]) -> "DescriptionIndex":
+        """Constrói o índice a partir do dicionário de metadados (TABLES/VIEWS -> COLUMNS)."""
+        index = cls()
+        for key_type in INDEXED_SECTIONS:
+            for object_name, object_meta in (metadata or {}).get(key_type, {}).items():
+                for col_name, col_meta in object_meta.get('COLUMNS', {}).items():
+                    index.update(key_type, object_name, col_name, col_meta.get('description', ''))
+        return index
+
+    def update(self, key_type: str, object_name: str, col_name: str, description: Optional[str]) -> None:
+        """Registra (ou remove, se vazia) a descrição de uma coluna. O(1)."""
+        if key_type not in INDEXED_SECTIONS or not col_name:
+            return
+        owner = (key_type, object_name, col_name)
+        description = (description or "").strip()
+        if self._current.get(owner, "") == description:
+            return
+        name = col_name.upper()
+        buckets = (
+            (self._by_name, name),
+            (self._by_normalized, normalize_column_name(name)),
+            (self._by_suffix, column_suffix(name)),
+        )
+        for bucket, key in buckets:
+            entries = bucket.setdefault(key, {})
+            entries.pop(owner, None)
+            if description:
+                entries[owner] = description
+            elif not entries:
+                del bucket[key]
+        if description:
+            self._current[owner] = description
+        else:
+            self._current.pop(owner, None)
+
+    def lookup(self, col_name: str) -> Optional[str]:
+        """Retorna uma descrição existente de uma coluna com exatamente o mesmo nome."""
+        if not col_name:
+            return None
+        entries = self._by_name.get(col_name.upper())
+        return next(iter(entries.values())) if entries else None
+
+    def candidates(self, col_name: str, limit: int = 3) -> List[DescriptionCandidate]:
+        """Descrições de colunas com nome parecido (sem prefixo, depois pelo sufixo), com a origem de cada uma.
+
+        Descrições repetidas aparecem uma vez só; colunas com o mesmo nome exato não entram
+        (essas são o resultado de lookup()).
+        """
+        if not col_name:
+            return []
+        name = col_name.upper()
+        found: List[DescriptionCandidate] = []
+        seen = set()
+        for bucket, key, match in (
+            (self._by_normalized, normalize_column_name(name), MATCH_NORMALIZED),
+            (self._by_suffix, column_suffix(name), MATCH_SUFFIX),
+        ):
+            for (key_type, object_name, owner_col), description in bucket.get(key, {}).items():
+                if owner_col.upper() == name or description in seen:
+                    continue
+                seen.add(description)
+                found.append(DescriptionCandidate(description, key_type, object_name, owner_col, match))
+                if len(found) >= limit:
+                    return found
+        return found
+
+    def __len__(self) -> int:
+        return len(self._current)
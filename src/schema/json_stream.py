@@ -0,0 +1,246 @@
+import copy
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Sufixo do índice de offsets gravado ao lado do esquema (firebird_schema.json.idx)
+INDEX_SUFFIX = ".idx"
+# Quantas relações já decodificadas ficam em memória no leitor
+DEFAULT_CACHE_SIZE = 64
+
+_INDENT = "    "
+
+
+def index_path_for(path: str) -> str:
+    return path + INDEX_SUFFIX
+
+
+class SchemaJsonWriter:
+    """Grava firebird_schema.json uma relação por vez, no mesmo formato de json.dump(indent=4).
+
+    Escreve em um arquivo temporário e só substitui o destino em close(), então uma extração
+    que falhe no meio não corrompe o esquema anterior (que pode inclusive estar sendo lido
+    pelo LazySchema durante a escrita). Ao fechar, grava também o índice de offsets.
+
+    Uso:
+        with SchemaJsonWriter("firebird_schema.json") as writer:
+            writer.write("CLIENTES", {...})
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._tmp_path = f"{path}.tmp"
+        self._file = open(self._tmp_path, "wb")
+        self._entries: List[Tuple[str, int, int, Optional[str]]] = []
+        self._offset = 0
+
+    def _emit(self, text: str) -> None:
+        data = text.encode("utf-8")
+        self._file.write(data)
+        self._offset += len(data)
+
+    def write(self, name: str, data: Dict[str, Any]) -> None:
+        """Acrescenta uma relação ao arquivo."""
+        self.write_raw(name, json.dumps(data, indent=4, ensure_ascii=False), data.get("object_type"))
+
+    def write_raw(self, name: str, value_json: str, object_type: Optional[str] = None) -> None:
+        """Acrescenta uma relação já serializada com json.dumps(indent=4) (ex.: copiada de LazySchema.raw)."""
+        self._emit(("{\n" if not self._entries else ",\n") + f"{_INDENT}{json.dumps(name, ensure_ascii=False)}: ")
+        start = self._offset
+        self._emit(value_json.replace("\n", "\n" + _INDENT))
+        self._entries.append((name, start, self._offset - start, object_type))
+
+    def close(self) -> None:
+        self._emit("\n}" if self._entries else "{}")
+        self._file.close()
+        os.replace(self._tmp_path, self.path)
+        write_index(self.path, self._entries)
+
+    def abort(self) -> None:
+        """Descarta o arquivo temporário, mantendo o destino como estava."""
+        self._file.close()
+        os.remove(self._tmp_path)
+
+    def __enter__(self) -> "SchemaJsonWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def write_index(path: str, entries: List[Tuple[str, int, int, Optional[str]]]) -> None:
+    """Grava o índice {objeto: [offset, tamanho, tipo]} junto com tamanho/mtime do arquivo indexado."""
+    stat = os.stat(path)
+    index = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "objects": [list(entry) for entry in entries]}
+    with open(index_path_for(path), "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False)
+
+
+def scan_index(path: str) -> Optional[List[Tuple[str, int, int, Optional[str]]]]:
+    """Monta o índice percorrendo as linhas de um arquivo gravado com json.dump(indent=4).
+
+    Relações começam em linhas com exatamente 4 espaços de recuo e terminam na próxima linha
+    "    }". Retorna None se o arquivo não estiver nesse formato.
+    """
+    decoder = json.JSONDecoder()
+    entries = []
+    current = None  # [nome, offset do valor, tipo]
+    offset = 0
+    with open(path, "rb") as f:
+        first = f.readline()
+        offset += len(first)
+        if first.strip() == b"{}":
+            return []
+        if first.rstrip(b"\r\n") != b"{":
+            return None
+        for line in f:
+            if line.startswith(b'    "') and current is None:
+                text = line.decode("utf-8").strip()
+                name, end = decoder.raw_decode(text)
+                rest = text[end:]
+                if not rest.startswith(": {"):
+                    return None
+                value_start = offset + len(line) - len(line.lstrip()) + len(text[:end].encode("utf-8")) + 2
+                if rest.rstrip(",") == ": {}":
+                    entries.append((name, value_start, 2, None))
+                else:
+                    current = [name, value_start, None]
+            elif current is not None and line.startswith(b'        "object_type": '):
+                current[2] = json.loads(line.split(b":", 1)[1].strip().rstrip(b","))
+            elif current is not None and line.rstrip(b"\r\n,") == b"    }":
+                value_end = offset + len(line.rstrip(b"\r\n,"))
+                entries.append((current[0], current[1], value_end - current[1], current[2]))
+                current = None
+            offset += len(line)
+    return entries if current is None else None
+
+
+class LazySchema(Mapping):
+    """Acesso por relação a firebird_schema.json sem decodificar o arquivo inteiro.
+
+    Usa o índice de offsets (criado pelo SchemaJsonWriter ou, na primeira abertura de um arquivo
+    antigo, por uma varredura de linhas) para ler e decodificar apenas a relação pedida.
+    Arquivos fora do formato indent=4 são carregados inteiros, como antes.
+
+    O índice vale para o arquivo que estava no disco quando foi montado: cada leitura confere
+    inode/tamanho/mtime e, se o esquema foi regravado (ex: nova extração), monta o índice de novo.
+    As relações devolvidas são cópias; alterá-las não afeta leituras seguintes.
+    """
+
+    def __init__(self, path: str, cache_size: int = DEFAULT_CACHE_SIZE):
+        self.path = path
+        self._cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._cache_size = cache_size
+        self._lock = threading.RLock()
+        self._data: Optional[Dict[str, Any]] = None
+        self._offsets: Dict[str, Tuple[int, int]] = {}
+        self._types: Dict[str, Optional[str]] = {}
+        self._stamp: Optional[Tuple[int, int, int]] = None
+        self._load()
+
+    @staticmethod
+    def _stamp_of(stat: os.stat_result) -> Tuple[int, int, int]:
+        return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+    def _load(self) -> None:
+        """(Re)monta o índice do arquivo atual e descarta as relações já decodificadas."""
+        path = self.path
+        stamp = self._stamp_of(os.stat(path))
+        data = None
+        entries = self._load_index()
+        if entries is None:
+            logger.info(f"Índice de {path} ausente ou desatualizado; varrendo o arquivo.")
+            entries = scan_index(path)
+            if entries is not None:
+                write_index(path, entries)
+        if entries is None:
+            logger.warning(f"{path} não está no formato indent=4; carregando o arquivo inteiro.")
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            entries = [(name, 0, 0, info.get("object_type")) for name, info in data.items()]
+        with self._lock:
+            self._data = data
+            self._offsets = {name: (offset, length) for name, offset, length, _ in entries}
+            self._types = {name: object_type for name, _, _, object_type in entries}
+            self._stamp = stamp
+            self._cache.clear()
+
+    def _reload_if_changed(self, stat: Optional[os.stat_result] = None) -> None:
+        if stat is None:
+            try:
+                stat = os.stat(self.path)
+            except OSError:
+                return  # Arquivo momentaneamente ausente: mantém o índice atual
+        with self._lock:
+            if self._stamp_of(stat) == self._stamp:
+                return
+            logger.info(f"{self.path} foi alterado desde a indexação; recarregando o índice.")
+            self._load()
+
+    def _load_index(self) -> Optional[List[Tuple[str, int, int, Optional[str]]]]:
+        try:
+            with open(index_path_for(self.path), "r", encoding="utf-8") as f:
+                index = json.load(f)
+            stat = os.stat(self.path)
+        except (OSError, json.JSONDecodeError):
+            return None
+        if index.get("size") != stat.st_size or index.get("mtime_ns") != stat.st_mtime_ns:
+            return None
+        return [tuple(entry) for entry in index.get("objects", [])]
+
+    def raw(self, name: str) -> str:
+        """Texto JSON da relação, como gravado (com o recuo do nível de topo removido)."""
+        # Abre o arquivo a cada leitura para não manter handle aberto (o writer substitui o arquivo);
+        # o fstat do handle garante que os offsets usados são do mesmo arquivo que está sendo lido
+        with open(self.path, "rb") as f:
+            self._reload_if_changed(os.fstat(f.fileno()))
+            with self._lock:
+                if self._data is not None:
+                    return json.dumps(self._data[name], indent=4, ensure_ascii=False)
+                offset, length = self._offsets[name]
+            f.seek(offset)
+            data = f.read(length)
+        return data.decode("utf-8").replace("\n" + _INDENT, "\n")
+
+    def object_type(self, name: str) -> Optional[str]:
+        """Tipo do objeto ('TABLE'/'VIEW') direto do índice, sem decodificar a relação."""
+        self._reload_if_changed()
+        return self._types[name]
+
+    def __getitem__(self, name: str) -> Dict[str, Any]:
+        self._reload_if_changed()
+        with self._lock:
+            if self._data is not None:
+                return copy.deepcopy(self._data[name])
+            if name in self._cache:
+                self._cache.move_to_end(name)
+                return copy.deepcopy(self._cache[name])
+            stamp = self._stamp
+        value = json.loads(self.raw(name))
+        with self._lock:
+            if self._stamp == stamp:  # Não guarda uma relação lida de um arquivo que já foi trocado
+                self._cache[name] = value
+                while len(self._cache) > self._cache_size:
+                    self._cache.popitem(last=False)
+        return copy.deepcopy(value)
+
+    def __iter__(self) -> Iterator[str]:
+        self._reload_if_changed()
+        return iter(list(self._offsets))
+
+    def __len__(self) -> int:
+        self._reload_if_changed()
+        return len(self._offsets)
+
+    def __contains__(self, name: object) -> bool:
+        self._reload_if_changed()
+        return name in self._offsets
@@ -0,0 +1,327 @@
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Banco SQLite com os metadados anotados (substitui a regravação completa de schema_metadata.json)
+DEFAULT_METADATA_DB = os.getenv("METADATA_DB_FILE", "schema_metadata.db")
+# Formato JSON legado, usado para importação/exportação
+DEFAULT_METADATA_JSON = "schema_metadata.json"
+
+# Campos de texto editáveis; demais chaves dos dicionários vão para a coluna 'extra' (JSON)
+OBJECT_FIELDS = ("description",)
+COLUMN_FIELDS = ("description", "value_mapping_notes")
+
+
+class MetadataChange(NamedTuple):
+    """Alteração de um campo. column=None para o objeto; section=None para chaves globais (ex: _GLOBAL_CONTEXT)."""
+    section: Optional[str]
+    object_name: Optional[str]
+    column: Optional[str]
+    field: str
+    old: Optional[str]
+    new: Optional[str]
+
+
+def diff_metadata(baseline: Dict[str, Any], current: Dict[str, Any]) -> List[MetadataChange]:
+    """Lista os campos que mudaram entre o que foi carregado (baseline) e o estado atual.
+
+    Só percorre os objetos presentes em `current`, então sessões que carregam os objetos sob
+    demanda geram trabalho proporcional ao que foi visitado.
+    """
+    changes = []
+    for key, value in current.items():
+        if isinstance(value, dict):
+            base_section = baseline.get(key) or {}
+            for object_name, object_meta in value.items():
+                base_object = base_section.get(object_name) or {}
+                for field in OBJECT_FIELDS:
+                    if object_meta.get(field, "") != base_object.get(field, ""):
+                        changes.append(MetadataChange(key, object_name, None, field, base_object.get(field), object_meta.get(field, "")))
+                base_columns = base_object.get("COLUMNS") or {}
+                for col_name, col_meta in (object_meta.get("COLUMNS") or {}).items():
+                    base_col = base_columns.get(col_name) or {}
+                    for field in COLUMN_FIELDS:
+                        if col_meta.get(field, "") != base_col.get(field, ""):
+                            changes.append(MetadataChange(key, object_name, col_name, field, base_col.get(field), col_meta.get(field, "")))
+        elif value != baseline.get(key):
+            changes.append(MetadataChange(None, None, None, key, baseline.get(key), value))
+    return changes
+
+
+class MetadataStore:
+    """Metadados do esquema em SQLite, com gravação por linha.
+
+    Cada descrição/nota é uma linha (objeto ou coluna); salvar grava só os campos alterados,
+    com verificação otimista: se outro anotador mudou o mesmo campo depois que esta sessão o
+    leu, a alteração não é aplicada e volta como conflito. Campos diferentes da mesma linha
+    não conflitam. Seguro para várias threads; várias instâncias do app podem usar o mesmo
+    arquivo (WAL + busy_timeout).
+    """
+
+    def __init__(self, path: str | None = None):
+        self.path = path or DEFAULT_METADATA_DB
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS metadata_objects (
+                section TEXT NOT NULL,
+                object_name TEXT NOT NULL,
+                description TEXT NOT NULL DEFAULT '',
+                extra TEXT,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (section, object_name)
+            );
+            CREATE TABLE IF NOT EXISTS metadata_columns (
+                section TEXT NOT NULL,
+                object_name TEXT NOT NULL,
+                column_name TEXT NOT NULL,
+                description TEXT NOT NULL DEFAULT '',
+                value_mapping_notes TEXT NOT NULL DEFAULT '',
+                extra TEXT,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (section, object_name, column_name)
+            );
+            CREATE INDEX IF NOT EXISTS idx_metadata_columns_name ON metadata_columns(column_name);
+            CREATE TABLE IF NOT EXISTS metadata_settings (
+                key TEXT PRIMARY KEY,
+                value TEXT,
+                updated_at REAL NOT NULL
+            );
+        """)
+        self._conn.commit()
+        logger.info(f"Store de metadados aberto em {self.path}.")
+
+    # --- Leitura ---
+
+    def is_empty(self) -> bool:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT NOT EXISTS (SELECT 1 FROM metadata_objects) AND NOT EXISTS (SELECT 1 FROM metadata_settings)"
+            ).fetchone()[0] == 1
+
+    def get_settings(self) -> Dict[str, Any]:
+        """Chaves globais (ex: _GLOBAL_CONTEXT)."""
+        with self._lock:
+            rows = self._conn.execute("SELECT key, value FROM metadata_settings ORDER BY rowid").fetchall()
+        return {key: json.loads(value) for key, value in rows}
+
+    def get_object(self, section: str, object_name: str) -> Optional[Dict[str, Any]]:
+        """Metadados de um objeto no formato do JSON ({"description", "COLUMNS": {...}}) ou None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT description, extra FROM metadata_objects WHERE section = ? AND object_name = ?",
+                (section, object_name),
+            ).fetchone()
+            columns = self._conn.execute(
+                "SELECT column_name, description, value_mapping_notes, extra FROM metadata_columns "
+                "WHERE section = ? AND object_name = ? ORDER BY rowid",
+                (section, object_name),
+            ).fetchall()
+        if row is None and not columns:
+            return None
+        description, extra = row if row else ("", None)
+        return self._object_dict(description, extra, columns)
+
+    @staticmethod
+    def _object_dict(description: str, extra: Optional[str], columns) -> Dict[str, Any]:
+        object_meta = {"description": description, **json.loads(extra or "{}"), "COLUMNS": {}}
+        for col_name, col_desc, notes, col_extra in columns:
+            object_meta["COLUMNS"][col_name] = {"description": col_desc, "value_mapping_notes": notes,
+                                                **json.loads(col_extra or "{}")}
+        return object_meta
+
+    def iter_column_descriptions(self) -> Iterator[Tuple[str, str, str, str]]:
+        """(section, objeto, coluna, descrição) das colunas já descritas, para montar o DescriptionIndex."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT section, object_name, column_name, description FROM metadata_columns "
+                "WHERE description != '' ORDER BY rowid"
+            ).fetchall()
+        return iter(rows)
+
+    def export_json(self) -> Dict[str, Any]:
+        """Monta o dicionário completo no formato de schema_metadata.json."""
+        with self._lock:
+            objects = self._conn.execute(
+                "SELECT section, object_name, description, extra FROM metadata_objects ORDER BY rowid"
+            ).fetchall()
+            columns = self._conn.execute(
+                "SELECT section, object_name, column_name, description, value_mapping_notes, extra "
+                "FROM metadata_columns ORDER BY rowid"
+            ).fetchall()
+        columns_by_object: Dict[Tuple[str, str], list] = {}
+        for section, object_name, *rest in columns:
+            columns_by_object.setdefault((section, object_name), []).append(rest)
+        metadata: Dict[str, Any] = {}
+        for section, object_name, description, extra in objects:
+            metadata.setdefault(section, {})[object_name] = self._object_dict(
+                description, extra, columns_by_object.pop((section, object_name), []))
+        # Colunas sem linha de objeto (não deveria ocorrer, mas não se perde nada)
+        for (section, object_name), rows in columns_by_object.items():
+            metadata.setdefault(section, {})[object_name] = self._object_dict("", None, rows)
+        metadata.update(self.get_settings())
+        return metadata
+
+    # --- Escrita ---
+
+    def import_json(self, metadata: Dict[str, Any], replace: bool = False) -> int:
+        """Importa um dicionário no formato de schema_metadata.json. Retorna o número de linhas gravadas."""
+        now = time.time()
+        count = 0
+        with self._lock:
+            with self._conn:
+                if replace:
+                    self._conn.execute("DELETE FROM metadata_columns")
+                    self._conn.execute("DELETE FROM metadata_objects")
+                    self._conn.execute("DELETE FROM metadata_settings")
+                for key, value in metadata.items():
+                    if not isinstance(value, dict):
+                        self._conn.execute(
+                            "INSERT OR REPLACE INTO metadata_settings (key, value, updated_at) VALUES (?, ?, ?)",
+                            (key, json.dumps(value, ensure_ascii=False), now))
+                        count += 1
+                        continue
+                    for object_name, object_meta in value.items():
+                        extra = {k: v for k, v in object_meta.items() if k not in OBJECT_FIELDS and k != "COLUMNS"}
+                        self._conn.execute(
+                            "INSERT OR REPLACE INTO metadata_objects (section, object_name, description, extra, updated_at) "
+                            "VALUES (?, ?, ?, ?, ?)",
+                            (key, object_name, object_meta.get("description", ""),
+                             json.dumps(extra, ensure_ascii=False) if extra else None, now))
+                        count += 1
+                        for col_name, col_meta in (object_meta.get("COLUMNS") or {}).items():
+                            col_extra = {k: v for k, v in col_meta.items() if k not in COLUMN_FIELDS}
+                            self._conn.execute(
+                                "INSERT OR REPLACE INTO metadata_columns (section, object_name, column_name, description, "
+                                "value_mapping_notes, extra, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                (key, object_name, col_name, col_meta.get("description", ""),
+                                 col_meta.get("value_mapping_notes", ""),
+                                 json.dumps(col_extra, ensure_ascii=False) if col_extra else None, now))
+                            count += 1
+        logger.info(f"Metadados importados: {count} linhas.")
+        return count
+
+    def apply_changes(self, changes: List[MetadataChange]) -> List[MetadataChange]:
+        """Grava as alterações em uma transação, campo a campo, com verificação otimista.
+
+        Cada campo só é atualizado se o valor no banco ainda for `old` (o que a sessão leu);
+        caso contrário a alteração é devolvida como conflito e o valor do banco é mantido.
+
+        Returns:
+            Lista de conflitos, com `old` trocado pelo valor atual no banco.
+
+        Raises:
+            ValueError: Se alguma alteração tiver um campo fora de OBJECT_FIELDS/COLUMN_FIELDS
+                (verificado antes de qualquer SQL, já que o nome do campo entra no comando).
+        """
+        for change in changes:
+            if change.section is not None and change.field not in (COLUMN_FIELDS if change.column else OBJECT_FIELDS):
+                raise ValueError(f"Campo de metadados desconhecido: {change.field}")
+        conflicts = []
+        now = time.time()
+        with self._lock:
+            with self._conn:
+                for change in changes:
+                    current = self._current_value(change)
+                    if current is not None and current != (change.old or "") and current != change.new:
+                        conflicts.append(change._replace(old=current))
+                        continue
+                    self._write_value(change, now)
+        if changes:
+            logger.info(f"Metadados: {len(changes) - len(conflicts)} campos gravados, {len(conflicts)} conflitos.")
+        return conflicts
+
+    def _current_value(self, change: MetadataChange) -> Optional[str]:
+        if change.section is None:
+            row = self._conn.execute("SELECT value FROM metadata_settings WHERE key = ?", (change.field,)).fetchone()
+            return json.loads(row[0]) if row else None
+        if change.column is None:
+            row = self._conn.execute(
+                f"SELECT {change.field} FROM metadata_objects WHERE section = ? AND object_name = ?",
+                (change.section, change.object_name)).fetchone()
+        else:
+            row = self._conn.execute(
+                f"SELECT {change.field} FROM metadata_columns WHERE section = ? AND object_name = ? AND column_name = ?",
+                (change.section, change.object_name, change.column)).fetchone()
+        return row[0] if row else None
+
+    def _write_value(self, change: MetadataChange, now: float) -> None:
+        if change.section is None:
+            self._conn.execute(
+                "INSERT INTO metadata_settings (key, value, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at",
+                (change.field, json.dumps(change.new, ensure_ascii=False), now))
+            return
+        # Garante a linha do objeto (mantém a ordem de criação para a exportação)
+        self._conn.execute(
+            "INSERT OR IGNORE INTO metadata_objects (section, object_name, updated_at) VALUES (?, ?, ?)",
+            (change.section, change.object_name, now))
+        if change.column is None:
+            self._conn.execute(
+                f"UPDATE metadata_objects SET {change.field} = ?, updated_at = ? WHERE section = ? AND object_name = ?",
+                (change.new or "", now, change.section, change.object_name))
+        else:
+            self._conn.execute(
+                f"INSERT INTO metadata_columns (section, object_name, column_name, {change.field}, updated_at) "
+                f"VALUES (?, ?, ?, ?, ?) ON CONFLICT(section, object_name, column_name) "
+                f"DO UPDATE SET {change.field} = excluded.{change.field}, updated_at = excluded.updated_at",
+                (change.section, change.object_name, change.column, change.new or "", now))
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_default_store: Optional[MetadataStore] = None
+_default_store_lock = threading.Lock()
+
+
+def get_metadata_store() -> MetadataStore:
+    """Retorna o store padrão do processo, abrindo-o no primeiro uso."""
+    global _default_store
+    if _default_store is None:
+        with _default_store_lock:
+            if _default_store is None:
+                _default_store = MetadataStore()
+    return _default_store
+
+
+def set_metadata_store(store: MetadataStore | None) -> None:
+    """Substitui o store padrão (ex: outro arquivo)."""
+    global _default_store
+    with _default_store_lock:
+        _default_store = store
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Importa/exporta os metadados do esquema entre SQLite e JSON.")
+    parser.add_argument("action", choices=["import", "export"])
+    parser.add_argument("json_file", nargs="?", default=DEFAULT_METADATA_JSON)
+    parser.add_argument("--db", default=DEFAULT_METADATA_DB, help="Arquivo SQLite dos metadados.")
+    parser.add_argument("--replace", action="store_true", help="Na importação, apaga o conteúdo atual do banco antes.")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    store = MetadataStore(args.db)
+    try:
+        if args.action == "import":
+            with open(args.json_file, "r", encoding="utf-8") as f:
+                store.import_json(json.load(f), replace=args.replace)
+        else:
+            with open(args.json_file, "w", encoding="utf-8") as f:
+                json.dump(store.export_json(), f, indent=4, ensure_ascii=False)
+            logger.info(f"Metadados exportados para {args.json_file}.")
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
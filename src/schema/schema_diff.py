@@ -0,0 +1,96 @@
+from collections.abc import Mapping
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Arquivo com as diferenças da última extração (gerado por extract_firebird_schema.py)
+SCHEMA_DIFF_FILE = "firebird_schema.diff.json"
+
+
+def _columns_by_name(object_info: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    return {col.get("name"): col for col in object_info.get("columns", []) if col.get("name")}
+
+
+def diff_object(old: Dict[str, Any], new: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Compara duas versões de uma tabela/view; retorna None se forem iguais."""
+    if old == new:
+        return None
+    old_cols, new_cols = _columns_by_name(old), _columns_by_name(new)
+    return {
+        "object_type_changed": old.get("object_type") != new.get("object_type"),
+        "columns_added": [name for name in new_cols if name not in old_cols],
+        "columns_removed": [name for name in old_cols if name not in new_cols],
+        "columns_altered": [name for name, col in new_cols.items() if name in old_cols and old_cols[name] != col],
+        "constraints_changed": old.get("constraints") != new.get("constraints"),
+    }
+
+
+class SchemaDiffBuilder:
+    """Calcula o diff à medida que as relações do novo esquema são produzidas (sem guardá-las).
+
+    Args:
+        old: Esquema anterior (dict ou LazySchema).
+        candidates: Se informado, só esses objetos (presentes nos dois lados) são comparados;
+                    os demais são considerados inalterados (ex.: fingerprint igual).
+    """
+
+    def __init__(self, old: Optional[Mapping], candidates: Optional[Iterable[str]] = None):
+        self.old = old or {}
+        self.candidates = set(candidates) if candidates is not None else None
+        self.added: List[str] = []
+        self.altered: Dict[str, Dict[str, Any]] = {}
+        self.common = 0
+        self._seen = set()
+
+    def add(self, name: str, data: Dict[str, Any]) -> None:
+        self._seen.add(name)
+        if name not in self.old:
+            self.added.append(name)
+            return
+        self.common += 1
+        if self.candidates is not None and name not in self.candidates:
+            return
+        details = diff_object(self.old[name], data)
+        if details:
+            self.altered[name] = details
+
+    def result(self) -> Dict[str, Any]:
+        """{"added": [...], "removed": [...], "altered": {objeto: detalhes}, "unchanged": n}"""
+        removed = [name for name in self.old if name not in self._seen]
+        return {"added": list(self.added), "removed": removed, "altered": dict(self.altered),
+                "unchanged": self.common - len(self.altered)}
+
+
+def diff_schemas(old: Mapping, new: Mapping, candidates: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    """Diferenças entre dois esquemas no formato de firebird_schema.json (ver SchemaDiffBuilder)."""
+    builder = SchemaDiffBuilder(old, candidates)
+    for name, data in new.items():
+        builder.add(name, data)
+    return builder.result()
+
+
+def changed_keys(diff: Dict[str, Any], schema_data: Dict[str, Any]) -> List[Tuple[str, str, Optional[str]]]:
+    """Chaves (key_type, objeto, coluna|None) cujas descrições precisam ser geradas de novo.
+
+    Objetos novos: tudo. Objetos alterados: colunas novas/alteradas e, se o conjunto de colunas
+    mudou, a descrição do próprio objeto (o prompt dela cita as colunas).
+    """
+    keys = []
+    # Objeto que virou view/tabela muda de seção nos metadados: é tratado como novo
+    rebuilt = list(diff.get("added", [])) + [
+        name for name, details in diff.get("altered", {}).items() if details.get("object_type_changed")
+    ]
+    for name in rebuilt:
+        object_info = schema_data.get(name)
+        if object_info is None:
+            continue
+        key_type = object_info.get("object_type", "TABLE") + "S"
+        keys.append((key_type, name, None))
+        keys.extend((key_type, name, col["name"]) for col in object_info.get("columns", []) if col.get("name"))
+    for name, details in diff.get("altered", {}).items():
+        object_info = schema_data.get(name)
+        if object_info is None or details.get("object_type_changed"):
+            continue
+        key_type = object_info.get("object_type", "TABLE") + "S"
+        if details.get("columns_added") or details.get("columns_removed"):
+            keys.append((key_type, name, None))
+        keys.extend((key_type, name, col) for col in details.get("columns_added", []) + details.get("columns_altered", []))
+    return keys
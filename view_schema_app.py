@@ -2,12 +2,18 @@ import streamlit as st
 import json
 import pandas as pd
 import fdb
+import copy
 import logging
 import os
 from collections import defaultdict
 import re # Necessário para limpar o nome do tipo
 # Importar a função de chat do nosso cliente Ollama
+from src.ollama_integration.cache import DETERMINISTIC_OPTIONS
 from src.ollama_integration.client import chat_completion
+from src.schema.column_batching import DEFAULT_BATCH_SIZE, describe_columns_batched
+from src.schema.description_index import MATCH_NORMALIZED, MATCH_SUFFIX, DescriptionIndex
+from src.schema.json_stream import LazySchema
+from src.schema.metadata_store import DEFAULT_METADATA_DB, MetadataStore, diff_metadata
 
 # Configuração do Logging (opcional para Streamlit, mas útil para depuração)
 # Nível DEBUG para ver dados brutos da amostra
@@ -15,7 +21,9 @@ logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - [
 logger = logging.getLogger(__name__)
 
 SCHEMA_FILE = "firebird_schema.json"
-METADATA_FILE = "schema_metadata.json" # Novo arquivo para metadados
+METADATA_FILE = "schema_metadata.json" # Formato JSON (importado na primeira execução e exportado sob demanda)
+METADATA_DB_FILE = DEFAULT_METADATA_DB # Metadados anotados, gravados campo a campo
+DEFAULT_GLOBAL_CONTEXT = 'Digite aqui informações gerais sobre a empresa, o propósito do banco de dados, etc.'
 
 # --- Configurações Padrão --- (Podem ser sobrescritas na interface)
 DEFAULT_DB_PATH = r"C:\Projetos\DADOS.FDB"
@@ -54,12 +62,11 @@ def get_type_explanation(type_string):
 
 # --- Funções Auxiliares --- 
 
-@st.cache_data # Cache para estrutura técnica (não muda na sessão)
+@st.cache_resource # Cache para estrutura técnica (não muda na sessão); objeto compartilhado, não copiado
 def load_schema(file_path):
-    """Carrega o esquema técnico do banco de dados do arquivo JSON."""
+    """Abre o esquema técnico para leitura por relação (só a tabela selecionada é decodificada)."""
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        return LazySchema(file_path)
     except FileNotFoundError:
         st.error(f"Erro: Arquivo de esquema '{file_path}' não encontrado. Execute 'extract_firebird_schema.py' primeiro.")
         return None
@@ -86,8 +93,61 @@ def load_metadata(file_path):
         st.info(f"Arquivo de metadados '{file_path}' não encontrado. Será criado ao salvar.")
         return {}
 
+@st.cache_resource # Um store (conexão SQLite) compartilhado por todas as sessões do processo
+def get_metadata_store():
+    """Abre o banco de metadados; na primeira vez, importa o schema_metadata.json existente."""
+    store = MetadataStore(METADATA_DB_FILE)
+    if store.is_empty() and os.path.exists(METADATA_FILE):
+        store.import_json(load_metadata(METADATA_FILE))
+        logger.info(f"Metadados de {METADATA_FILE} importados para {METADATA_DB_FILE}.")
+    return store
+
+def init_session_metadata():
+    """Prepara os metadados da sessão: só as chaves globais; os objetos são carregados ao serem selecionados.
+
+    st.session_state.metadata_baseline guarda o que foi lido do banco, para salvar só o que mudou.
+    """
+    metadata = {'TABLES': {}, 'VIEWS': {}}
+    metadata.update(get_metadata_store().get_settings())
+    metadata.setdefault('_GLOBAL_CONTEXT', DEFAULT_GLOBAL_CONTEXT)
+    st.session_state.metadata = metadata
+    st.session_state.metadata_baseline = copy.deepcopy(metadata)
+
+def ensure_object_loaded(key_type, object_name):
+    """Carrega do banco os metadados de um objeto na primeira vez que ele é aberto nesta sessão."""
+    section = st.session_state.metadata.setdefault(key_type, {})
+    if object_name not in section:
+        object_meta = get_metadata_store().get_object(key_type, object_name) or {}
+        section[object_name] = object_meta
+        st.session_state.metadata_baseline.setdefault(key_type, {})[object_name] = copy.deepcopy(object_meta)
+
+def save_session_metadata():
+    """Grava no banco só os campos alterados nesta sessão.
+
+    Campos que outro anotador alterou desde que foram lidos não são sobrescritos: a sessão
+    passa a exibir o valor do banco e os conflitos são retornados para aviso.
+    """
+    metadata = st.session_state.metadata
+    changes = diff_metadata(st.session_state.metadata_baseline, metadata)
+    conflicts = get_metadata_store().apply_changes(changes)
+    for conflict in conflicts:
+        if conflict.section is None:
+            metadata[conflict.field] = conflict.old
+            st.session_state.pop("global_context_input", None)
+            continue
+        object_meta = metadata[conflict.section][conflict.object_name]
+        if conflict.column is None:
+            object_meta[conflict.field] = conflict.old
+            st.session_state.pop(f"desc_{conflict.section[:-1]}_{conflict.object_name}", None)
+        else:
+            object_meta['COLUMNS'][conflict.column][conflict.field] = conflict.old
+            widget_prefix = "desc_col" if conflict.field == 'description' else "map_notes"
+            st.session_state.pop(f"{widget_prefix}_{conflict.object_name}_{conflict.column}", None)
+    st.session_state.metadata_baseline = copy.deepcopy(metadata)
+    return len(changes) - len(conflicts), conflicts
+
 def save_metadata_to_file(metadata, file_path):
-    """Salva o dicionário de metadados no arquivo JSON."""
+    """Salva o dicionário de metadados no arquivo JSON (exportação do banco)."""
     try:
         with open(file_path, 'w', encoding='utf-8') as f:
             json.dump(metadata, f, indent=4, ensure_ascii=False)
@@ -182,13 +242,23 @@ def fetch_sample_data(db_path, user, password, charset, table_name, sample_size)
 
 # Função para gerar descrição via IA (copiada e adaptada)
 def generate_ai_description(prompt):
-    """Chama a API Ollama para gerar uma descrição e limpa a resposta."""
+    """Chama a API Ollama para gerar uma descrição e limpa a resposta.
+
+    A primeira sugestão para um prompt é determinística e sai do cache quando possível; clicar de
+    novo em "Sugerir (IA)" para o mesmo prompt gera uma nova sugestão, sem cache.
+    """
     logger.debug(f"Enviando prompt para IA: {prompt}")
     messages = [{"role": "user", "content": prompt}]
+    suggested = st.session_state.setdefault('ai_prompts_suggested', set())
+    regenerate = prompt in suggested
     try:
         # Usando um spinner para feedback visual durante a chamada da IA
         with st.spinner("🧠 Pensando..."):
-            response = chat_completion(messages=messages, stream=False)
+            if regenerate:
+                response = chat_completion(messages=messages, stream=False)
+            else:
+                response = chat_completion(messages=messages, stream=False, options=DETERMINISTIC_OPTIONS, use_cache=True)
+        suggested.add(prompt)
         if response:
             cleaned_response = response.strip().strip('"').strip('\'').strip()
             logger.debug(f"Resposta da IA (limpa): {cleaned_response}")
@@ -202,34 +272,52 @@ def generate_ai_description(prompt):
         st.error(f"Erro ao contatar a IA: {e}")
         return None
 
-def find_existing_description(metadata, target_col_name):
-    """Procura por uma descrição existente para um nome de coluna em todo o metadado."""
-    if not metadata or not target_col_name:
+def generate_ai_json(prompt, json_schema, use_cache=True):
+    """Chama a API Ollama pedindo saída JSON estruturada (sugestões em lote de colunas)."""
+    logger.debug(f"Enviando prompt em lote para IA: {prompt}")
+    messages = [{"role": "user", "content": prompt}]
+    # Novas tentativas (use_cache=False) amostram: repetir a chamada determinística daria o mesmo JSON inválido
+    options = DETERMINISTIC_OPTIONS if use_cache else None
+    try:
+        return chat_completion(messages=messages, stream=False, options=options, use_cache=use_cache,
+                               response_format=json_schema)
+    except Exception as e:
+        logger.exception("Erro ao chamar a API Ollama (lote):")
+        st.error(f"Erro ao contatar a IA: {e}")
         return None
-    # Procura em Tabelas
-    for table_name, table_meta in metadata.get('TABLES', {}).items():
-        col_meta = table_meta.get('COLUMNS', {}).get(target_col_name)
-        if col_meta and col_meta.get('description'):
-            logger.debug(f"Encontrada descrição existente para '{target_col_name}' na tabela '{table_name}'")
-            return col_meta['description']
-    # Procura em Views
-    for view_name, view_meta in metadata.get('VIEWS', {}).items():
-        col_meta = view_meta.get('COLUMNS', {}).get(target_col_name)
-        if col_meta and col_meta.get('description'):
-            logger.debug(f"Encontrada descrição existente para '{target_col_name}' na view '{view_name}'")
-            return col_meta['description']
-    return None # Não encontrado
+
+def get_description_index():
+    """Retorna o índice de descrições da sessão, construindo-o a partir do banco de metadados na primeira vez."""
+    if 'description_index' not in st.session_state:
+        index = DescriptionIndex()
+        for key_type, object_name, col_name, description in get_metadata_store().iter_column_descriptions():
+            index.update(key_type, object_name, col_name, description)
+        st.session_state.description_index = index
+        logger.info(f"Índice de descrições construído ({len(st.session_state.description_index)} colunas descritas).")
+    return st.session_state.description_index
+
+def find_existing_description(index, target_col_name):
+    """Procura uma descrição existente para uma coluna com exatamente o mesmo nome (como antes do índice)."""
+    if not target_col_name:
+        return None
+    description = index.lookup(target_col_name)
+    if description:
+        logger.debug(f"Encontrada descrição existente para '{target_col_name}' no índice")
+    return description
+
+MATCH_LABELS = {MATCH_NORMALIZED: "mesmo nome sem prefixo", MATCH_SUFFIX: "mesmo sufixo"}
+
+def accept_description_candidate(col_key, col_metadata, description):
+    """Callback do botão "Usar": copia a sugestão para o campo (só por escolha do usuário)."""
+    st.session_state[col_key] = description
+    col_metadata['description'] = description
 
 # --- Inicialização do Estado da Sessão (AGORA DEPOIS DAS FUNÇÕES) --- 
 if 'db_password' not in st.session_state:
     st.session_state.db_password = ""
 if 'metadata' not in st.session_state:
-    st.session_state.metadata = load_metadata(METADATA_FILE)
-    # Garante que as chaves de nível superior existam após o carregamento inicial
-    st.session_state.metadata.setdefault('TABLES', {})
-    st.session_state.metadata.setdefault('VIEWS', {})
-    st.session_state.metadata.setdefault('_GLOBAL_CONTEXT', 'Digite aqui informações gerais sobre a empresa, o propósito do banco de dados, etc.')
-    logger.info("Metadados carregados para session_state (com chaves de nível superior garantidas).")
+    init_session_metadata()
+    logger.info("Metadados globais carregados para session_state (objetos são carregados sob demanda).")
 
 # --- Função Principal da Aplicação --- 
 def main():
@@ -238,12 +326,13 @@ def main():
 
     # Garante que metadados e chaves principais estão no estado da sessão
     if 'metadata' not in st.session_state:
-        st.session_state.metadata = load_metadata(METADATA_FILE)
+        init_session_metadata()
+        st.session_state.pop('description_index', None) # Índice refeito a partir dos novos metadados
         logger.info("Metadados (re)carregados para session_state dentro de main.")
     # Garante as chaves de nível superior toda vez que main rodar
     st.session_state.metadata.setdefault('TABLES', {})
     st.session_state.metadata.setdefault('VIEWS', {})
-    st.session_state.metadata.setdefault('_GLOBAL_CONTEXT', 'Digite aqui informações gerais sobre a empresa, o propósito do banco de dados, etc.')
+    st.session_state.metadata.setdefault('_GLOBAL_CONTEXT', DEFAULT_GLOBAL_CONTEXT)
 
     schema_data = load_schema(SCHEMA_FILE)
     if not schema_data:
@@ -269,11 +358,27 @@ def main():
     st.sidebar.divider()
     # Botão Salvar na Sidebar
     if st.sidebar.button("💾 Salvar Metadados e Contexto", use_container_width=True):
-        if save_metadata_to_file(st.session_state.metadata, METADATA_FILE):
-            st.sidebar.success("Metadados e Contexto salvos!")
+        try:
+            saved, conflicts = save_session_metadata()
+            st.sidebar.success(f"Metadados e Contexto salvos! ({saved} campos alterados)")
+            if conflicts:
+                fields = ", ".join(f"{c.object_name or c.field}{'.' + c.column if c.column else ''}" for c in conflicts[:5])
+                # Reroda para os campos exibirem o valor do banco; o aviso é mostrado na próxima execução
+                st.session_state.metadata_conflict_warning = (
+                    f"{len(conflicts)} campos foram alterados por outra pessoa e não foram sobrescritos: {fields}. "
+                    "Os valores atuais foram carregados.")
+        except Exception as e:
+            logger.exception("Erro ao salvar metadados no banco:")
+            st.sidebar.error(f"Falha ao salvar: {e}")
         else:
-            st.sidebar.error("Falha ao salvar.")
-    st.sidebar.caption(f"Salvo em: {METADATA_FILE}")
+            if conflicts:
+                st.rerun()
+    if 'metadata_conflict_warning' in st.session_state:
+        st.sidebar.warning(st.session_state.pop('metadata_conflict_warning'))
+    st.sidebar.caption(f"Salvo em: {METADATA_DB_FILE}")
+    if st.sidebar.button("📤 Exportar JSON", use_container_width=True, help=f"Gera {METADATA_FILE} a partir do banco de metadados."):
+        if save_metadata_to_file(get_metadata_store().export_json(), METADATA_FILE):
+            st.sidebar.success(f"Exportado para {METADATA_FILE}.")
     sample_size_input = st.sidebar.number_input("Tamanho da Amostra (Preview/Final)", min_value=1, max_value=100, value=DEFAULT_SAMPLE_SIZE)
 
     # --- Conteúdo Principal ---
@@ -288,9 +393,9 @@ def main():
     # Filtrar object_names com base na seleção do rádio
     all_object_names = sorted(list(schema_data.keys()))
     if filter_type == "Tabelas":
-        object_names = [name for name in all_object_names if schema_data[name].get("object_type") == "TABLE"]
+        object_names = [name for name in all_object_names if schema_data.object_type(name) == "TABLE"]
     elif filter_type == "Views":
-        object_names = [name for name in all_object_names if schema_data[name].get("object_type") == "VIEW"]
+        object_names = [name for name in all_object_names if schema_data.object_type(name) == "VIEW"]
     else: # "Todos"
         object_names = all_object_names
 
@@ -338,9 +443,8 @@ def main():
         st.subheader("Descrição Geral do Objeto")
         
         # Abordagem mais segura para garantir a estrutura no session_state
-        # 1. Garante que 'TABLES' ou 'VIEWS' existe
-        if key_type not in st.session_state.metadata:
-            st.session_state.metadata[key_type] = {}
+        # 1. Carrega do banco os metadados do objeto (só na primeira vez nesta sessão)
+        ensure_object_loaded(key_type, selected_object)
         # 2. Garante que o dicionário para o objeto selecionado existe
         if selected_object not in st.session_state.metadata[key_type]:
             st.session_state.metadata[key_type][selected_object] = {}
@@ -385,33 +489,35 @@ def main():
                 st.toast("Nenhuma coluna encontrada para gerar sugestões.")
             else:
                 progress_bar = st.progress(0, text="Gerando sugestões para colunas...")
-                total_cols = len(columns_to_process)
-                for i, col in enumerate(columns_to_process):
-                    col_name = col.get('name')
-                    col_type = col.get('type')
-                    if not col_name or not col_type:
-                        continue
-
-                    # Atualiza texto da barra de progresso
-                    progress_text = f"Gerando sugestões para colunas... ({i+1}/{total_cols}: {col_name})"
-                    progress_bar.progress((i + 1) / total_cols, text=progress_text)
-
-                    # Gera o prompt específico para a coluna
-                    prompt_column = (
-                        f"Sugira uma descrição concisa em português brasileiro para a coluna de banco de dados chamada '{col_name}' "
-                        f"do tipo '{col_type}' que pertence ao objeto '{selected_object}' ({object_type}). "
+                valid_columns = [col for col in columns_to_process if col.get('name') and col.get('type')]
+                total_cols = len(valid_columns)
+
+                def build_single_prompt(col):
+                    # Prompt específico por coluna (fallback quando o lote não traz a coluna)
+                    return (
+                        f"Sugira uma descrição concisa em português brasileiro para a coluna de banco de dados chamada '{col['name']}' "
+                        f"do tipo '{col['type']}' que pertence ao objeto '{selected_object}' ({object_type}). "
                         f"Foque no significado provável do dado armazenado. Responda apenas com a descrição sugerida."
                     )
-                    # Chama a IA (sem spinner individual, pois temos a barra de progresso)
-                    # Modificar generate_ai_description para não usar spinner interno ou criar uma versão sem spinner?
-                    # Por enquanto, manteremos o spinner interno, pode ficar um pouco repetitivo visualmente.
-                    suggestion = generate_ai_description(prompt_column)
 
-                    # Atualiza o estado da sessão com a sugestão (mesmo se for None ou erro, para registrar)
-                    if suggestion:
-                         st.session_state.metadata.setdefault(key_type, {}).setdefault(selected_object, {}).setdefault('COLUMNS', {}).setdefault(col_name, {})['description'] = suggestion
-                    else: # Se falhar, não sobrescreve descrição existente
-                         logger.warning(f"Não foi possível gerar sugestão para a coluna {col_name}")
+                # Várias colunas por prompt (METADATA_BATCH_SIZE); só as que falharem são refeitas
+                for start in range(0, total_cols, DEFAULT_BATCH_SIZE):
+                    batch = valid_columns[start:start + DEFAULT_BATCH_SIZE]
+                    progress_text = f"Gerando sugestões para colunas... ({start + len(batch)}/{total_cols}: {batch[0]['name']}...)"
+                    progress_bar.progress(start / total_cols, text=progress_text)
+
+                    suggestions, failed_cols = describe_columns_batched(
+                        selected_object, object_type, batch,
+                        generate_json=generate_ai_json,
+                        generate_text=generate_ai_description,
+                        build_single_prompt=build_single_prompt,
+                        batch_size=len(batch),
+                    )
+                    # Atualiza o estado da sessão com as sugestões; falhas não sobrescrevem descrição existente
+                    for col_name, suggestion in suggestions.items():
+                        st.session_state.metadata.setdefault(key_type, {}).setdefault(selected_object, {}).setdefault('COLUMNS', {}).setdefault(col_name, {})['description'] = suggestion
+                    for col_name in failed_cols:
+                        logger.warning(f"Não foi possível gerar sugestão para a coluna {col_name}")
 
                 progress_bar.progress(1.0, text="Sugestões de colunas concluídas!")
                 st.toast("Sugestões para todas as colunas foram geradas!")
@@ -424,6 +530,7 @@ def main():
         st.subheader("Colunas, Exemplos e Descrições")
         if object_info.get('columns'):
             object_columns_metadata = st.session_state.metadata[key_type][selected_object]['COLUMNS']
+            description_index = get_description_index()
             for col in object_info['columns']:
                 col_name = col['name']
                 col_type = col['type']
@@ -462,12 +569,16 @@ def main():
                 
                 # **NOVO: Lógica de Preenchimento Automático Heurístico**
                 description_value = current_col_metadata['description']
+                candidates = []
                 if not description_value: # Só tenta preencher se estiver vazio
-                    existing_desc = find_existing_description(st.session_state.metadata, col_name)
+                    existing_desc = find_existing_description(description_index, col_name)
                     if existing_desc:
                         logger.info(f"Preenchendo descrição vazia de '{selected_object}.{col_name}' com descrição encontrada em outro lugar.")
                         description_value = existing_desc # Usa a descrição encontrada
                         # Não salva no state ainda, apenas usa como valor inicial do text_area
+                    else:
+                        # Nomes só parecidos não são preenchidos: viram sugestões que o usuário aceita ou ignora
+                        candidates = description_index.candidates(col_name)
 
                 # Layout para descrição da coluna e botão IA
                 col_desc_area, col_btn_area = st.columns([4,1])
@@ -481,6 +592,20 @@ def main():
                         label_visibility="collapsed",
                         height=75
                     )
+                    # Mantém o índice em dia com a edição (no-op se o texto não mudou)
+                    description_index.update(key_type, selected_object, col_name, current_col_metadata['description'])
+                    if not current_col_metadata['description']:
+                        for i, candidate in enumerate(candidates):
+                            cand_text_area, cand_btn_area = st.columns([5, 1])
+                            cand_text_area.caption(
+                                f"Sugestão ({MATCH_LABELS[candidate.match]}, de `{candidate.object_name}.{candidate.column_name}`): "
+                                f"{candidate.description}"
+                            )
+                            cand_btn_area.button(
+                                "Usar", key=f"use_cand_{selected_object}_{col_name}_{i}",
+                                on_click=accept_description_candidate,
+                                args=(col_key, current_col_metadata, candidate.description),
+                            )
                 with col_btn_area:
                     # Botão para sugerir descrição da coluna
                     if st.button("Sugerir (IA)", key=f"btn_ai_col_{selected_object}_{col_name}", use_container_width=True):
@@ -494,6 +619,7 @@ def main():
                         if suggestion:
                             # Salva a sugestão da IA no estado
                             current_col_metadata['description'] = suggestion
+                            description_index.update(key_type, selected_object, col_name, suggestion)
                             st.rerun()
 
                 st.caption("Acima: Descrição geral. Abaixo: Mapeamento de valores.") # Legenda ajustada